@@ -0,0 +1,253 @@
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+
+# Tipos de apuesta (el índice es el código guardado en el libro)
+TIPOS_APUESTA = ["jugador", "banca", "empate", "par_jugador", "par_banca"]
+_CODIGO_TIPO = {tipo: i for i, tipo in enumerate(TIPOS_APUESTA)}
+
+# Los montos se guardan en centavos y los pagos en puntos básicos (1/10000)
+ESCALA_MONTO = 100
+ESCALA_PAGO = 10000
+MAXIMO_CENTAVOS = 2 ** 53  # Tope de cada monto y de un saldo al depositar (los saldos son int64)
+
+# Ganancia neta por unidad apostada cuando la apuesta gana
+PAGOS = {
+    "jugador": 1.0,       # 1:1
+    "banca": 0.95,        # 1:1 menos 5% de comisión
+    "empate": 8.0,        # 8:1
+    "par_jugador": 11.0,  # 11:1
+    "par_banca": 11.0,    # 11:1
+}
+
+
+def a_centavos(monto):
+    """
+    Convierte un monto (int, float o str) a centavos enteros
+
+    Raises:
+        ValueError: Si el monto no es un número finito (p. ej. "abc", "nan", "inf") o es enorme
+    """
+    try:
+        centavos = int((Decimal(str(monto)) * ESCALA_MONTO).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except (ArithmeticError, ValueError):  # InvalidOperation/Overflow de decimal, nan e inf
+        raise ValueError(f"monto inválido: {monto!r}") from None
+    if abs(centavos) > MAXIMO_CENTAVOS:
+        raise ValueError(f"monto fuera de rango: {monto!r}")
+    return centavos
+
+
+def desde_centavos(centavos):
+    """Convierte centavos enteros a un monto decimal para mostrar"""
+    return Decimal(int(centavos)) / ESCALA_MONTO
+
+
+class LibroApuestas:
+    """
+    Libro de apuestas y saldos de una mesa de Baccarat
+
+    Las apuestas abiertas de la ronda se guardan en arreglos paralelos de enteros
+    (asiento, tipo, monto en centavos) y se liquidan todas juntas con operaciones
+    vectorizadas cuando el juego determina el ganador, así que la latencia de
+    liquidación no depende de recorrer apuestas en Python.
+    """
+
+    def __init__(self, asientos=14, capacidad=256):
+        """
+        Inicializa el libro
+
+        Args:
+            asientos: Número de asientos de la mesa
+            capacidad: Apuestas por ronda reservadas inicialmente (crece si hace falta)
+        """
+        self.saldos = np.zeros(asientos, dtype=np.int64)
+        self._asiento = np.empty(capacidad, dtype=np.int32)
+        self._tipo = np.empty(capacidad, dtype=np.int8)
+        self._monto = np.empty(capacidad, dtype=np.int64)
+        self._abiertas = 0
+        self.juego = None
+        self.ultima_liquidacion = None
+
+        # Tablas de resultado neto en puntos básicos: [ganador][tipo] y [par][tipo]
+        perder = -ESCALA_PAGO
+        self._tabla_ganador = {}
+        for ganador in ["jugador", "banca", "empate"]:
+            fila = np.full(len(TIPOS_APUESTA), perder, dtype=np.int64)
+            fila[_CODIGO_TIPO[ganador]] = round(PAGOS[ganador] * ESCALA_PAGO)
+            if ganador == "empate":
+                # En empate las apuestas a jugador y banca se devuelven
+                fila[_CODIGO_TIPO["jugador"]] = 0
+                fila[_CODIGO_TIPO["banca"]] = 0
+            self._tabla_ganador[ganador] = fila
+        self._pago_par = {tipo: round(PAGOS[tipo] * ESCALA_PAGO)
+                          for tipo in ["par_jugador", "par_banca"]}
+
+    def vincular(self, juego):
+        """Conecta el libro a un juego para liquidar al finalizar cada ronda"""
+        self.juego = juego
+        juego.agregar_observador(self._al_evento)
+
+    def _al_evento(self, evento, juego):
+        if evento == "finalizado":
+            self.liquidar(juego)
+
+    @property
+    def apuestas_abiertas(self):
+        """Número de apuestas pendientes de liquidar"""
+        return self._abiertas
+
+    def depositar(self, asiento, monto):
+        """
+        Agrega fondos al saldo de un asiento
+
+        Returns:
+            tuple: (bool, mensaje)
+        """
+        if not 0 <= asiento < len(self.saldos):
+            return False, f"Asiento inválido: {asiento}"
+        centavos = a_centavos(monto)
+        if centavos <= 0:
+            return False, "El depósito debe ser positivo"
+        if int(self.saldos[asiento]) + centavos > MAXIMO_CENTAVOS:
+            return False, f"El saldo del asiento {asiento} superaría el máximo"
+        self.saldos[asiento] += centavos
+        return True, f"Asiento {asiento}: saldo {desde_centavos(self.saldos[asiento])}"
+
+    def _puede_apostar(self):
+        return self.juego is None or self.juego.estado == "inicio"
+
+    def _reservar(self, cantidad):
+        """Asegura espacio para `cantidad` apuestas más"""
+        necesario = self._abiertas + cantidad
+        if necesario <= len(self._monto):
+            return
+        capacidad = max(necesario, 2 * len(self._monto))
+        for nombre in ["_asiento", "_tipo", "_monto"]:
+            viejo = getattr(self, nombre)
+            nuevo = np.empty(capacidad, dtype=viejo.dtype)
+            nuevo[:self._abiertas] = viejo[:self._abiertas]
+            setattr(self, nombre, nuevo)
+
+    def apostar(self, asiento, tipo, monto):
+        """
+        Registra una apuesta para la próxima ronda
+
+        Args:
+            asiento: Índice del asiento
+            tipo: Uno de TIPOS_APUESTA
+            monto: Monto apostado
+
+        Returns:
+            tuple: (bool, mensaje)
+        """
+        if not self._puede_apostar():
+            return False, "Las apuestas están cerradas durante el reparto"
+        if tipo not in _CODIGO_TIPO:
+            return False, f"Tipo de apuesta inválido: {tipo}"
+        if not 0 <= asiento < len(self.saldos):
+            return False, f"Asiento inválido: {asiento}"
+        centavos = a_centavos(monto)
+        if centavos <= 0:
+            return False, "El monto debe ser positivo"
+        if self.saldos[asiento] < centavos:
+            return False, f"Saldo insuficiente en asiento {asiento}"
+
+        self._reservar(1)
+        i = self._abiertas
+        self._asiento[i] = asiento
+        self._tipo[i] = _CODIGO_TIPO[tipo]
+        self._monto[i] = centavos
+        self._abiertas += 1
+        self.saldos[asiento] -= centavos
+        return True, f"Asiento {asiento}: {desde_centavos(centavos)} a {tipo}"
+
+    def apostar_lote(self, asientos, tipos, montos_centavos):
+        """
+        Registra muchas apuestas de una vez (todas o ninguna)
+
+        Args:
+            asientos: Secuencia de índices de asiento
+            tipos: Secuencia de tipos (texto de TIPOS_APUESTA o código entero)
+            montos_centavos: Secuencia de montos en centavos
+
+        Returns:
+            tuple: (bool, mensaje)
+        """
+        if not self._puede_apostar():
+            return False, "Las apuestas están cerradas durante el reparto"
+
+        asientos = np.asarray(asientos, dtype=np.int64)
+        montos = np.asarray(montos_centavos, dtype=np.int64)
+        try:
+            codigos = np.asarray([_CODIGO_TIPO[t] if isinstance(t, str) else int(t) for t in tipos],
+                                 dtype=np.int64)
+        except KeyError as e:
+            return False, f"Tipo de apuesta inválido: {e.args[0]}"
+
+        if not (len(asientos) == len(codigos) == len(montos)):
+            return False, "Las secuencias del lote tienen distinto largo"
+        if len(montos) == 0:
+            return True, "Lote vacío"
+        if asientos.min() < 0 or asientos.max() >= len(self.saldos):
+            return False, "Lote con asientos inválidos"
+        if codigos.min() < 0 or codigos.max() >= len(TIPOS_APUESTA):
+            return False, "Lote con tipos de apuesta inválidos"
+        if montos.min() <= 0:
+            return False, "Lote con montos no positivos"
+        if montos.max() > MAXIMO_CENTAVOS:
+            return False, "Lote con montos fuera de rango"
+
+        total_por_asiento = np.zeros(len(self.saldos), dtype=np.int64)
+        np.add.at(total_por_asiento, asientos, montos)
+        if np.any(total_por_asiento > self.saldos):
+            return False, "Saldo insuficiente para el lote"
+
+        n = len(montos)
+        self._reservar(n)
+        fin = self._abiertas + n
+        self._asiento[self._abiertas:fin] = asientos
+        self._tipo[self._abiertas:fin] = codigos
+        self._monto[self._abiertas:fin] = montos
+        self._abiertas = fin
+        self.saldos -= total_por_asiento
+        return True, f"{n} apuestas registradas"
+
+    def liquidar(self, juego):
+        """
+        Liquida todas las apuestas abiertas según el resultado del juego
+
+        Args:
+            juego: Instancia de Baccarat con la ronda finalizada
+
+        Returns:
+            dict: Resumen de la liquidación (montos en centavos)
+        """
+        n = self._abiertas
+        tipos = self._tipo[:n]
+        montos = self._monto[:n]
+        asientos = self._asiento[:n]
+
+        # Resultado neto por tipo para esta ronda (puntos básicos)
+        tabla = self._tabla_ganador[juego.ganador].copy()
+        for tipo, mano in [("par_jugador", juego.mano_jugador), ("par_banca", juego.mano_banca)]:
+            if len(mano) >= 2 and mano[0]["valor"] == mano[1]["valor"]:
+                tabla[_CODIGO_TIPO[tipo]] = self._pago_par[tipo]
+
+        # montos * pago // ESCALA_PAGO sin desbordar int64 con pagos de 11:1
+        # (110000 puntos básicos): se parte el monto en múltiplos de la escala y resto
+        pagos = tabla[tipos]
+        enteros, resto = np.divmod(montos, ESCALA_PAGO)
+        netos = enteros * pagos + resto * pagos // ESCALA_PAGO
+        np.add.at(self.saldos, asientos, montos + netos)
+
+        ganan_banca = (tipos == _CODIGO_TIPO["banca"]) & (netos > 0)
+        comision = int(montos[ganan_banca].sum() - netos[ganan_banca].sum())
+
+        self.ultima_liquidacion = {
+            "ganador": juego.ganador,
+            "apuestas": n,
+            "total_apostado": int(montos.sum()),
+            "neto_jugadores": int(netos.sum()),
+            "comision": comision,
+        }
+        self._abiertas = 0
+        return self.ultima_liquidacion
@@ -0,0 +1,264 @@
+import collections
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+import registro
+
+log = logging.getLogger("pakorat.auditoria")
+
+MAXIMO_PENDIENTES = 1000   # Eventos guardados a la espera del primer segmento
+SEGUNDOS_AVISO = 10.0      # Separación mínima entre avisos de frames descartados
+
+
+class GrabadorAuditoria:
+    """
+    Graba la mesa (frames crudos o anotados) y las decisiones tomadas sobre
+    ella, para resolver disputas
+
+    publicar() solo copia el frame en un buffer libre y lo encola: un hilo
+    aparte codifica con cv2.VideoWriter en segmentos que rotan cada
+    `segundos_segmento`. Hay `capacidad` buffers; si el escritor se atrasa y
+    no queda ninguno libre, el frame se descarta (y se cuenta) en lugar de
+    frenar la detección.
+
+    Junto a cada video se escribe un JSONL con una línea por frame grabado
+    (posición en el video, número de frame de la cámara y hora) y los
+    eventos de ronda y de cartas en el orden en que ocurrieron, con el frame
+    de la cámara sobre el que se decidieron y la posición del video donde caen.
+
+    Si el video no se puede abrir (codec o carpeta inválidos) o el hilo
+    escritor falla, la grabación se desactiva: se avisa una vez y publicar()
+    y evento() pasan a no hacer nada.
+    """
+
+    def __init__(self, directorio, fps=15, segundos_segmento=300, capacidad=32,
+                 codec="mp4v", maximo_segmentos=None):
+        """
+        Args:
+            directorio: Carpeta de los segmentos (se crea si no existe)
+            fps: Frames por segundo grabados como máximo
+            segundos_segmento: Duración de cada archivo antes de rotar
+            capacidad: Frames pendientes de codificar antes de empezar a descartar
+            codec: FourCC de cv2.VideoWriter
+            maximo_segmentos: Segmentos que se conservan (los más viejos se borran); None = todos
+        """
+        self.directorio = directorio
+        self.fps = fps
+        self.intervalo = 1.0 / fps
+        self.frames_por_segmento = int(fps * segundos_segmento)
+        self.capacidad = capacidad
+        self.codec = codec
+        self.maximo_segmentos = maximo_segmentos
+
+        self.grabados = 0
+        self.descartados = 0
+        self.segmentos = []  # Rutas de video, de la más vieja a la más nueva
+        self.activo = True   # False tras un fallo del escritor
+
+        self._cola = queue.Queue()   # Frames y eventos en orden; los frames acotados por _libres
+        self._libres = queue.Queue()
+        self._buffers = 0
+        self._forma = None
+        self._proximo = 0.0
+        self._hilo = None
+        self._aviso = None  # Último aviso de frames descartados (monotonic)
+        self._avisados = 0
+
+        self._video = None
+        self._forma_video = None
+        self._eventos = None
+        self._posicion = 0
+        self._numero = 0  # Número del próximo segmento (no se reutiliza al podar)
+
+    def iniciar(self):
+        """Crea la carpeta y arranca el hilo escritor"""
+        os.makedirs(self.directorio, exist_ok=True)
+        self._hilo = threading.Thread(target=self._escribir, name="auditoria", daemon=True)
+        self._hilo.start()
+        log.info("🎥 grabando la mesa en %s", self.directorio)
+        return self
+
+    def vincular(self, juego):
+        """Registra las transiciones del juego como eventos"""
+        juego.agregar_observador(self._al_evento)
+
+    def _al_evento(self, evento, juego):
+        datos = {"estado": juego.estado}
+        if evento in ("carta_jugador", "carta_banca", "finalizado"):
+            datos.update(mano_jugador=list(juego.mano_jugador), mano_banca=list(juego.mano_banca),
+                         puntos_jugador=juego.puntos_jugador, puntos_banca=juego.puntos_banca)
+        if evento == "finalizado":
+            datos["ganador"] = juego.ganador
+        self.evento(evento, **datos)
+
+    def evento(self, tipo, **datos):
+        """Agrega un evento a la grabación (solo se pierde si la grabación está desactivada)"""
+        if not self.activo:
+            return
+        datos.update(tipo=tipo, t=time.time(), frame=registro.contexto["frame"],
+                     ronda=registro.contexto["ronda"])
+        self._cola.put(("evento", datos))
+
+    def publicar(self, frame, id_frame=None):
+        """
+        Ofrece un frame a la grabación (no bloquea)
+
+        Args:
+            frame: Frame a grabar (se copia)
+            id_frame: Número de frame de la cámara (default el del contexto de registro)
+
+        Returns:
+            bool: True si el frame se encoló
+        """
+        if not self.activo:
+            return False
+        ahora = time.monotonic()
+        if ahora < self._proximo:
+            return False
+        # Sigue la grilla de `fps` (el jitter de la cámara no baja el ritmo); tras
+        # un corte se re-ancla a ahora + intervalo, sin grabar dos frames en un
+        # mismo intervalo: el video tiene fps fijos y se reproduciría acelerado
+        self._proximo += self.intervalo
+        if self._proximo <= ahora:
+            self._proximo = ahora + self.intervalo
+
+        if frame.shape != self._forma:
+            self._preparar_buffers(frame.shape)
+        try:
+            buffer = self._libres.get_nowait()
+        except queue.Empty:
+            if self._buffers < self.capacidad:
+                buffer = np.empty(frame.shape, dtype=np.uint8)
+                self._buffers += 1
+            else:
+                self.descartados += 1
+                self._avisar_descarte(ahora)
+                return False
+
+        np.copyto(buffer, frame)
+        if id_frame is None:
+            id_frame = registro.contexto["frame"]
+        self._cola.put(("frame", buffer, id_frame, time.time()))
+        return True
+
+    def _avisar_descarte(self, ahora):
+        """Avisa de los frames descartados como mucho cada SEGUNDOS_AVISO"""
+        if self._aviso is not None and ahora - self._aviso < SEGUNDOS_AVISO:
+            return
+        log.warning("🎥 grabación atrasada: %d frame(s) descartado(s)", self.descartados - self._avisados)
+        self._aviso = ahora
+        self._avisados = self.descartados
+
+    def _preparar_buffers(self, forma):
+        """Con otro tamaño de frame los buffers libres ya no sirven (los ocupados no vuelven)"""
+        self._forma = forma
+        self._buffers = 0
+        while True:
+            try:
+                self._libres.get_nowait()
+            except queue.Empty:
+                break
+
+    def _abrir_segmento(self, forma):
+        self._cerrar_segmento()
+        nombre = time.strftime("mesa_%Y%m%d-%H%M%S") + f"_{self._numero:04d}"
+        ruta = os.path.join(self.directorio, nombre + ".mp4")
+        alto, ancho = forma[:2]
+        self._video = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*self.codec), self.fps, (ancho, alto))
+        if not self._video.isOpened():
+            self._video = None
+            raise OSError(f"no se pudo abrir {ruta} con el codec {self.codec}")
+        self._eventos = open(os.path.join(self.directorio, nombre + ".jsonl"), "w", encoding="utf-8")
+        self._escribir_linea({"tipo": "segmento", "t": time.time(), "video": nombre + ".mp4",
+                              "fps": self.fps, "ancho": ancho, "alto": alto,
+                              "mesa": registro.contexto["mesa"]})
+        self._posicion = 0
+        self._numero += 1
+        self.segmentos.append(ruta)
+        self._podar()
+
+    def _cerrar_segmento(self):
+        if self._video is not None:
+            self._video.release()
+            self._video = None
+        if self._eventos is not None:
+            self._eventos.close()
+            self._eventos = None
+
+    def _podar(self):
+        """Borra los segmentos más viejos si hay más que maximo_segmentos"""
+        if not self.maximo_segmentos:
+            return
+        while len(self.segmentos) > self.maximo_segmentos:
+            viejo = self.segmentos.pop(0)
+            for ruta in (viejo, viejo[:-4] + ".jsonl"):
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    pass
+
+    def _escribir_linea(self, datos):
+        self._eventos.write(json.dumps(datos, ensure_ascii=False, default=str) + "\n")
+
+    def _escribir(self):
+        """Hilo escritor; si falla, desactiva la grabación en lugar de morir en silencio"""
+        try:
+            self._escribir_cola()
+        except Exception:
+            self.activo = False
+            log.exception("🎥 falló la grabación de la mesa; grabación desactivada")
+        finally:
+            self._cerrar_segmento()
+
+    def _escribir_cola(self):
+        """Codifica frames y escribe eventos en el orden de la cola"""
+        pendientes = collections.deque(maxlen=MAXIMO_PENDIENTES)  # Eventos antes del primer segmento
+        while True:
+            item = self._cola.get()
+            if item is None:
+                break
+
+            if item[0] == "evento":
+                datos = item[1]
+                if self._eventos is None:
+                    pendientes.append(datos)
+                    continue
+                datos["posicion"] = self._posicion  # Cae antes del próximo frame grabado
+                self._escribir_linea(datos)
+                self._eventos.flush()
+                continue
+
+            _, buffer, id_frame, t = item
+            if (self._video is None or self._posicion >= self.frames_por_segmento
+                    or self._forma_video != buffer.shape):
+                self._forma_video = buffer.shape
+                self._abrir_segmento(buffer.shape)
+                for datos in pendientes:
+                    datos["posicion"] = 0
+                    self._escribir_linea(datos)
+                pendientes.clear()
+            self._video.write(buffer)
+            self._escribir_linea({"tipo": "frame", "posicion": self._posicion, "frame": id_frame, "t": t})
+            self._posicion += 1
+            self.grabados += 1
+            if buffer.shape == self._forma:
+                self._libres.put(buffer)
+
+    def cerrar(self):
+        """Termina de escribir lo encolado y cierra el segmento actual"""
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join()
+        self._hilo = None
+        resumen = f"🎥 grabación: {self.grabados} frames en {len(self.segmentos)} segmento(s)"
+        if self.descartados:
+            resumen += f", {self.descartados} descartados por atraso"
+        if not self.activo:
+            resumen += " (desactivada por un fallo)"
+        log.info(resumen, extra={"grabados": self.grabados, "descartados": self.descartados})
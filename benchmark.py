@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import sys
+import time
+import cv2
+import numpy as np
+from detector_cartas import DetectorCartas
+from juego_baccarat import Baccarat
+from interfaz import InterfazBaccarat
+from generar_dataset import GeneradorDataset
+
+RESOLUCIONES = [(640, 360), (1280, 720), (1920, 1080)]
+ARCHIVO_BASE = "benchmark_base.json"
+SEMILLA = 7  # Entradas fijas: mismo frame sintético en cada corrida
+
+# Ronda fija de 6 cartas: jugador 1+2 (pide tercera), banca 3+2, tercera del
+# jugador 4 (la banca con 5 pide), tercera de la banca 5 -> jugador 7, banca 0
+RONDA = [
+    {"color": "rojo", "valor": 1}, {"color": "azul", "valor": 2},
+    {"color": "verde", "valor": 3}, {"color": "amarillo", "valor": 2},
+    {"color": "rojo", "valor": 4}, {"color": "azul", "valor": 5},
+]
+
+
+def _silencio():
+    """Descarta los prints del juego mientras se mide"""
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def medir(preparar, medir_paso, repeticiones=50, calentamiento=5):
+    """
+    Mide una función con preparación excluida del tiempo
+
+    Args:
+        preparar: Función sin argumentos que devuelve el estado de cada repetición
+        medir_paso: Función que recibe ese estado; solo ella se cronometra
+        repeticiones: Número de mediciones
+        calentamiento: Repeticiones previas descartadas
+
+    Returns:
+        dict: Mediana, p95, mínimo y media en milisegundos
+    """
+    tiempos = []
+    gc_activo = gc.isenabled()
+    gc.disable()  # Como timeit: el recolector no ensucia las mediciones
+    try:
+        for i in range(calentamiento + repeticiones):
+            estado = preparar()
+            inicio = time.perf_counter_ns()
+            medir_paso(estado)
+            duracion = time.perf_counter_ns() - inicio
+            if i >= calentamiento:
+                tiempos.append(duracion / 1e6)
+    finally:
+        if gc_activo:
+            gc.enable()
+
+    tiempos = np.array(tiempos)
+    return {
+        "mediana_ms": float(np.median(tiempos)),
+        "p95_ms": float(np.percentile(tiempos, 95)),
+        "min_ms": float(tiempos.min()),
+        "media_ms": float(tiempos.mean()),
+        "repeticiones": repeticiones,
+    }
+
+
+def _casos_resolucion(ancho, alto):
+    """Casos del detector y de la interfaz para una resolución de cámara"""
+    frame, etiqueta = GeneradorDataset(semilla=SEMILLA, ancho=ancho, alto=alto,
+                                       nivel="facil", proporcion_vacios=0).frame(0)
+    detector = DetectorCartas()
+    detector.mostrar_ventanas = False
+    rectangulos = detector.detectar_cartas_rectangulos(frame)
+    
+    # Búsqueda por franjas con todos los núcleos (al menos 2 hilos para medir el reparto)
+    detector_franjas = DetectorCartas()
+    detector_franjas.mostrar_ventanas = False
+    detector_franjas.usar_franjas(max(2, os.cpu_count() or 1))
+    bbox = rectangulos[0]["bbox"] if rectangulos else tuple(etiqueta["bbox"])
+    _, anotaciones = detector.detectar_cartas_anotaciones(frame)
+
+    # La ventana se ajusta a la resolución para que el panel quede proporcional
+    with _silencio():
+        interfaz = InterfazBaccarat(ancho_ventana=ancho + InterfazBaccarat.ANCHO_PANEL,
+                                    alto_ventana=alto)
+        interfaz.juego.iniciar_reparto()
+        interfaz.esperando_carta = True
+
+    sufijo = f"@{ancho}x{alto}"
+    sin_estado = lambda: None
+    return {
+        "detectar_cartas_rectangulos" + sufijo:
+            (sin_estado, lambda _: detector.detectar_cartas_rectangulos(frame)),
+        "detectar_cartas_rectangulos_franjas" + sufijo:
+            (sin_estado, lambda _: detector_franjas.detectar_cartas_rectangulos(frame)),
+        "detectar_qr_en_region" + sufijo:
+            (sin_estado, lambda _: detector.detectar_qr_en_region(frame, bbox)),
+        "detectar_cartas_completo" + sufijo:
+            (sin_estado, lambda _: detector.detectar_cartas_completo(frame)),
+        "dibujar_interfaz" + sufijo:
+            (sin_estado, lambda _: interfaz.dibujar_interfaz(frame, anotaciones)),
+    }
+
+
+def _casos_juego():
+    """Casos que no dependen de la resolución"""
+    with _silencio():
+        interfaz = InterfazBaccarat()
+
+    def preparar_interfaz():
+        with _silencio():
+            interfaz.nueva_ronda()
+            interfaz.barajar_zapato()
+            interfaz.iniciar_ronda()
+        return RONDA[0]
+
+    def procesar(carta):
+        with _silencio():
+            interfaz.procesar_carta_detectada(carta)
+
+    juego = Baccarat()
+
+    def ronda(_):
+        juego.reiniciar()
+        juego.iniciar_reparto()
+        for carta in RONDA:
+            necesita = juego._que_carta_necesita()
+            if necesita == "jugador":
+                juego.agregar_carta_jugador(carta)
+            elif necesita == "banca":
+                juego.agregar_carta_banca(carta)
+            else:
+                break
+
+    return {
+        "procesar_carta_detectada": (preparar_interfaz, procesar),
+        "ronda_baccarat": (lambda: None, ronda),
+    }
+
+
+def ejecutar_suite(resoluciones=RESOLUCIONES, repeticiones=50, filtro=None):
+    """
+    Corre todos los casos
+
+    Returns:
+        dict: Resultados por caso ("nombre@anchoxalto" para los que dependen de la resolución)
+    """
+    casos = _casos_juego()
+    for ancho, alto in resoluciones:
+        casos.update(_casos_resolucion(ancho, alto))
+
+    resultados = {}
+    for nombre, (preparar, paso) in casos.items():
+        if filtro and filtro not in nombre:
+            continue
+        resultados[nombre] = medir(preparar, paso, repeticiones=repeticiones)
+        print(f"  {nombre:<45} {resultados[nombre]['mediana_ms']:9.3f} ms "
+              f"(p95 {resultados[nombre]['p95_ms']:.3f})", file=sys.stderr)
+    return resultados
+
+
+def _entorno():
+    """Datos de la máquina guardados junto a la línea base"""
+    return {
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "hilos_opencv": cv2.getNumThreads(),
+        "maquina": platform.machine(),
+        "procesador": platform.processor(),
+        "nodo": platform.node(),
+    }
+
+
+def comparar(resultados, base, umbral=0.15, minimo_ms=0.05):
+    """
+    Compara contra la línea base usando la mediana
+
+    Args:
+        resultados: Resultados de esta corrida
+        base: Resultados guardados
+        umbral: Aumento relativo tolerado (0.15 = 15 %)
+        minimo_ms: Aumento absoluto por debajo del cual no se cuenta como regresión
+                   (los casos de microsegundos varían mucho entre corridas)
+
+    Returns:
+        list: (nombre, base_ms, actual_ms, cambio) de los casos que empeoraron más que el umbral
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        anterior = base.get(nombre)
+        if not anterior:
+            continue
+        cambio = actual["mediana_ms"] / anterior["mediana_ms"] - 1
+        regresion = cambio > umbral and actual["mediana_ms"] - anterior["mediana_ms"] > minimo_ms
+        marca = "❌" if regresion else ("🚀" if cambio < -umbral else "  ")
+        print(f"{marca} {nombre:<45} {anterior['mediana_ms']:9.3f} -> "
+              f"{actual['mediana_ms']:9.3f} ms ({cambio:+.1%})")
+        if regresion:
+            regresiones.append((nombre, anterior["mediana_ms"], actual["mediana_ms"], cambio))
+    return regresiones
+
+
+def _parsear_resoluciones(texto):
+    return [tuple(int(n) for n in r.lower().split("x")) for r in texto.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks de los caminos críticos de Pakkorat")
+    parser.add_argument("--base", default=ARCHIVO_BASE, help="Archivo JSON de la línea base")
+    parser.add_argument("--guardar", action="store_true", help="Guarda esta corrida como línea base")
+    parser.add_argument("--umbral", type=float, default=0.15,
+                        help="Regresión tolerada sobre la mediana (0.15 = 15 %%)")
+    parser.add_argument("--minimo-ms", type=float, default=0.05,
+                        help="Aumento absoluto mínimo para contar una regresión")
+    parser.add_argument("--repeticiones", type=int, default=50)
+    parser.add_argument("--resoluciones", default=",".join(f"{a}x{h}" for a, h in RESOLUCIONES),
+                        help="Lista separada por comas, p. ej. 640x360,1280x720")
+    parser.add_argument("--filtro", default=None, help="Solo los casos que contengan este texto")
+    parser.add_argument("--json", default=None, help="Escribe los resultados de esta corrida")
+    args = parser.parse_args()
+
+    print("⏱️  midiendo...", file=sys.stderr)
+    resultados = ejecutar_suite(_parsear_resoluciones(args.resoluciones),
+                                repeticiones=args.repeticiones, filtro=args.filtro)
+    corrida = {"entorno": _entorno(), "resultados": resultados}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(corrida, f, indent=2)
+
+    if args.guardar:
+        with open(args.base, "w", encoding="utf-8") as f:
+            json.dump(corrida, f, indent=2)
+        print(f"✅ línea base guardada en {args.base}")
+        sys.exit(0)
+
+    if not os.path.exists(args.base):
+        print(f"no hay línea base ({args.base}); usa --guardar para crearla")
+        sys.exit(0)
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    if base.get("entorno", {}).get("nodo") != corrida["entorno"]["nodo"]:
+        print("⚠️  la línea base se midió en otra máquina; las comparaciones son orientativas")
+
+    regresiones = comparar(resultados, base["resultados"], umbral=args.umbral,
+                           minimo_ms=args.minimo_ms)
+    if regresiones:
+        print(f"\n❌ {len(regresiones)} caso(s) más lentos que la línea base (umbral {args.umbral:.0%})")
+        sys.exit(1)
+    print(f"\n✅ sin regresiones (umbral {args.umbral:.0%})")
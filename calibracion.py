@@ -0,0 +1,402 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode
+from detector_cartas import PARAMETROS_DEFECTO
+
+log = logging.getLogger("pakorat.calibracion")
+
+ARCHIVO_PERFILES = "perfiles_camara.json"
+
+# Valores que prueba la búsqueda (todas las combinaciones)
+UMBRALES = list(range(120, 241, 10))
+AREAS = [1000, 2000, 3000, 5000, 8000, 12000, 20000]
+VERTICES = [(4, 5), (4, 6), (4, 8)]
+ASPECTOS = [(0.4, 1.8), (0.5, 1.7), (0.55, 1.6)]  # Carta 0.64 de pie, 1.55 acostada
+
+
+def clave_camara(detector, frame):
+    """Identifica el perfil: fuente de video y resolución real de los frames"""
+    fuente = detector.ip_webcam_url or f"local:{detector.indice or 0}"
+    alto, ancho = frame.shape[:2]
+    return f"{fuente}@{ancho}x{alto}"
+
+
+def ubicar_qr(frame, carta=None):
+    """
+    Busca en el frame completo el QR de una carta (la referencia de la calibración)
+
+    Args:
+        frame: Frame de video
+        carta: dict {"color", "valor"} esperado, o None para aceptar cualquier carta
+
+    Returns:
+        tuple o None: bbox (x, y, w, h) del QR
+    """
+    for codigo in decode(frame):
+        try:
+            datos = json.loads(codigo.data.decode("utf-8"))
+        except (ValueError, UnicodeDecodeError):
+            continue
+        if not isinstance(datos, dict) or "color" not in datos or "valor" not in datos:
+            continue
+        if carta and (datos["color"], datos["valor"]) != (carta["color"], carta["valor"]):
+            continue
+        r = codigo.rect
+        return (r.left, r.top, r.width, r.height)
+    return None
+
+
+def preparar_muestra(frame, carta=None):
+    """
+    Convierte un frame con una carta visible en una muestra de calibración
+
+    Returns:
+        tuple o None: (frame en grises con blur, bbox del QR), o None si el QR no se ve
+    """
+    qr = ubicar_qr(frame, carta)
+    if qr is None:
+        return None
+    gris = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.GaussianBlur(gris, (5, 5), 0), qr
+
+
+def _contiene(bbox, qr, margen=2):
+    x, y, w, h = bbox
+    qx, qy, qw, qh = qr
+    return (x - margen <= qx and y - margen <= qy
+            and qx + qw <= x + w + margen and qy + qh <= y + h + margen)
+
+
+def _tabla(muestras, umbral, area_piso):
+    """
+    Contornos de todas las muestras con un umbral, medidos igual que en
+    DetectorCartas.detectar_cartas_rectangulos
+
+    Returns:
+        numpy.ndarray: Filas (muestra, área, vértices, aspecto, contiene el QR)
+    """
+    filas = []
+    for i, (borroso, qr) in enumerate(muestras):
+        _, thresh = cv2.threshold(borroso, umbral, 255, cv2.THRESH_BINARY)
+        contornos, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        for contorno in contornos:
+            area = cv2.contourArea(contorno)
+            if area < area_piso:
+                continue
+            approx = cv2.approxPolyDP(contorno, 0.02 * cv2.arcLength(contorno, True), True)
+            x, y, w, h = cv2.boundingRect(approx)
+            filas.append((i, area, len(approx), w / h if h > 0 else 0,
+                          _contiene((x, y, w, h), qr)))
+    return np.array(filas, dtype=np.float64).reshape(-1, 5)
+
+
+def _puntuar(tabla, n, p):
+    """Recall, precisión y candidatos por frame de unos parámetros sobre una tabla"""
+    pasa = ((tabla[:, 1] >= p["area_minima"])
+            & (tabla[:, 2] >= p["vertices_min"]) & (tabla[:, 2] <= p["vertices_max"])
+            & (tabla[:, 3] > p["aspecto_min"]) & (tabla[:, 3] < p["aspecto_max"]))
+    candidatos = tabla[pasa]
+    correctos = candidatos[:, 4] > 0
+    return {
+        "recall": round(len(np.unique(candidatos[correctos, 0])) / n, 4),
+        "precision": round(float(correctos.mean()), 4) if len(candidatos) else 0.0,
+        "candidatos_por_frame": round(len(candidatos) / n, 3),
+        "falsos_por_frame": round(int((~correctos).sum()) / n, 3),
+    }
+
+
+def evaluar_parametros(muestras, parametros):
+    """
+    Mide unos parámetros sobre muestras de preparar_muestra
+
+    Returns:
+        dict: recall (frames con un candidato que contiene el QR), precision
+              (candidatos correctos / candidatos), candidatos_por_frame
+              (llamadas a pyzbar por frame) y falsos_por_frame (las inútiles)
+    """
+    tabla = _tabla(muestras, parametros["umbral"], parametros["area_minima"])
+    return _puntuar(tabla, len(muestras), parametros)
+
+
+def calibrar(muestras, recall_minimo=0.95):
+    """
+    Busca los parámetros con mejor precisión de candidatos al menor costo
+
+    Entre las combinaciones que llegan a recall_minimo (o al mejor recall
+    posible, si ninguna llega) gana la de mayor precisión; a igualdad, la que
+    genera menos candidatos falsos por frame (llamadas a pyzbar que no
+    encuentran nada), luego la de más recall y luego la más parecida a
+    PARAMETROS_DEFECTO. Los contornos se calculan una vez por
+    umbral y el resto de parámetros se filtra sobre esa tabla.
+
+    Args:
+        muestras: Lista de preparar_muestra
+        recall_minimo: Fracción de frames donde la carta debe seguir siendo candidata
+
+    Returns:
+        tuple: (parametros, metricas)
+    """
+    n = len(muestras)
+    resultados = []
+    for umbral in UMBRALES:
+        tabla = _tabla(muestras, umbral, min(AREAS))
+        for area in AREAS:
+            for vertices_min, vertices_max in VERTICES:
+                for aspecto_min, aspecto_max in ASPECTOS:
+                    p = {"umbral": umbral, "area_minima": area,
+                         "vertices_min": vertices_min, "vertices_max": vertices_max,
+                         "aspecto_min": aspecto_min, "aspecto_max": aspecto_max}
+                    resultados.append((p, _puntuar(tabla, n, p)))
+
+    objetivo = min(recall_minimo, max(m["recall"] for _, m in resultados))
+    return max(((p, m) for p, m in resultados if m["recall"] >= objetivo),
+               key=lambda r: (r[1]["precision"], -r[1]["falsos_por_frame"],
+                              r[1]["recall"], -_distancia_defecto(r[0])))
+
+
+def _distancia_defecto(p):
+    """Cuánto se alejan unos parámetros de PARAMETROS_DEFECTO (desempata hacia lo conocido)"""
+    d = PARAMETROS_DEFECTO
+    return (abs(p["umbral"] - d["umbral"]) / 255
+            + abs(np.log(p["area_minima"] / d["area_minima"]))
+            + abs(p["vertices_max"] - d["vertices_max"]) / 4
+            + abs(p["aspecto_min"] - d["aspecto_min"]) + abs(p["aspecto_max"] - d["aspecto_max"]))
+
+
+class PerfilesCamara:
+    """Perfiles de calibración por cámara guardados en un JSON"""
+
+    def __init__(self, archivo=ARCHIVO_PERFILES):
+        self.archivo = archivo
+        self.perfiles = {}
+        if archivo and os.path.exists(archivo):
+            try:
+                with open(archivo, encoding="utf-8") as f:
+                    self.perfiles = json.load(f)
+            except (OSError, ValueError) as e:
+                log.warning("⚠️  no se pudieron leer los perfiles de cámara: %s", e)
+
+    def obtener(self, clave):
+        return self.perfiles.get(clave)
+
+    def guardar(self, clave, parametros, metricas, muestras):
+        """Guarda (de forma atómica) el perfil de una cámara y lo devuelve"""
+        perfil = {"parametros": parametros, "metricas": metricas, "muestras": muestras,
+                  "fecha": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self.perfiles[clave] = perfil
+        temporal = self.archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(self.perfiles, f, indent=2, ensure_ascii=False)
+        os.replace(temporal, self.archivo)
+        return perfil
+
+
+class ValidadorPerfil:
+    """
+    Carga el perfil de la cámara con el primer frame y lo re-valida cada
+    `intervalo` segundos
+
+    Guarda copias de algunos frames: los de cartas aceptadas y, de vez en
+    cuando, frames sin lectura (si el QR se ve en el frame completo, es una
+    carta que los parámetros perdieron). La re-validación corre en un hilo;
+    si el recall o la precisión empeoraron, recalibra con esos frames y
+    guarda el perfil nuevo. Sin perfil guardado no hace nada: primero hay
+    que calibrar con `python calibracion.py`.
+    """
+
+    def __init__(self, detector, perfiles, intervalo=300.0, maximo_muestras=16,
+                 cada_sin_lectura=5.0, recall_minimo=0.9, tolerancia=0.15):
+        """
+        Args:
+            detector: DetectorCartas cuyos parámetros se ajustan
+            perfiles: PerfilesCamara
+            intervalo: Segundos entre re-validaciones
+            maximo_muestras: Frames recientes que se conservan
+            cada_sin_lectura: Segundos mínimos entre copias de frames sin lectura
+            recall_minimo: Recall por debajo del cual se recalibra
+            tolerancia: Caída de precisión respecto al perfil que dispara la recalibración
+        """
+        self.detector = detector
+        self.perfiles = perfiles
+        self.intervalo = intervalo
+        self.cada_sin_lectura = cada_sin_lectura
+        self.recall_minimo = recall_minimo
+        self.tolerancia = tolerancia
+        self.clave = None
+        self.perfil = None
+        self.ultima_validacion = None
+        self._recientes = deque(maxlen=maximo_muestras)
+        self._proxima = time.monotonic() + intervalo
+        self._proxima_sin_lectura = 0.0
+        self._hilo = None
+
+    def preparar(self, frame):
+        """Con el primer frame (ya se conoce la resolución) aplica el perfil guardado"""
+        if self.clave is not None:
+            return
+        self.clave = clave_camara(self.detector, frame)
+        self.perfil = self.perfiles.obtener(self.clave)
+        if self.perfil:
+            self.detector.parametros = {**PARAMETROS_DEFECTO, **self.perfil["parametros"]}
+            log.info("📐 perfil de cámara cargado (%s)", self.clave,
+                     extra={"parametros": self.detector.parametros})
+        else:
+            # Los perfiles van por fuente y resolución: uno calibrado a otro tamaño no sirve
+            otros = [clave for clave in self.perfiles.perfiles if clave.split("@")[0] == self.clave.split("@")[0]]
+            log.warning("📐 no hay perfil de cámara para %s; se usan los parámetros por defecto%s", self.clave,
+                        f" (hay para {', '.join(otros)})" if otros else "")
+
+    def observar(self, frame, carta):
+        """
+        Llamar con cada frame evaluado
+
+        Args:
+            frame: Frame de video
+            carta: Carta aceptada en este frame, o None si no hubo lectura
+        """
+        if self.perfil is None:
+            return
+        if carta is None:
+            ahora = time.monotonic()
+            if ahora < self._proxima_sin_lectura:
+                return
+            self._proxima_sin_lectura = ahora + self.cada_sin_lectura
+        self._recientes.append((frame.copy(), carta))
+
+    def revisar_si_toca(self):
+        """Lanza la re-validación en segundo plano si ya pasó el intervalo (llamar por frame)"""
+        if self.perfil is None or time.monotonic() < self._proxima:
+            return
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._proxima = time.monotonic() + self.intervalo
+        self._hilo = threading.Thread(target=self._revalidar, args=(list(self._recientes),),
+                                      name="revalidar-perfil", daemon=True)
+        self._hilo.start()
+
+    def _revalidar(self, recientes):
+        muestras = [m for m in (preparar_muestra(f, c) for f, c in recientes) if m is not None]
+        if len(muestras) < 3:
+            return
+        actual = evaluar_parametros(muestras, self.detector.parametros)
+        self.ultima_validacion = actual
+        precision_perfil = self.perfil["metricas"]["precision"]
+        if actual["recall"] >= self.recall_minimo and actual["precision"] >= precision_perfil - self.tolerancia:
+            log.info("📐 perfil de cámara vigente", extra={"validacion": actual})
+            return
+
+        parametros, metricas = calibrar(muestras, self.recall_minimo)
+        if (metricas["recall"], metricas["precision"]) <= (actual["recall"], actual["precision"]):
+            return
+        self.detector.parametros = parametros
+        self.perfil = self.perfiles.guardar(self.clave, parametros, metricas, len(muestras))
+        log.warning("📐 perfil de cámara recalibrado (recall %.2f -> %.2f, precisión %.2f -> %.2f)",
+                    actual["recall"], metricas["recall"], actual["precision"], metricas["precision"],
+                    extra={"parametros": parametros})
+
+
+def _muestras_dataset(directorio, maximo):
+    """Muestras desde un corpus de generar_dataset.py (solo frames con carta)"""
+    from generar_dataset import cargar_etiquetas
+
+    muestras = []
+    clave = None
+    for etiqueta in cargar_etiquetas(directorio):
+        if etiqueta["carta"] is None:
+            continue
+        frame = cv2.imread(os.path.join(directorio, etiqueta["archivo"]))
+        clave = clave or f"dataset:{os.path.basename(os.path.normpath(directorio))}@{frame.shape[1]}x{frame.shape[0]}"
+        muestra = preparar_muestra(frame, etiqueta["carta"])
+        if muestra is not None:
+            muestras.append(muestra)
+            if len(muestras) >= maximo:
+                break
+    return muestras, clave
+
+
+def _muestras_camara(detector, maximo, carta, ventana):
+    """Muestras desde la cámara: se guardan los frames donde el QR de la carta se ve"""
+    muestras = []
+    clave = None
+    print(f"\n🃏 muestra la carta {'indicada' if carta else 'que quieras'} en distintas posiciones "
+          f"de la mesa ({maximo} muestras, Q para terminar antes)")
+    while len(muestras) < maximo:
+        ret, frame = detector.obtener_frame()
+        if not ret or frame is None:
+            continue
+        clave = clave or clave_camara(detector, frame)
+        muestra = preparar_muestra(frame, carta)
+        if muestra is not None:
+            muestras.append(muestra)
+            print(f"   muestra {len(muestras)}/{maximo}")
+            time.sleep(0.2)  # Da tiempo a mover la carta entre muestras
+        if ventana:
+            cv2.imshow("Calibracion", frame)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    return muestras, clave
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibra los umbrales de detección de cartas por cámara")
+    parser.add_argument("--camara", default="local", help='"local" o la URL de IP Webcam')
+    parser.add_argument("--indice", type=int, default=0, help="Índice de la cámara local")
+    parser.add_argument("--ancho", type=int, default=None,
+                        help="Ancho pedido a la cámara (el del área de video del juego; default 550, "
+                             "o la resolución nativa con --sin-ventana)")
+    parser.add_argument("--alto", type=int, default=None, help="Alto pedido a la cámara (default 480)")
+    parser.add_argument("--carta", default=None, help='Carta conocida como "rojo:7" (por defecto cualquiera)')
+    parser.add_argument("--muestras", type=int, default=30, help="Frames con la carta visible")
+    parser.add_argument("--recall", type=float, default=0.95, help="Recall mínimo exigido")
+    parser.add_argument("--perfiles", default=ARCHIVO_PERFILES, help="Archivo de perfiles")
+    parser.add_argument("--dataset", default=None, help="Calibrar con un corpus de generar_dataset.py")
+    parser.add_argument("--sin-ventana", action="store_true",
+                        help="No mostrar la cámara (perfil para sin_pantalla.py, a resolución nativa)")
+    parser.add_argument("--no-guardar", action="store_true", help="Solo mostrar el resultado")
+    args = parser.parse_args()
+
+    carta = None
+    if args.carta:
+        color, valor = args.carta.split(":")
+        carta = {"color": color, "valor": int(valor)}
+
+    if args.dataset:
+        muestras, clave = _muestras_dataset(args.dataset, args.muestras)
+    else:
+        from detector_cartas import DetectorCartas
+        detector = DetectorCartas(None if args.camara == "local" else args.camara)
+        # sin_pantalla.py no pide resolución: su perfil se calibra con la nativa
+        resolucion = None
+        if args.ancho or args.alto or not args.sin_ventana:
+            resolucion = (args.ancho or 550, args.alto or 480)
+        if not detector.conectar_camara(resolucion=resolucion, indice=args.indice):
+            print("❌ No se pudo conectar a la cámara")
+            exit(1)
+        try:
+            muestras, clave = _muestras_camara(detector, args.muestras, carta, not args.sin_ventana)
+        finally:
+            detector.liberar()
+
+    if len(muestras) < 3:
+        print("❌ muy pocas muestras con el QR visible para calibrar")
+        exit(1)
+
+    inicio = time.perf_counter()
+    parametros, metricas = calibrar(muestras, args.recall)
+    antes = evaluar_parametros(muestras, PARAMETROS_DEFECTO)
+    print(f"\n📐 {clave}: {len(muestras)} muestras, búsqueda en {time.perf_counter() - inicio:.1f} s")
+    print(f"   {'':<12}{'recall':>8}{'precisión':>11}{'cand/frame':>12}")
+    for nombre, m in (("por defecto", antes), ("calibrado", metricas)):
+        print(f"   {nombre:<12}{m['recall']:>8.2f}{m['precision']:>11.2f}{m['candidatos_por_frame']:>12.2f}")
+    print("   " + json.dumps(parametros))
+
+    if not args.no_guardar:
+        PerfilesCamara(args.perfiles).guardar(clave, parametros, metricas, len(muestras))
+        print(f"✅ perfil guardado en {args.perfiles}")
@@ -0,0 +1,177 @@
+import logging
+import random
+import threading
+import time
+
+log = logging.getLogger("pakorat.camara")
+
+# Estados de salud de la cámara
+CONECTANDO = "conectando"   # Todavía no hubo una conexión
+CONECTADA = "conectada"     # Llegan frames con normalidad
+DEGRADADA = "degradada"     # Fallos aislados o frames atrasados
+PERDIDA = "perdida"         # Sin cámara: reconectando en segundo plano
+DETENIDA = "detenida"
+
+
+class GestorCamara:
+    """
+    Mantiene la cámara conectada desde un hilo propio
+
+    El hilo lee frames con DetectorCartas.obtener_frame y guarda el último;
+    el bucle del juego solo lo recoge (esperando como mucho unos
+    milisegundos), así que una petición HTTP lenta o un corte de Wi-Fi nunca
+    congela la interfaz. Tras varios fallos seguidos la cámara pasa a
+    "perdida" y se reconecta con espera exponencial y jitter; en cámara local
+    se prueban también los otros índices de hardware.
+    """
+
+    def __init__(self, detector, resolucion=None, indices=(0, 1, 2), fallos_para_perdida=3,
+                 segundos_para_perdida=2.0, espera_inicial=0.25, espera_maxima=4.0):
+        """
+        Args:
+            detector: DetectorCartas (puede venir ya conectado)
+            resolucion: Tupla (ancho, alto) que se pide al reconectar
+            indices: Índices de cámara local a probar, en orden
+            fallos_para_perdida: Lecturas fallidas seguidas para dar la cámara por perdida
+            segundos_para_perdida: Segundos sin frames para dar la cámara por perdida
+            espera_inicial: Primera espera entre reintentos (segundos)
+            espera_maxima: Tope de la espera entre reintentos (segundos)
+        """
+        self.detector = detector
+        self.resolucion = resolucion
+        self.indices = list(indices)
+        self.fallos_para_perdida = fallos_para_perdida
+        self.segundos_para_perdida = segundos_para_perdida
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+
+        self.estado = CONECTADA if detector.conectada else CONECTANDO
+        self.intentos = 0                 # Reintentos de conexión desde la última pérdida
+        self.proximo_intento = None       # time.monotonic() del siguiente reintento
+        self.marca = None                 # Marca de tiempos del último frame entregado
+        self._indice = self.indices[0] if self.indices else 0
+
+        self._condicion = threading.Condition()
+        self._frame = None
+        self._marca_frame = None
+        self._seq = 0
+        self._entregado = 0
+        self._ultimo_frame = time.monotonic()
+        self._fallos = 0
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Arranca el hilo de captura"""
+        self._hilo = threading.Thread(target=self._bucle, name="camara", daemon=True)
+        self._hilo.start()
+        return self
+
+    @property
+    def segundos_sin_frame(self):
+        return time.monotonic() - self._ultimo_frame
+
+    @property
+    def saludable(self):
+        """True mientras la cámara se considera conectada (aunque esté degradada)"""
+        if self.estado in (CONECTANDO, PERDIDA, DETENIDA):
+            return False
+        return self.segundos_sin_frame < self.segundos_para_perdida
+
+    def obtener_frame(self, timeout=0.05):
+        """
+        Entrega el frame más reciente que no se haya entregado todavía
+
+        Args:
+            timeout: Espera máxima por un frame nuevo (segundos)
+
+        Returns:
+            tuple: (ret, frame); la marca de tiempos queda en self.marca
+        """
+        with self._condicion:
+            if self._seq == self._entregado:
+                self._condicion.wait(timeout)
+            if self._seq == self._entregado:
+                return False, None
+            self._entregado = self._seq
+            self.marca = self._marca_frame
+            return True, self._frame
+
+    def _cambiar_estado(self, estado):
+        if estado == self.estado:
+            return
+        anterior, self.estado = self.estado, estado
+        if estado == PERDIDA:
+            log.warning("📷 cámara perdida: reconectando en segundo plano")
+        elif estado == CONECTADA and anterior in (PERDIDA, CONECTANDO):
+            log.info("📷 cámara conectada")
+        elif estado == DEGRADADA:
+            log.info("📷 cámara degradada (fallos de lectura)")
+
+    def _espera(self):
+        """Espera exponencial con jitter para el siguiente reintento"""
+        base = min(self.espera_maxima, self.espera_inicial * 2 ** self.intentos)
+        return random.uniform(base / 2, base)
+
+    def _conectar(self):
+        """Un intento de conexión; en cámara local recorre los índices empezando por el último bueno"""
+        if self.detector.ip_webcam_url:
+            return self.detector.conectar_camara(resolucion=self.resolucion)
+
+        orden = [self._indice] + [i for i in self.indices if i != self._indice]
+        for indice in orden:
+            if self.detector.conectar_camara(resolucion=self.resolucion, indice=indice):
+                if indice != self._indice:
+                    log.info("📷 usando la cámara local %d", indice)
+                self._indice = indice
+                return True
+            self.detector.liberar_captura()
+        return False
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            if not self.detector.conectada:
+                if self._conectar():
+                    self.intentos = 0
+                    self.proximo_intento = None
+                    self._fallos = 0
+                    self._cambiar_estado(CONECTADA)
+                else:
+                    espera = self._espera()
+                    self.intentos += 1
+                    self.proximo_intento = time.monotonic() + espera
+                    if self.estado == CONECTANDO and self.intentos == 1:
+                        log.warning("📷 no se pudo conectar a la cámara: reintentando")
+                    self._detener.wait(espera)
+                continue
+
+            ret, frame = self.detector.obtener_frame()
+            if ret and frame is not None:
+                with self._condicion:
+                    self._frame = frame
+                    self._marca_frame = self.detector.marca_frame
+                    self._seq += 1
+                    self._ultimo_frame = time.monotonic()
+                    self._condicion.notify_all()
+                self._fallos = 0
+                self._cambiar_estado(CONECTADA)
+                continue
+
+            self._fallos += 1
+            if (self._fallos >= self.fallos_para_perdida
+                    or self.segundos_sin_frame >= self.segundos_para_perdida):
+                self.detector.liberar_captura()
+                self._cambiar_estado(PERDIDA)
+            else:
+                self._cambiar_estado(DEGRADADA)
+                self._detener.wait(0.02)  # Evita girar en vacío si el driver falla al instante
+
+    def cerrar(self):
+        """Detiene el hilo y libera la captura"""
+        self._detener.set()
+        with self._condicion:
+            self._condicion.notify_all()
+        if self._hilo is not None:
+            self._hilo.join(timeout=3)
+        self.estado = DETENIDA
+        self.detector.liberar_captura()
@@ -1,9 +1,33 @@
 import cv2
 import json
+import logging
+import os
+import time
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from pyzbar.pyzbar import decode
-import requests
-from io import BytesIO
+from metricas import Metricas
+
+log = logging.getLogger("pakorat.detector")
+POR_FRAME = {"por_frame": True}  # Registros sujetos a muestreo y límite de frecuencia
+# Timeouts (conexión, lectura) de IP Webcam: un corte de Wi-Fi se detecta en
+# menos de un segundo en vez de dejar la petición colgada
+TIMEOUT_CONEXION = (1.0, 2.0)
+TIMEOUT_FRAME = (0.5, 1.0)
+
+# Parámetros de detectar_cartas_rectangulos; calibracion.py los ajusta por cámara
+PARAMETROS_DEFECTO = {
+    "umbral": 200,          # Brillo mínimo del borde blanco
+    "area_minima": 5000,    # Área mínima del contorno (px)
+    "vertices_min": 4,      # Esquinas del polígono aproximado
+    "vertices_max": 6,
+    "aspecto_min": 0.4,     # Ancho / alto del rectángulo (cartas rotadas incluidas)
+    "aspecto_max": 1.8,
+}
+
+# Búsqueda por franjas (ver DetectorCartas.usar_franjas)
+PIXELES_FRANJAS = 1280 * 720  # Debajo de esto repartir cuesta más de lo que ahorra
+HALO_BLUR = 2                 # Filas vecinas que necesita el GaussianBlur 5x5
 
 class DetectorCartas:
     """Detector de cartas UNO mediante códigos QR"""
@@ -17,68 +41,176 @@ class DetectorCartas:
         """
         self.ip_webcam_url = ip_webcam_url
         self.cap = None
+        self.http = None  # Sesión de requests (solo en modo IP Webcam)
+        self.conectada = False
+        self.indice = None  # Índice de la cámara local abierta
+        self.parametros = dict(PARAMETROS_DEFECTO)  # Se reemplaza entero al cargar un perfil
         self.ultima_carta_detectada = None
         self.frames_sin_deteccion = 0
+        self.mostrar_ventanas = True  # False en modo sin pantalla
+        self.metricas = Metricas()  # Apagadas: la interfaz comparte las suyas
+        self.frames_leidos = 0
+        self.marca_frame = None  # Tiempos de captura del último frame (ver obtener_frame)
+        self.hilos = 1
+        self._pool = None  # Hilos de la búsqueda por franjas (None = un solo hilo)
+    
+    def usar_franjas(self, hilos=None):
+        """
+        Reparte detectar_cartas_rectangulos (gris, blur, umbral, contornos y
+        filtro) en franjas horizontales procesadas en paralelo (las llamadas de
+        OpenCV sueltan el GIL)
+        
+        Cada franja se umbraliza con 2 filas extra de cada lado para que el
+        blur de sus bordes vea los mismos vecinos que en el frame completo, así
+        que la máscara es idéntica a la de un solo hilo; las figuras que cruzan
+        un corte se juntan después (ver _rectangulos_franjas). Solo se usa en
+        frames de PIXELES_FRANJAS o más.
+        
+        Args:
+            hilos: Hilos a usar (None o 0 = todos los núcleos; 1 = desactivar)
+        """
+        hilos = hilos or os.cpu_count() or 1
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.hilos = hilos
+        if hilos > 1:
+            self._pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="franjas")
+            log.info("🧵 búsqueda de cartas en %d franjas", hilos)
 
-    def conectar_camara(self):
+    def conectar_camara(self, resolucion=None, indice=0):
+        """
+        Conecta con la cámara
+        
+        Args:
+            resolucion: Tupla (ancho, alto) que se pide a la cámara si lo soporta
+            indice: Índice de la cámara local (se ignora con IP Webcam)
+        """
         if self.ip_webcam_url:
+            if self.http is None:
+                # requests solo se carga en modo IP; la sesión reutiliza la conexión HTTP
+                import requests
+                self.http = requests.Session()
             # Usar /shot.jpg para obtener frames individuales
             self.video_url = f"{self.ip_webcam_url}/shot.jpg"
             try:
-                # Verificar conexión
-                response = requests.get(self.ip_webcam_url, timeout=3)
-                if response.status_code == 200:
-                    print("conexion exitosa con IP Webcam")
-                    # Probar obtener un frame
-                    test_frame = requests.get(self.video_url, timeout=3)
-                    if test_frame.status_code == 200:
-                        print("video funcionando")
-                        return True
-                    else:
-                        print("eror en el video")
-                        return False
+                if resolucion:
+                    self._pedir_resolucion_ip(resolucion)
+                # Una sola prueba: si llega un frame, la app y el video funcionan
+                test_frame = self.http.get(self.video_url, timeout=TIMEOUT_CONEXION)
+                if test_frame.status_code == 200:
+                    log.info("conexion exitosa con IP Webcam")
+                    self.conectada = True
+                    return True
                 else:
-                    print("no se pudo conectar a IP Webcam")
+                    log.warning("eror en el video (HTTP %d)", test_frame.status_code)
                     return False
             except Exception as e:
-                print(f"Error al conectar: {e}")
+                log.warning("Error al conectar: %s", e)
                 return False
         else:
             # Modo cámara local
-            self.cap = cv2.VideoCapture(0)
+            self.cap = cv2.VideoCapture(indice)
+            self.indice = indice
+            if resolucion:
+                # El driver elige la resolución soportada más cercana
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolucion[0])
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolucion[1])
             if self.cap.isOpened():
+                self.conectada = True
                 return True
             else:
                 return False
     
+    def ajustar_resolucion(self, resolucion):
+        """
+        Pide una resolución a una cámara ya conectada (p. ej. abierta en
+        segundo plano antes de conocer el tamaño de la ventana)
+        
+        Args:
+            resolucion: Tupla (ancho, alto)
+        """
+        if self.ip_webcam_url:
+            self._pedir_resolucion_ip(resolucion)
+        elif self.cap is not None:
+            ancho, alto = resolucion
+            if (self.cap.get(cv2.CAP_PROP_FRAME_WIDTH), self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) != (ancho, alto):
+                self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, ancho)
+                self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, alto)
+    
+    def _pedir_resolucion_ip(self, resolucion):
+        """Pide a IP Webcam la resolución de video (si la app no lo soporta se ignora)"""
+        ancho, alto = resolucion
+        try:
+            self.http.get(f"{self.ip_webcam_url}/settings/video_size?set={ancho}x{alto}", timeout=TIMEOUT_FRAME)
+        except Exception:
+            pass
+    
     def obtener_frame(self):
-        """Obtiene un frame de la cámara"""
+        """
+        Obtiene un frame de la cámara
+        
+        Deja en self.marca_frame los instantes (perf_counter) antes de pedir el
+        frame, al recibirlo y al terminar de decodificarlo, más su número y,
+        en cámara local, la antigüedad según la marca de tiempo del driver.
+        """
+        self.frames_leidos += 1
+        marca = {"id": self.frames_leidos, "pedido": time.perf_counter()}
+        self.marca_frame = marca
+        
         if self.ip_webcam_url:
             # Obtener frame desde IP Webcam usando /shot.jpg
             try:
-                img_resp = requests.get(self.video_url, timeout=1)
+                with self.metricas.etapa("captura"):
+                    img_resp = self.http.get(self.video_url, timeout=TIMEOUT_FRAME)
+                marca["recibido"] = time.perf_counter()
                 if img_resp.status_code != 200:
                     return False, None
-                img_arr = np.array(bytearray(img_resp.content), dtype=np.uint8)
-                frame = cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
+                with self.metricas.etapa("decodificacion_jpeg"):
+                    img_arr = np.array(bytearray(img_resp.content), dtype=np.uint8)
+                    frame = cv2.imdecode(img_arr, cv2.IMREAD_COLOR)
+                marca["decodificado"] = time.perf_counter()
                 if frame is not None:
                     return True, frame
                 else:
                     return False, None
             except Exception as e:
-                print(f"error al obtener frame: {e}")
+                log.warning("error al obtener frame: %s", e, extra=POR_FRAME)
                 return False, None
         else:
-            # Obtener frame de cámara local
-            return self.cap.read()
+            if self.cap is None:
+                return False, None
+            # Obtener frame de cámara local (incluye la decodificación del driver)
+            with self.metricas.etapa("captura"):
+                resultado = self.cap.read()
+            marca["recibido"] = marca["decodificado"] = time.perf_counter()
+            marca["buffer_ms"] = self._antiguedad_driver()
+            return resultado
+    
+    def _antiguedad_driver(self):
+        """
+        Antigüedad del frame según la marca de tiempo del driver (V4L2 usa el
+        reloj monotónico), o None si el backend no da una marca comparable
+        """
+        fuente_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        if fuente_ms <= 0:
+            return None
+        antiguedad = time.monotonic() * 1000 - fuente_ms
+        return round(antiguedad, 2) if 0 <= antiguedad < 5000 else None
     
     def detectar_cartas_rectangulos(self, frame):
         """
-        Detecta rectángulos blancos (cartas UNO) en el frame
+        Detecta rectángulos blancos (cartas UNO) en el frame con los
+        umbrales de self.parametros (ver PARAMETROS_DEFECTO)
         
         Returns:
             list: Lista de contornos de cartas detectadas
         """
+        p = self.parametros  # Una sola lectura: el perfil puede cambiar desde otro hilo
+        
+        if self._pool is not None and frame.shape[0] * frame.shape[1] >= PIXELES_FRANJAS:
+            return self._rectangulos_franjas(frame, p)
+        
         # Convertir a escala de grises
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
@@ -87,7 +219,7 @@ class DetectorCartas:
         
         # Detectar bordes blancos (cartas UNO tienen borde blanco)
         # Umbral para detectar áreas blancas
-        _, thresh = cv2.threshold(blurred, 200, 255, cv2.THRESH_BINARY)
+        _, thresh = cv2.threshold(blurred, p["umbral"], 255, cv2.THRESH_BINARY)
         
         # Encontrar contornos
         contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
@@ -95,31 +227,80 @@ class DetectorCartas:
         cartas_detectadas = []
         
         for contour in contours:
-            # Filtrar por área (cartas deben ser suficientemente grandes)
-            area = cv2.contourArea(contour)
-            if area < 5000:  # Área mínima
-                continue
-            
-            # Aproximar contorno a polígono
-            peri = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
-            
-            # Verificar que sea aproximadamente rectangular (4 esquinas)
-            if len(approx) >= 4 and len(approx) <= 6:
-                # Verificar relación de aspecto similar a carta UNO (5.6 x 8.7)
-                x, y, w, h = cv2.boundingRect(approx)
-                aspect_ratio = float(w) / h if h > 0 else 0
-                
-                # Cartas UNO tienen relación ~0.64 (pueden estar rotadas)
-                if 0.4 < aspect_ratio < 1.8:  # Rango amplio para rotaciones
-                    cartas_detectadas.append({
-                        'contorno': approx,
-                        'bbox': (x, y, w, h),
-                        'area': area
-                    })
+            carta = _filtrar_contorno(contour, p)
+            if carta is not None:
+                cartas_detectadas.append(carta)
         
         return cartas_detectadas
     
+    def _cortes(self, alto):
+        """Filas donde empieza y termina cada franja"""
+        cortes = np.linspace(0, alto, self.hilos + 1).astype(int)
+        return list(zip(cortes[:-1], cortes[1:]))
+    
+    def _umbralizar_franjas(self, frame, umbral):
+        """Gris, blur y umbral por franjas en paralelo, sobre una sola máscara"""
+        alto = frame.shape[0]
+        thresh = np.empty(frame.shape[:2], dtype=np.uint8)
+        
+        def franja(y0, y1):
+            # Con halo: las filas del borde de la franja se desenfocan con sus
+            # vecinas reales; el borde del frame sigue usando el reflejo de OpenCV
+            a, b = max(0, y0 - HALO_BLUR), min(alto, y1 + HALO_BLUR)
+            gray = cv2.cvtColor(frame[a:b], cv2.COLOR_BGR2GRAY)
+            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+            cv2.threshold(blurred[y0 - a:y1 - a], umbral, 255, cv2.THRESH_BINARY, dst=thresh[y0:y1])
+        
+        for futuro in [self._pool.submit(franja, y0, y1) for y0, y1 in self._cortes(alto)]:
+            futuro.result()
+        return thresh
+    
+    def _rectangulos_franjas(self, frame, p):
+        """
+        detectar_cartas_rectangulos por franjas: umbral, contornos y filtro de
+        cada franja corren en paralelo
+        
+        Los contornos que tocan el corte entre dos franjas son pedazos de una
+        figura que sigue en la vecina: se juntan (solo los píxeles de la
+        máscara dentro de esos pedazos) y se vuelven a buscar en su recuadro.
+        Los enteros que quedan dentro de una figura así se descartan, porque
+        con la máscara completa no son externos. El resultado, orden incluido,
+        es el mismo que con un solo hilo.
+        """
+        thresh = self._umbralizar_franjas(frame, p["umbral"])
+        alto = thresh.shape[0]
+        
+        def franja(y0, y1):
+            contornos, _ = cv2.findContours(thresh[y0:y1], cv2.RETR_EXTERNAL,
+                                            cv2.CHAIN_APPROX_SIMPLE, offset=(0, int(y0)))
+            enteros, cortados = [], []
+            for contour in contornos:
+                x, y, w, h = cv2.boundingRect(contour)
+                if (y == y0 and y0 > 0) or (y + h == y1 and y1 < alto):
+                    cortados.append(contour)
+                else:
+                    enteros.append((contour, _filtrar_contorno(contour, p)))
+            return enteros, cortados
+        
+        enteros, cortados = [], []
+        for futuro in [self._pool.submit(franja, y0, y1) for y0, y1 in self._cortes(alto)]:
+            e, c = futuro.result()
+            enteros += e
+            cortados += c
+        
+        unidos = _unir_cortados(thresh, cortados)
+        resultado = [(contour, _filtrar_contorno(contour, p)) for contour in unidos]
+        for contour, carta in enteros:
+            # Un entero dentro de una figura que cruza franjas no es externo
+            punto = (float(contour[0][0][0]), float(contour[0][0][1]))
+            if not any(cv2.pointPolygonTest(u, punto, False) > 0 for u in unidos):
+                resultado.append((contour, carta))
+        
+        # Mismo orden que findContours sobre la máscara completa: por el primer
+        # píxel de cada contorno, de abajo hacia arriba
+        resultado.sort(key=lambda r: (int(r[0][0][0][1]), int(r[0][0][0][0])), reverse=True)
+        return [carta for _, carta in resultado if carta is not None]
+    
     def detectar_qr_en_region(self, frame, bbox, debug=False):
         """
         Busca códigos QR en una región específica del frame
@@ -139,8 +320,9 @@ class DetectorCartas:
         
         # DEBUG: Mostrar la región donde busca QR
         if debug:
-            cv2.imshow('DEBUG - Region buscando QR', roi)
-            print(f"Buscando QR en región: {w}x{h} pixels")
+            if self.mostrar_ventanas:
+                cv2.imshow('DEBUG - Region buscando QR', roi)
+            log.debug("Buscando QR en región: %dx%d pixels", w, h, extra=POR_FRAME)
         
         # Intentar con imagen original
         codigos = decode(roi)
@@ -152,82 +334,100 @@ class DetectorCartas:
             codigos = decode(gray_roi)
             
             if debug and not codigos:
-                print("no se detectó QR en ROI")
+                log.debug("no se detectó QR en ROI", extra=POR_FRAME)
         
         if codigos:
             if debug:
-                print(f"{len(codigos)} QR(s) detectado(s)")
+                log.debug("%d QR(s) detectado(s)", len(codigos), extra=POR_FRAME)
             
             for codigo in codigos:
                 try:
                     # Decodificar JSON del QR
                     data = codigo.data.decode('utf-8')
                     if debug:
-                        print(f"data: {data}")
+                        log.debug("data: %s", data, extra=POR_FRAME)
                     
                     carta_data = json.loads(data)
                     
                     # Validar estructura
                     if 'color' in carta_data and 'valor' in carta_data:
                         if debug:
-                            print(f"carta válida: {carta_data}")
+                            log.debug("carta válida", extra={"por_frame": True, "carta": carta_data})
                         return carta_data
                         
                 except json.JSONDecodeError:
                     if debug:
-                        print(f"error JSON: {data}")
+                        log.debug("error JSON: %s", data, extra=POR_FRAME)
                     continue
                 except Exception as e:
                     if debug:
-                        print(f"error: {e}")
+                        log.debug("error: %s", e, extra=POR_FRAME)
                     continue
         
         return None
     
-    def detectar_cartas_completo(self, frame, debug=False):
+    def detectar_cartas_anotaciones(self, frame, debug=False):
         """
-        Detecta cartas por sus bordes blancos y luego busca QR dentro
+        Detecta cartas por sus bordes blancos y luego busca QR dentro,
+        sin copiar ni modificar el frame
         
         Args:
             frame: Frame de video
             debug: Si True, muestra información de debug
         
         Returns:
-            tuple: (carta_data, frame_anotado)
+            tuple: (carta_data, anotaciones) donde anotaciones es una lista
+                   ligera para dibujar después con dibujar_anotaciones
         """
-        frame_anotado = frame.copy()
+        anotaciones = []
         
         # Detectar rectángulos blancos (cartas)
-        cartas = self.detectar_cartas_rectangulos(frame)
+        with self.metricas.etapa("rectangulos"):
+            cartas = self.detectar_cartas_rectangulos(frame)
         
         if not cartas:
             self.frames_sin_deteccion += 1
-            return None, frame_anotado
+            return None, anotaciones
         
         # Buscar QR en cada carta detectada
         for carta in cartas:
             x, y, w, h = carta['bbox']
             
-            # Dibujar contorno de carta detectada (azul)
-            cv2.drawContours(frame_anotado, [carta['contorno']], -1, (255, 0, 0), 2)
-            cv2.putText(frame_anotado, "Carta", (x, y - 10),
-                       cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+            # Contorno de carta detectada (azul)
+            anotaciones.append(("contorno", carta['contorno'], (255, 0, 0), 2))
+            anotaciones.append(("texto", "Carta", (x, y - 10), 0.6, (255, 0, 0), 2))
             
             # Buscar QR en esta carta
-            carta_data = self.detectar_qr_en_region(frame, carta['bbox'], debug=debug)
+            with self.metricas.etapa("qr"):
+                carta_data = self.detectar_qr_en_region(frame, carta['bbox'], debug=debug)
             
             if carta_data:
-                # QR encontrado! Dibujar en verde
-                cv2.rectangle(frame_anotado, (x, y), (x+w, y+h), (0, 255, 0), 3)
+                # QR encontrado! Marcar en verde
+                anotaciones.append(("rectangulo", (x, y, w, h), (0, 255, 0), 3))
                 texto = f"{carta_data['color'].capitalize()} {carta_data['valor']}"
-                cv2.putText(frame_anotado, texto, (x, y - 10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
+                anotaciones.append(("texto", texto, (x, y - 10), 0.9, (0, 255, 0), 2))
                 
                 self.frames_sin_deteccion = 0
-                return carta_data, frame_anotado
+                return carta_data, anotaciones
         
         self.frames_sin_deteccion += 1
-        return None, frame_anotado
+        return None, anotaciones
+    
+    def detectar_cartas_completo(self, frame, debug=False):
+        """
+        Detecta cartas por sus bordes blancos y luego busca QR dentro
+        
+        Args:
+            frame: Frame de video
+            debug: Si True, muestra información de debug
+        
+        Returns:
+            tuple: (carta_data, frame_anotado)
+        """
+        carta_data, anotaciones = self.detectar_cartas_anotaciones(frame, debug=debug)
+        frame_anotado = frame.copy()
+        dibujar_anotaciones(frame_anotado, anotaciones)
+        return carta_data, frame_anotado
     
     def detectar_carta_estable(self, frame, frames_requeridos=10):
         """
@@ -272,17 +472,137 @@ class DetectorCartas:
         
         return frame
     
+    def liberar_captura(self):
+        """Cierra la captura para poder reconectar (conserva la sesión HTTP)"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.conectada = False
+    
     def liberar(self):
         """Libera recursos de la cámara"""
-        if self.cap:
-            self.cap.release()
-        cv2.destroyAllWindows()
-        print("camara desconectada")
+        self.liberar_captura()
+        if self.http:
+            self.http.close()
+            self.http = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self.mostrar_ventanas:
+            cv2.destroyAllWindows()
+        log.info("camara desconectada")
+
+
+def _filtrar_contorno(contour, p):
+    """
+    Aplica los filtros de área, esquinas y relación de aspecto a un contorno
+    
+    Returns:
+        dict o None: {"contorno", "bbox", "area"} si parece una carta
+    """
+    # Filtrar por área (cartas deben ser suficientemente grandes)
+    area = cv2.contourArea(contour)
+    if area < p["area_minima"]:  # Área mínima
+        return None
+    
+    # Aproximar contorno a polígono
+    peri = cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+    
+    # Verificar que sea aproximadamente rectangular (4 esquinas)
+    if not p["vertices_min"] <= len(approx) <= p["vertices_max"]:
+        return None
+    
+    # Verificar relación de aspecto similar a carta UNO (5.6 x 8.7)
+    x, y, w, h = cv2.boundingRect(approx)
+    aspect_ratio = float(w) / h if h > 0 else 0
+    
+    # Cartas UNO tienen relación ~0.64 (pueden estar rotadas)
+    if not p["aspecto_min"] < aspect_ratio < p["aspecto_max"]:  # Rango amplio para rotaciones
+        return None
+    return {
+        'contorno': approx,
+        'bbox': (x, y, w, h),
+        'area': area
+    }
+
+
+def _unir_cortados(thresh, cortados):
+    """
+    Reconstruye los contornos externos de las figuras partidas por las franjas
+    
+    Args:
+        thresh: Máscara completa
+        cortados: Contornos (en coordenadas del frame) que tocan un corte
+    
+    Returns:
+        list: Contornos completos de esas figuras
+    """
+    if not cortados:
+        return []
+    # Agrupar pedazos cuyos recuadros se tocan (incluye el vecino de la otra franja)
+    cajas = [list(cv2.boundingRect(c)) for c in cortados]
+    grupos = [[i] for i in range(len(cortados))]
+    unido = True
+    while unido:
+        unido = False
+        for i in range(len(grupos)):
+            for j in range(i + 1, len(grupos)):
+                a, b = cajas[i], cajas[j]
+                if (a[0] <= b[0] + b[2] and b[0] <= a[0] + a[2]
+                        and a[1] <= b[1] + b[3] and b[1] <= a[1] + a[3]):
+                    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+                    x1, y1 = max(a[0] + a[2], b[0] + b[2]), max(a[1] + a[3], b[1] + b[3])
+                    cajas[i] = [x0, y0, x1 - x0, y1 - y0]
+                    grupos[i] += grupos.pop(j)
+                    cajas.pop(j)
+                    unido = True
+                    break
+            if unido:
+                break
+    
+    contornos = []
+    for (x, y, w, h), grupo in zip(cajas, grupos):
+        # Solo los píxeles de la máscara cubiertos por los pedazos (rellenos)
+        mascara = np.zeros((h, w), dtype=np.uint8)
+        cv2.drawContours(mascara, [cortados[i] for i in grupo], -1, 255, cv2.FILLED, offset=(-x, -y))
+        cv2.bitwise_and(mascara, thresh[y:y + h, x:x + w], dst=mascara)
+        encontrados, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(x, y))
+        contornos += encontrados
+    return contornos
+
+
+def dibujar_anotaciones(imagen, anotaciones, escala=(1.0, 1.0)):
+    """
+    Dibuja las anotaciones de detección sobre una imagen
+    
+    Args:
+        imagen: Imagen destino (puede ser una vista de un lienzo mayor)
+        anotaciones: Lista generada por detectar_cartas_anotaciones
+        escala: Tupla (sx, sy) si la imagen destino tiene otro tamaño que el frame
+    """
+    sx, sy = escala
+    for anotacion in anotaciones:
+        tipo = anotacion[0]
+        if tipo == "contorno":
+            _, contorno, color, grosor = anotacion
+            if escala != (1.0, 1.0):
+                contorno = (contorno * np.array([sx, sy])).astype(np.int32)
+            cv2.drawContours(imagen, [contorno], -1, color, grosor)
+        elif tipo == "rectangulo":
+            _, (x, y, w, h), color, grosor = anotacion
+            cv2.rectangle(imagen, (int(x * sx), int(y * sy)),
+                          (int((x + w) * sx), int((y + h) * sy)), color, grosor)
+        elif tipo == "texto":
+            _, texto, (x, y), tamano, color, grosor = anotacion
+            cv2.putText(imagen, texto, (int(x * sx), int(y * sy)),
+                        cv2.FONT_HERSHEY_SIMPLEX, tamano, color, grosor)
 
 
 # Código de prueba
 if __name__ == "__main__":
     IP_WEBCAM = "http://192.168.1.67:8080" 
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     # Preguntar modo
     print("\n¿Qué cámara quieres usar?")
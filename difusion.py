@@ -0,0 +1,206 @@
+import asyncio
+import json
+import threading
+from collections import deque
+
+_RESINCRONIZAR = object()  # Marca en la cola de un cliente que se quedó atrás
+
+
+def _compactar_estado(juego, zapato=None):
+    """Estado compacto del juego: las cartas van como [color, valor]"""
+    estado = {
+        "estado": juego.estado,
+        "mano_jugador": [[c["color"], c["valor"]] for c in juego.mano_jugador],
+        "mano_banca": [[c["color"], c["valor"]] for c in juego.mano_banca],
+        "puntos_jugador": juego.puntos_jugador,
+        "puntos_banca": juego.puntos_banca,
+        "ganador": juego.ganador,
+        "mensaje": juego.mensaje,
+    }
+    if zapato is not None:
+        estado["zapato_restantes"] = zapato.restantes
+    return estado
+
+
+def _calcular_delta(anterior, nuevo):
+    """
+    Cambios entre dos estados compactos
+
+    Las manos solo crecen durante una ronda, así que cuando la nueva mano
+    extiende a la anterior se envían solo las cartas agregadas ("+mano_...").
+    """
+    delta = {}
+    for clave, valor in nuevo.items():
+        viejo = anterior.get(clave)
+        if viejo == valor:
+            continue
+        if (clave.startswith("mano_") and viejo is not None
+                and len(valor) > len(viejo) and valor[:len(viejo)] == viejo):
+            delta["+" + clave] = valor[len(viejo):]
+        else:
+            delta[clave] = valor
+    return delta
+
+
+class DifusionEstado:
+    """
+    Publica los cambios de estado del juego por TCP (JSON, una línea por mensaje)
+
+    En cada transición de Baccarat se envía un delta con número de secuencia.
+    Al conectarse, un cliente recibe un snapshot; si envía "desde <seq>" en la
+    primera línea y los deltas siguientes siguen en el historial, se le
+    reenvían en su lugar. Cada cliente tiene una cola acotada: si se llena, se
+    vacía y el cliente recibe un snapshot nuevo, sin bloquear nunca el juego.
+    """
+
+    def __init__(self, juego, zapato=None, host="127.0.0.1", puerto=8766,
+                 historial=256, cola_cliente=64):
+        """
+        Args:
+            juego: Instancia de Baccarat a observar
+            zapato: ZapatoBaccarat opcional (agrega las cartas restantes)
+            host: Interfaz donde escuchar
+            puerto: Puerto TCP
+            historial: Deltas recientes guardados para reanudar
+            cola_cliente: Mensajes pendientes por cliente antes de resincronizar
+        """
+        self.juego = juego
+        self.zapato = zapato
+        self.host = host
+        self.puerto = puerto
+        self.cola_cliente = cola_cliente
+
+        # Estado del lado del juego
+        self._seq = 0
+        self._anterior = _compactar_estado(juego, zapato)
+
+        # Estado del lado del loop asyncio (solo se toca desde ese hilo)
+        self._historial = deque(maxlen=historial)
+        self._snapshot = (0, self._anterior)
+        self._clientes = set()
+
+        self._loop = None
+        self._servidor = None
+        self._hilo = None
+        self._listo = threading.Event()
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo con su propio loop y se suscribe al juego"""
+        self._hilo = threading.Thread(target=self._correr_loop, name="difusion-estado", daemon=True)
+        self._hilo.start()
+        self._listo.wait(timeout=5)
+        self.juego.agregar_observador(self._al_evento)
+        print(f"📢 difusión de estado en tcp://{self.host}:{self.puerto}")
+
+    def _correr_loop(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._servidor = self._loop.run_until_complete(
+            asyncio.start_server(self._atender, self.host, self.puerto))
+        self._listo.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._servidor.close()
+            tareas = asyncio.all_tasks(self._loop)
+            for tarea in tareas:
+                tarea.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tareas, return_exceptions=True))
+            self._loop.close()
+
+    def _al_evento(self, evento, juego):
+        self.publicar(evento)
+
+    def publicar(self, evento):
+        """
+        Calcula el delta del estado actual y lo entrega al loop (en el hilo del juego)
+
+        Se llama en cada transición del juego; la interfaz lo llama también
+        cuando cambia algo fuera del juego, p. ej. "barajado" al barajar el zapato.
+        """
+        nuevo = _compactar_estado(self.juego, self.zapato)
+        delta = _calcular_delta(self._anterior, nuevo)
+        self._anterior = nuevo
+        self._seq += 1
+        mensaje = {"tipo": "delta", "seq": self._seq, "evento": evento, "cambios": delta}
+        linea = (json.dumps(mensaje, ensure_ascii=False) + "\n").encode("utf-8")
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._difundir, self._seq, linea, nuevo)
+
+    def _difundir(self, seq, linea, estado):
+        self._historial.append((seq, linea))
+        self._snapshot = (seq, estado)
+        for cola in self._clientes:
+            if cola.full():
+                # Cliente lento: descartar lo pendiente y mandarle un snapshot
+                while not cola.empty():
+                    cola.get_nowait()
+                cola.put_nowait((seq, _RESINCRONIZAR))
+            else:
+                cola.put_nowait((seq, linea))
+
+    def _linea_snapshot(self):
+        seq, estado = self._snapshot
+        mensaje = {"tipo": "snapshot", "seq": seq, "estado": estado}
+        return (json.dumps(mensaje, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _reanudacion(self, desde):
+        """Deltas posteriores a `desde` si siguen en el historial, o None"""
+        pendientes = [(seq, linea) for seq, linea in self._historial if seq > desde]
+        ultimo = self._snapshot[0]
+        if desde > ultimo:
+            return None
+        if len(pendientes) != ultimo - desde:
+            return None  # Hay un hueco: ya no están todos los deltas
+        return pendientes
+
+    async def _atender(self, reader, writer):
+        cola = asyncio.Queue(maxsize=self.cola_cliente)
+
+        # Primera línea opcional: "desde <seq>" para reanudar
+        lineas = None
+        desde = 0
+        try:
+            pedido = await asyncio.wait_for(reader.readline(), timeout=0.2)
+            partes = pedido.decode("utf-8", "replace").split()
+            if len(partes) == 2 and partes[0] == "desde":
+                desde = int(partes[1])
+                lineas = self._reanudacion(desde)
+        except (asyncio.TimeoutError, ValueError):
+            pass
+
+        # Registrar la cola antes del primer await de escritura para no perder deltas
+        self._clientes.add(cola)
+        try:
+            if lineas is None:
+                enviado = self._snapshot[0]
+                writer.write(self._linea_snapshot())
+            else:
+                enviado = desde
+                for enviado, linea in lineas:
+                    writer.write(linea)
+            await writer.drain()
+
+            while True:
+                seq, linea = await cola.get()
+                if linea is _RESINCRONIZAR:
+                    enviado = self._snapshot[0]
+                    linea = self._linea_snapshot()
+                elif seq <= enviado:
+                    continue  # Ya incluido en el último snapshot enviado
+                else:
+                    enviado = seq
+                writer.write(linea)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clientes.discard(cola)
+            writer.close()
+
+    def cerrar(self):
+        """Detiene el servidor"""
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._hilo is not None:
+            self._hilo.join(timeout=2)
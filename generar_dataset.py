@@ -0,0 +1,304 @@
+import argparse
+import json
+import os
+import time
+import cv2
+import numpy as np
+from generar_qr import COLORES, VALORES, qr_png, _payload
+
+# Colores de las cartas UNO (BGR)
+COLORES_BGR = {
+    "rojo": (40, 40, 215),
+    "amarillo": (20, 205, 245),
+    "verde": (60, 165, 45),
+    "azul": (190, 95, 25),
+}
+
+# Tamaño base de la carta en píxeles (proporción UNO 5.6 x 8.7)
+ANCHO_CARTA = 250
+ALTO_CARTA = 388
+
+# Rangos de distorsión por nivel de dificultad
+NIVELES = {
+    "facil": {
+        "escala": (0.9, 1.1), "rotacion": (-10, 10), "perspectiva": 0.02,
+        "blur": (0.0, 0.5), "brillo": 0.0, "ruido": (0, 3),
+    },
+    "medio": {
+        "escala": (0.6, 1.2), "rotacion": (-35, 35), "perspectiva": 0.06,
+        "blur": (0.0, 1.5), "brillo": 0.3, "ruido": (0, 8),
+    },
+    "dificil": {
+        "escala": (0.4, 1.3), "rotacion": (-90, 90), "perspectiva": 0.12,
+        "blur": (0.5, 3.0), "brillo": 0.6, "ruido": (3, 15),
+    },
+}
+
+
+class GeneradorDataset:
+    """
+    Genera frames sintéticos etiquetados para medir DetectorCartas sin cámara
+
+    Cada frame es una mesa de paño con (o sin) una carta UNO sintética que
+    lleva pegada la misma etiqueta QR que genera generar_qr.py. La carta se
+    deforma con perspectiva, rotación y escala, y el frame recibe desenfoque,
+    reflejos y ruido controlados. Con la misma semilla el corpus es idéntico.
+    """
+
+    def __init__(self, semilla=0, ancho=1280, alto=720, nivel="medio", proporcion_vacios=0.1):
+        """
+        Args:
+            semilla: Semilla base (cada frame usa semilla + índice)
+            ancho: Ancho de los frames
+            alto: Alto de los frames
+            nivel: "facil", "medio" o "dificil"
+            proporcion_vacios: Fracción de frames sin carta (para medir lecturas falsas)
+        """
+        self.semilla = semilla
+        self.ancho = ancho
+        self.alto = alto
+        self.nivel = nivel
+        self.rangos = NIVELES[nivel]
+        self.proporcion_vacios = proporcion_vacios
+        self._caras = {}
+
+    def _cara_carta(self, carta):
+        """Cara de la carta: borde blanco, interior de color y la etiqueta QR al centro"""
+        clave = (carta["color"], carta["valor"])
+        if clave in self._caras:
+            return self._caras[clave]
+
+        cara = np.full((ALTO_CARTA, ANCHO_CARTA, 3), 250, dtype=np.uint8)
+        borde = 14
+        cv2.rectangle(cara, (borde, borde), (ANCHO_CARTA - borde, ALTO_CARTA - borde),
+                      COLORES_BGR[carta["color"]], -1)
+
+        # Etiqueta QR (misma imagen que el PDF de generar_qr.py)
+        png = np.frombuffer(qr_png(_payload(carta)), dtype=np.uint8)
+        qr = cv2.imdecode(png, cv2.IMREAD_GRAYSCALE)
+        lado = ANCHO_CARTA - 4 * borde
+        qr = cv2.resize(qr, (lado, lado), interpolation=cv2.INTER_AREA)
+        y0 = (ALTO_CARTA - lado) // 2
+        x0 = (ANCHO_CARTA - lado) // 2
+        cara[y0:y0 + lado, x0:x0 + lado] = qr[:, :, None]
+
+        self._caras[clave] = cara
+        return cara
+
+    def _fondo(self, rng):
+        """Paño de mesa verde con gradiente y textura"""
+        base = np.array([40, 95, 30], dtype=np.float32) * rng.uniform(0.8, 1.2)
+        gradiente = np.linspace(0.85, 1.1, self.ancho, dtype=np.float32)[None, :, None]
+        textura = rng.normal(0, 6, (self.alto, self.ancho, 1)).astype(np.float32)
+        return base * gradiente + textura
+
+    def _colocar_carta(self, fondo, cara, rng):
+        """
+        Deforma la carta y la compone sobre el fondo
+
+        Returns:
+            numpy.ndarray: Esquinas de la carta en el frame (4 x 2)
+        """
+        r = self.rangos
+        escala = rng.uniform(*r["escala"]) * self.alto / 720
+        angulo = np.deg2rad(rng.uniform(*r["rotacion"]))
+        w, h = ANCHO_CARTA * escala, ALTO_CARTA * escala
+
+        # Esquinas centradas, rotadas y con jitter de perspectiva
+        esquinas = np.array([[-w / 2, -h / 2], [w / 2, -h / 2], [w / 2, h / 2], [-w / 2, h / 2]])
+        rot = np.array([[np.cos(angulo), -np.sin(angulo)], [np.sin(angulo), np.cos(angulo)]])
+        esquinas = esquinas @ rot.T
+        esquinas += rng.normal(0, r["perspectiva"] * max(w, h), esquinas.shape)
+
+        # Posición que mantiene la carta completa dentro del frame
+        minimo, maximo = esquinas.min(axis=0), esquinas.max(axis=0)
+        cx = rng.uniform(-minimo[0], max(-minimo[0] + 1, self.ancho - maximo[0]))
+        cy = rng.uniform(-minimo[1], max(-minimo[1] + 1, self.alto - maximo[1]))
+        esquinas += (cx, cy)
+
+        origen = np.float32([[0, 0], [ANCHO_CARTA, 0], [ANCHO_CARTA, ALTO_CARTA], [0, ALTO_CARTA]])
+        matriz = cv2.getPerspectiveTransform(origen, esquinas.astype(np.float32))
+        tamano = (self.ancho, self.alto)
+        carta = cv2.warpPerspective(cara, matriz, tamano, flags=cv2.INTER_LINEAR)
+        mascara = cv2.warpPerspective(np.ones(cara.shape[:2], np.float32), matriz, tamano)
+
+        fondo *= (1 - mascara)[:, :, None]
+        fondo += carta.astype(np.float32) * mascara[:, :, None]
+        return esquinas
+
+    def _efectos(self, frame, rng):
+        """Reflejo, desenfoque y ruido"""
+        r = self.rangos
+        if rng.random() < r["brillo"]:
+            # Reflejo: mancha elíptica brillante con caída gaussiana
+            cx, cy = rng.uniform(0, self.ancho), rng.uniform(0, self.alto)
+            sx, sy = rng.uniform(0.05, 0.25) * self.ancho, rng.uniform(0.05, 0.25) * self.alto
+            xs = np.arange(self.ancho, dtype=np.float32)[None, :]
+            ys = np.arange(self.alto, dtype=np.float32)[:, None]
+            mancha = np.exp(-(((xs - cx) / sx) ** 2 + ((ys - cy) / sy) ** 2))
+            frame += (rng.uniform(60, 160) * mancha)[:, :, None]
+
+        sigma = rng.uniform(*r["blur"])
+        if sigma > 0.1:
+            frame = cv2.GaussianBlur(frame, (0, 0), sigma)
+
+        ruido = rng.uniform(*r["ruido"])
+        if ruido > 0:
+            frame += rng.normal(0, ruido, frame.shape).astype(np.float32)
+
+        return np.clip(frame, 0, 255).astype(np.uint8)
+
+    def frame(self, indice, carta=None):
+        """
+        Genera el frame `indice` (determinista para una semilla dada)
+
+        Args:
+            indice: Número de frame
+            carta: Carta a mostrar; por defecto se elige al azar (o ninguna,
+                   según proporcion_vacios)
+
+        Returns:
+            tuple: (frame BGR, etiqueta dict)
+        """
+        rng = np.random.default_rng(self.semilla + indice)
+        fondo = self._fondo(rng)
+        etiqueta = {"indice": indice, "carta": None, "esquinas": None, "bbox": None}
+
+        if carta is not None or rng.random() >= self.proporcion_vacios:
+            if carta is None:
+                carta = {"color": COLORES[rng.integers(len(COLORES))],
+                         "valor": int(VALORES[rng.integers(len(VALORES))])}
+            esquinas = self._colocar_carta(fondo, self._cara_carta(carta), rng)
+            x, y = esquinas.min(axis=0)
+            x2, y2 = esquinas.max(axis=0)
+            etiqueta.update({
+                "carta": carta,
+                "esquinas": np.round(esquinas, 1).tolist(),
+                "bbox": [int(x), int(y), int(x2 - x), int(y2 - y)],
+            })
+
+        return self._efectos(fondo, rng), etiqueta
+
+    def generar(self, directorio, frames=200, video=False, fps=15):
+        """
+        Escribe el corpus: frames PNG, etiquetas.jsonl y opcionalmente un video
+
+        Args:
+            directorio: Carpeta de salida
+            frames: Número de frames
+            video: Si True, escribe además video.mp4 con los mismos frames en orden
+            fps: Frames por segundo del video
+        """
+        os.makedirs(os.path.join(directorio, "frames"), exist_ok=True)
+        escritor = None
+        if video:
+            escritor = cv2.VideoWriter(os.path.join(directorio, "video.mp4"),
+                                       cv2.VideoWriter_fourcc(*"mp4v"), fps,
+                                       (self.ancho, self.alto))
+
+        with open(os.path.join(directorio, "etiquetas.jsonl"), "w", encoding="utf-8") as f:
+            for i in range(frames):
+                imagen, etiqueta = self.frame(i)
+                etiqueta["archivo"] = f"frames/{i:06d}.png"
+                cv2.imwrite(os.path.join(directorio, etiqueta["archivo"]), imagen)
+                if escritor:
+                    escritor.write(imagen)
+                f.write(json.dumps(etiqueta, ensure_ascii=False) + "\n")
+
+        if escritor:
+            escritor.release()
+
+        with open(os.path.join(directorio, "dataset.json"), "w", encoding="utf-8") as f:
+            json.dump({"semilla": self.semilla, "ancho": self.ancho, "alto": self.alto,
+                       "nivel": self.nivel, "frames": frames,
+                       "proporcion_vacios": self.proporcion_vacios, "video": video}, f, indent=2)
+
+        print(f"✅ dataset generado en {directorio}: {frames} frames ({self.nivel})")
+
+
+def cargar_etiquetas(directorio):
+    """Lee etiquetas.jsonl de un corpus"""
+    with open(os.path.join(directorio, "etiquetas.jsonl"), encoding="utf-8") as f:
+        return [json.loads(linea) for linea in f if linea.strip()]
+
+
+def evaluar(directorio, detector=None):
+    """
+    Mide DetectorCartas sobre un corpus generado
+
+    Args:
+        directorio: Carpeta del corpus
+        detector: DetectorCartas a evaluar (por defecto uno nuevo)
+
+    Returns:
+        dict: Latencias (ms), recall y tasa de lecturas falsas
+    """
+    from detector_cartas import DetectorCartas
+
+    detector = detector or DetectorCartas()
+    detector.mostrar_ventanas = False
+    latencias = []
+    con_carta = aciertos = falsas = vacios = falsas_en_vacio = 0
+
+    for etiqueta in cargar_etiquetas(directorio):
+        imagen = cv2.imread(os.path.join(directorio, etiqueta["archivo"]))
+        inicio = time.perf_counter()
+        leida, _ = detector.detectar_cartas_anotaciones(imagen)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+        esperada = etiqueta["carta"]
+        if esperada is None:
+            vacios += 1
+            if leida:
+                falsas_en_vacio += 1
+        else:
+            con_carta += 1
+            if leida and leida["color"] == esperada["color"] and leida["valor"] == esperada["valor"]:
+                aciertos += 1
+            elif leida:
+                falsas += 1
+
+    latencias = np.array(latencias)
+    lecturas = aciertos + falsas + falsas_en_vacio
+    resultado = {
+        "frames": len(latencias),
+        "latencia_ms": {
+            "media": float(latencias.mean()),
+            "p50": float(np.percentile(latencias, 50)),
+            "p95": float(np.percentile(latencias, 95)),
+            "p99": float(np.percentile(latencias, 99)),
+        },
+        "recall": aciertos / con_carta if con_carta else None,
+        "lecturas_falsas": (falsas + falsas_en_vacio) / lecturas if lecturas else 0.0,
+        "falsas_en_vacio": falsas_en_vacio / vacios if vacios else None,
+    }
+    return resultado
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Corpus sintético para medir el detector de cartas")
+    sub = parser.add_subparsers(dest="accion", required=True)
+
+    p_gen = sub.add_parser("generar", help="Genera un corpus etiquetado")
+    p_gen.add_argument("--salida", default="dataset_cartas")
+    p_gen.add_argument("--frames", type=int, default=200)
+    p_gen.add_argument("--semilla", type=int, default=0)
+    p_gen.add_argument("--ancho", type=int, default=1280)
+    p_gen.add_argument("--alto", type=int, default=720)
+    p_gen.add_argument("--nivel", choices=list(NIVELES), default="medio")
+    p_gen.add_argument("--vacios", type=float, default=0.1, help="Fracción de frames sin carta")
+    p_gen.add_argument("--video", action="store_true", help="Escribe también video.mp4")
+
+    p_eval = sub.add_parser("evaluar", help="Mide el detector sobre un corpus")
+    p_eval.add_argument("directorio")
+
+    args = parser.parse_args()
+    if args.accion == "generar":
+        GeneradorDataset(semilla=args.semilla, ancho=args.ancho, alto=args.alto,
+                         nivel=args.nivel, proporcion_vacios=args.vacios
+                         ).generar(args.salida, frames=args.frames, video=args.video)
+    else:
+        resultado = evaluar(args.directorio)
+        print(json.dumps(resultado, indent=2))
+        with open(os.path.join(args.directorio, "resultados.json"), "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2)
@@ -1,10 +1,18 @@
 import qrcode
 import json
+import argparse
+import contextlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab import rl_config
 from io import BytesIO
 from PIL import Image
+import numpy as np
 
 # Configuración de cartas
 COLORES = ["amarillo", "rojo", "verde", "azul"]
@@ -24,22 +32,107 @@ ROWS = 5  # Filas por página
 START_X = 1.5 * cm
 START_Y = PAGE_HEIGHT - 2 * cm
 
-def generar_qr(data):
-    """Genera un código QR a partir de un diccionario"""
+def _payload(data):
+    """Texto que se codifica en el QR"""
+    return json.dumps(data, ensure_ascii=False)
+
+def _crear_qr(texto, box_size=15, mascara=None):
+    """Genera el código QR (sin imagen) de un texto ya serializado"""
     qr = qrcode.QRCode(
         version=1,
         error_correction=qrcode.constants.ERROR_CORRECT_H,
-        box_size=15,  # Aumentado para mejor calidad
+        box_size=box_size,  # 15 por defecto para mejor calidad
         border=2,     # Borde más visible
+        mask_pattern=mascara,  # None = probar las 8 máscaras y usar la mejor
     )
-    qr.add_data(json.dumps(data, ensure_ascii=False))
+    qr.add_data(texto)
     qr.make(fit=True)
+    return qr
+
+def generar_qr(data):
+    """Genera un código QR a partir de un diccionario"""
+    qr = _crear_qr(_payload(data))
     
     img = qr.make_image(fill_color="black", back_color="white")
     return img
 
+def qr_png(texto, box_size=15, mascara=None):
+    """
+    Genera el QR de un texto como PNG en escala de grises en memoria
+    (sin archivos temporales)
+    
+    Args:
+        texto: Payload ya serializado
+        box_size: Píxeles por módulo
+        mascara: Máscara fija (0-7) o None para elegir la mejor (más lento)
+    
+    Returns:
+        bytes: Imagen PNG
+    """
+    qr = _crear_qr(texto, box_size, mascara)
+    modulos = np.array(qr.get_matrix(), dtype=bool)
+    pixeles = np.where(modulos, 0, 255).astype(np.uint8)
+    pixeles = np.repeat(np.repeat(pixeles, box_size, axis=0), box_size, axis=1)
+    
+    buffer = BytesIO()
+    Image.fromarray(pixeles, mode="L").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def _qr_png_masivo(texto):
+    """
+    QR para impresión masiva: ~250 ppp a 3 cm de lado y máscara fija
+    (cualquier máscara es válida para los lectores y evita evaluar las 8)
+    """
+    return qr_png(texto, box_size=8, mascara=0)
+
+@contextlib.contextmanager
+def _sin_a85():
+    """
+    Imágenes sin ASCII85 mientras se arma un PDF: queda más chico y se escribe
+    mucho más rápido. Se restaura al salir para no cambiar reportlab a quien
+    importe este módulo.
+    """
+    anterior = rl_config.useA85
+    rl_config.useA85 = 0
+    try:
+        yield
+    finally:
+        rl_config.useA85 = anterior
+
+def _dibujar_etiqueta(c, carta, png, x, y):
+    """Dibuja una etiqueta (guía de corte, QR y texto) con su esquina superior izquierda en (x, y)"""
+    # Dibujar recuadro de corte (guías)
+    c.setStrokeColorRGB(0.7, 0.7, 0.7)
+    c.setDash(2, 2)
+    c.rect(x, y - QR_SIZE - MARGIN - LABEL_HEIGHT,
+           CELL_WIDTH, CELL_HEIGHT)
+    c.setDash()
+    
+    # Dibujar QR directamente desde memoria
+    c.drawImage(ImageReader(BytesIO(png)),
+               x + MARGIN,
+               y - QR_SIZE - MARGIN,
+               width=QR_SIZE,
+               height=QR_SIZE)
+    
+    # Dibujar texto identificador
+    c.setFillColorRGB(0, 0, 0)
+    tamano = 8 if "mazo" not in carta else 6
+    c.setFont("Helvetica-Bold", tamano)
+    texto = f"{carta['color'].capitalize()} {carta['valor']}"
+    if "mazo" in carta:
+        texto += f" · {carta['mazo']}"
+    text_width = c.stringWidth(texto, "Helvetica-Bold", tamano)
+    text_x = x + (CELL_WIDTH - text_width) / 2
+    text_y = y - QR_SIZE - MARGIN - LABEL_HEIGHT + 0.1*cm
+    c.drawString(text_x, text_y, texto)
+
 def crear_pdf_etiquetas(nombre_archivo="etiquetas_uno_qr.pdf"):
     """Crea un PDF con todas las etiquetas QR organizadas"""
+    with _sin_a85():
+        _crear_pdf_etiquetas(nombre_archivo)
+
+def _crear_pdf_etiquetas(nombre_archivo):
     c = canvas.Canvas(nombre_archivo, pagesize=A4)
     
     cartas = []
@@ -63,39 +156,8 @@ def crear_pdf_etiquetas(nombre_archivo="etiquetas_uno_qr.pdf"):
                 x = START_X + (col * CELL_WIDTH)
                 y = START_Y - (row * CELL_HEIGHT)
                 
-                # Generar QR
-                qr_img = generar_qr(carta)
-                
-                # Guardar temporalmente como archivo
-                temp_filename = f"temp_qr_{carta['color']}_{carta['valor']}.png"
-                qr_img.save(temp_filename)
-                
-                # Dibujar recuadro de corte (guías)
-                c.setStrokeColorRGB(0.7, 0.7, 0.7)
-                c.setDash(2, 2)
-                c.rect(x, y - QR_SIZE - MARGIN - LABEL_HEIGHT, 
-                       CELL_WIDTH, CELL_HEIGHT)
-                c.setDash()
-                
-                # Dibujar QR
-                c.drawImage(temp_filename, 
-                           x + MARGIN, 
-                           y - QR_SIZE - MARGIN, 
-                           width=QR_SIZE, 
-                           height=QR_SIZE)
-                
-                # Limpiar archivo temporal
-                import os
-                os.remove(temp_filename)
-                
-                # Dibujar texto identificador
-                c.setFillColorRGB(0, 0, 0)
-                c.setFont("Helvetica-Bold", 8)
-                texto = f"{carta['color'].capitalize()} {carta['valor']}"
-                text_width = c.stringWidth(texto, "Helvetica-Bold", 8)
-                text_x = x + (CELL_WIDTH - text_width) / 2
-                text_y = y - QR_SIZE - MARGIN - LABEL_HEIGHT + 0.1*cm
-                c.drawString(text_x, text_y, texto)
+                # Generar QR en memoria y dibujarlo
+                _dibujar_etiqueta(c, carta, qr_png(_payload(carta)), x, y)
                 
                 carta_index += 1
         
@@ -113,5 +175,145 @@ def crear_pdf_etiquetas(nombre_archivo="etiquetas_uno_qr.pdf"):
     print(f"📄 Páginas generadas: {total_paginas}")
     print(f"📐 Layout: {COLS} columnas x {ROWS} filas = {COLS*ROWS} por página")
 
+def _cartas_mazos(desde, hasta, serie):
+    """Genera (sin crear listas) las cartas de los mazos desde..hasta con número de serie único por mazo"""
+    for m in range(desde, hasta + 1):
+        serial = f"{serie}-{m:05d}"
+        for color in COLORES:
+            for valor in VALORES:
+                yield {"color": color, "valor": valor, "mazo": serial}
+
+def _paginas(cartas, por_pagina):
+    """Agrupa el generador de cartas en páginas"""
+    pagina = []
+    for carta in cartas:
+        pagina.append(carta)
+        if len(pagina) == por_pagina:
+            yield pagina
+            pagina = []
+    if pagina:
+        yield pagina
+
+def _archivos_mazos(mazos, nombre_archivo, mazos_por_archivo):
+    """(ruta, primer mazo, último mazo) de cada PDF; un solo archivo si alcanza"""
+    if mazos <= mazos_por_archivo:
+        return [(nombre_archivo, 1, mazos)]
+    base, extension = os.path.splitext(nombre_archivo)
+    archivos = []
+    for n, desde in enumerate(range(1, mazos + 1, mazos_por_archivo), 1):
+        hasta = min(mazos, desde + mazos_por_archivo - 1)
+        archivos.append((f"{base}_{n:03d}{extension or '.pdf'}", desde, hasta))
+    return archivos
+
+def crear_pdf_mazos(mazos, nombre_archivo="etiquetas_mazos_qr.pdf", cols=COLS, filas=ROWS,
+                    serie="PK", procesos=None, mazos_por_archivo=50):
+    """
+    Crea los PDF con las etiquetas de muchos mazos, cada uno con su número de serie
+    
+    Los QR se generan en memoria con un pool de procesos; mientras se dibuja
+    una página, el pool ya renderiza la siguiente. reportlab guarda todas las
+    páginas de un PDF en memoria hasta escribirlo, así que con más de
+    `mazos_por_archivo` mazos la salida se parte en varios archivos
+    (nombre_001.pdf, nombre_002.pdf, ...) y la memoria queda acotada por el
+    tamaño de uno solo.
+    
+    Args:
+        mazos: Número de mazos a generar
+        nombre_archivo: Ruta del PDF de salida (base de los nombres si se parte)
+        cols: Columnas por página
+        filas: Filas por página
+        serie: Prefijo del número de serie de cada mazo
+        procesos: Procesos del pool (None = todos los núcleos)
+        mazos_por_archivo: Mazos por PDF como máximo
+    
+    Returns:
+        list: Rutas de los PDF generados
+    
+    Raises:
+        OSError: Si la carpeta de salida no se puede crear o escribir (antes de renderizar)
+    """
+    if START_X + cols * CELL_WIDTH > PAGE_WIDTH or filas * CELL_HEIGHT > START_Y:
+        raise ValueError(f"El layout {cols}x{filas} no entra en una página A4")
+    
+    # Una ruta inválida fallaría recién en c.save(), con todos los QR ya renderizados
+    directorio = os.path.dirname(os.path.abspath(nombre_archivo))
+    os.makedirs(directorio, exist_ok=True)
+    if not os.access(directorio, os.W_OK):
+        raise PermissionError(f"No se puede escribir en {directorio}")
+    
+    inicio = time.perf_counter()
+    por_pagina = cols * filas
+    archivos = _archivos_mazos(mazos, nombre_archivo, max(1, mazos_por_archivo))
+    total_cartas = 0
+    total_paginas = 0
+    
+    def renderizar(pool, pagina):
+        """Envía al pool los payloads de la página"""
+        textos = [_payload(carta) for carta in pagina]
+        return pagina, pool.map(_qr_png_masivo, textos, chunksize=4)
+    
+    with _sin_a85(), ProcessPoolExecutor(max_workers=procesos) as pool:
+        for ruta, desde, hasta in archivos:
+            c = canvas.Canvas(ruta, pagesize=A4)
+            paginas = _paginas(_cartas_mazos(desde, hasta, serie), por_pagina)
+            siguiente = next(paginas, None)
+            pendiente = renderizar(pool, siguiente) if siguiente else None
+            paginas_archivo = 0
+            
+            while pendiente:
+                pagina, resultados = pendiente
+                
+                # Lanzar la página siguiente antes de esperar y dibujar la actual
+                siguiente = next(paginas, None)
+                pendiente_nueva = renderizar(pool, siguiente) if siguiente else None
+                
+                if paginas_archivo:
+                    c.showPage()
+                for i, (carta, png) in enumerate(zip(pagina, resultados)):
+                    row, col = divmod(i, cols)
+                    x = START_X + (col * CELL_WIDTH)
+                    y = START_Y - (row * CELL_HEIGHT)
+                    _dibujar_etiqueta(c, carta, png, x, y)
+                
+                total_cartas += len(pagina)
+                paginas_archivo += 1
+                pendiente = pendiente_nueva
+            
+            c.save()
+            total_paginas += paginas_archivo
+    
+    duracion = time.perf_counter() - inicio
+    
+    if len(archivos) == 1:
+        print(f"✅ PDF generado: {archivos[0][0]}")
+    else:
+        print(f"✅ {len(archivos)} PDF generados: {archivos[0][0]} a {archivos[-1][0]} "
+              f"({mazos_por_archivo} mazos por archivo)")
+    print(f"🃏 Mazos: {mazos} (serie {serie}-00001 a {serie}-{mazos:05d})")
+    print(f"📊 Total de etiquetas: {total_cartas}")
+    print(f"📄 Páginas generadas: {total_paginas}")
+    print(f"📐 Layout: {cols} columnas x {filas} filas = {por_pagina} por página")
+    print(f"⏱️  Tiempo: {duracion:.1f} s")
+    return [ruta for ruta, _, _ in archivos]
+
 if __name__ == "__main__":
-    crear_pdf_etiquetas()
+    parser = argparse.ArgumentParser(description="Genera las etiquetas QR de las cartas UNO")
+    parser.add_argument("--mazos", type=int, default=None,
+                        help="Genera N mazos con número de serie único (sin esto: un mazo sin serie)")
+    parser.add_argument("--salida", default=None, help="Archivo PDF de salida")
+    parser.add_argument("--cols", type=int, default=COLS, help="Columnas por página")
+    parser.add_argument("--filas", type=int, default=ROWS, help="Filas por página")
+    parser.add_argument("--serie", default="PK", help="Prefijo del número de serie de los mazos")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos para generar los QR")
+    parser.add_argument("--mazos-por-archivo", type=int, default=50,
+                        help="Mazos por PDF; con más se generan varios archivos (memoria acotada)")
+    args = parser.parse_args()
+    
+    if args.mazos:
+        crear_pdf_mazos(args.mazos,
+                        nombre_archivo=args.salida or "etiquetas_mazos_qr.pdf",
+                        cols=args.cols, filas=args.filas,
+                        serie=args.serie, procesos=args.procesos,
+                        mazos_por_archivo=args.mazos_por_archivo)
+    else:
+        crear_pdf_etiquetas(args.salida or "etiquetas_uno_qr.pdf")
@@ -0,0 +1,473 @@
+import argparse
+import json
+import logging
+import queue
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+import registro
+
+log = logging.getLogger("pakorat.historial")
+
+ARCHIVO_HISTORIAL = "historial_manos.db"
+
+FILAS_CAMINO = 6  # Filas de todos los caminos
+
+# Caminos derivados -> columnas hacia atrás con las que se compara el gran camino
+DERIVADOS = {"ojo_grande": 1, "camino_chico": 2, "cucaracha": 3}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS zapatos (
+    mesa TEXT NOT NULL,
+    numero INTEGER NOT NULL,
+    inicio REAL NOT NULL,
+    mazos INTEGER,
+    PRIMARY KEY (mesa, numero)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS manos (
+    id INTEGER PRIMARY KEY,
+    mesa TEXT NOT NULL,
+    zapato INTEGER NOT NULL,
+    mano INTEGER NOT NULL,
+    ronda INTEGER,
+    t REAL NOT NULL,
+    ganador TEXT NOT NULL,
+    puntos_jugador INTEGER NOT NULL,
+    puntos_banca INTEGER NOT NULL,
+    par_jugador INTEGER NOT NULL,
+    par_banca INTEGER NOT NULL,
+    cartas TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS manos_mesa_zapato ON manos (mesa, zapato, mano);
+CREATE INDEX IF NOT EXISTS manos_mesa_t ON manos (mesa, t);
+
+-- Marcador acumulado por mesa, actualizado en el mismo lote que las manos
+CREATE TABLE IF NOT EXISTS totales (
+    mesa TEXT NOT NULL,
+    ganador TEXT NOT NULL,
+    cantidad INTEGER NOT NULL,
+    PRIMARY KEY (mesa, ganador)
+) WITHOUT ROWID;
+"""
+
+COLUMNAS_MANO = ("mesa", "zapato", "mano", "ronda", "t", "ganador", "puntos_jugador",
+                 "puntos_banca", "par_jugador", "par_banca", "cartas")
+
+
+def es_par(mano):
+    """True si las dos primeras cartas de la mano tienen el mismo valor"""
+    return len(mano) >= 2 and mano[0]["valor"] == mano[1]["valor"]
+
+
+def _color_derivado(largos, columnas_atras):
+    """
+    Color de la entrada de un camino derivado para la última celda del gran camino
+
+    Args:
+        largos: Largo de cada columna del gran camino (la última incluye la celda nueva)
+        columnas_atras: 1 ojo grande, 2 camino chico, 3 cucaracha
+
+    Returns:
+        str: "rojo", "azul" o None si el camino todavía no empieza
+    """
+    columna = len(largos) - 1
+    fila = largos[-1] - 1
+    if fila == 0:
+        # Columna nueva: ¿las dos columnas anteriores comparadas tenían el mismo largo?
+        if columna < columnas_atras + 1:
+            return None
+        return "rojo" if largos[columna - 1] == largos[columna - 1 - columnas_atras] else "azul"
+    if columna < columnas_atras:
+        return None
+    previo = largos[columna - columnas_atras]
+    # Rojo si la columna de referencia llega a esta fila o se cortó antes;
+    # azul si terminó justo en la fila anterior
+    return "azul" if previo == fila else "rojo"
+
+
+class _Camino:
+    """
+    Grilla de 6 filas al estilo del gran camino
+
+    Cada símbolo igual al anterior baja una fila; uno distinto abre la
+    siguiente columna. Si la columna está llena (o la fila de abajo ya está
+    ocupada) la racha sigue hacia la derecha ("cola de dragón").
+    """
+
+    def __init__(self):
+        self.celdas = []   # [x, y, símbolo, empates]
+        self.largos = []   # Largo de cada columna lógica (racha)
+        self.columnas = 0  # Ancho ocupado (incluye las colas de dragón)
+        self._ocupadas = set()
+        self._x_columna = -1
+
+    def agregar(self, simbolo):
+        if self.celdas and self.celdas[-1][2] == simbolo:
+            x, y = self.celdas[-1][0], self.celdas[-1][1]
+            if y + 1 < FILAS_CAMINO and (x, y + 1) not in self._ocupadas:
+                y += 1
+            else:
+                x += 1
+            self.largos[-1] += 1
+        else:
+            x, y = self._x_columna + 1, 0
+            while (x, y) in self._ocupadas:  # Una cola de dragón pasó por arriba
+                x += 1
+            self._x_columna = x
+            self.largos.append(1)
+        self._ocupadas.add((x, y))
+        self.celdas.append([x, y, simbolo, 0])
+        self.columnas = max(self.columnas, x + 1)
+
+
+class CaminosBaccarat:
+    """
+    Caminos y rachas del zapato actual, actualizados mano a mano
+
+    Mantiene el bead plate (todas las manos en orden), el gran camino (sin
+    empates, que se anotan sobre la celda anterior), los tres caminos
+    derivados y las rachas. Agregar una mano es O(1): solo se mira la última
+    columna del gran camino y el largo de las columnas de referencia, nunca
+    el historial completo.
+    """
+
+    def __init__(self):
+        self.version = 0  # Aumenta con cada cambio (sirve para detectar cambios)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Vacía los caminos (nuevo zapato)"""
+        self.manos = 0
+        self.cuentas = {"jugador": 0, "banca": 0, "empate": 0}
+        self.pares = {"jugador": 0, "banca": 0}
+        self.perlas = []                  # (ganador, par_jugador, par_banca) en orden
+        self.gran_camino = _Camino()
+        self.derivados = {nombre: _Camino() for nombre in DERIVADOS}
+        self.empates_iniciales = 0        # Empates antes de la primera celda del gran camino
+        self.racha = (None, 0)            # Ganador (jugador/banca) y largo de la racha actual
+        self.racha_maxima = {"jugador": 0, "banca": 0}
+        self.version += 1
+
+    def agregar(self, ganador, par_jugador=False, par_banca=False):
+        """
+        Agrega una mano terminada
+
+        Args:
+            ganador: "jugador", "banca" o "empate"
+            par_jugador: True si las dos primeras cartas del jugador son par
+            par_banca: True si las dos primeras cartas de la banca son par
+        """
+        self.manos += 1
+        self.version += 1
+        self.cuentas[ganador] += 1
+        self.pares["jugador"] += bool(par_jugador)
+        self.pares["banca"] += bool(par_banca)
+        self.perlas.append((ganador, bool(par_jugador), bool(par_banca)))
+
+        if ganador == "empate":
+            if self.gran_camino.celdas:
+                self.gran_camino.celdas[-1][3] += 1
+            else:
+                self.empates_iniciales += 1
+            return
+
+        self.gran_camino.agregar(ganador)
+        largo = self.racha[1] + 1 if self.racha[0] == ganador else 1
+        self.racha = (ganador, largo)
+        self.racha_maxima[ganador] = max(self.racha_maxima[ganador], largo)
+
+        for nombre, columnas_atras in DERIVADOS.items():
+            color = _color_derivado(self.gran_camino.largos, columnas_atras)
+            if color:
+                self.derivados[nombre].agregar(color)
+
+    def texto_gran_camino(self):
+        """Gran camino en texto (B/J, con * donde hubo empates), para la terminal"""
+        columnas = self.gran_camino.columnas
+        filas = [["  "] * columnas for _ in range(FILAS_CAMINO)]
+        for x, y, ganador, empates in self.gran_camino.celdas:
+            filas[y][x] = ("B" if ganador == "banca" else "J") + ("*" if empates else "")
+        return "\n".join(" ".join(c.ljust(2) for c in fila).rstrip() for fila in filas).rstrip("\n")
+
+
+class HistorialManos:
+    """
+    Historial de manos en SQLite con los caminos del zapato en memoria
+
+    Al finalizar cada ronda la mano se agrega a los caminos (en el hilo del
+    juego, O(1)) y se encola; un hilo escritor las inserta por lotes en una
+    sola transacción, así el bucle nunca espera al disco. La tabla de manos
+    tiene índices por mesa/zapato y por mesa/hora, y el marcador acumulado de
+    cada mesa se mantiene en una tabla aparte, así que las consultas
+    habituales no recorren millones de filas.
+
+    Sin archivo solo se mantienen los caminos en memoria.
+    """
+
+    def __init__(self, archivo=ARCHIVO_HISTORIAL, mesa="mesa-1", lote=64, intervalo=1.0):
+        """
+        Args:
+            archivo: Base SQLite (se crea si no existe); None = sin guardar
+            mesa: Identificador de la mesa
+            lote: Manos por transacción como máximo
+            intervalo: Segundos que el escritor junta manos antes de escribir
+        """
+        self.archivo = archivo
+        self.mesa = mesa
+        self.lote = lote
+        self.intervalo = intervalo
+        self.caminos = CaminosBaccarat()
+        self.zapato = 0
+        self.mano = 0
+        self.escritas = 0
+        self._cola = queue.Queue()
+        self._hilo = None
+
+        if archivo:
+            con = self._conexion()
+            try:
+                con.executescript(ESQUEMA)
+                self.zapato = con.execute("SELECT COALESCE(MAX(numero), 0) FROM zapatos WHERE mesa = ?",
+                                          (mesa,)).fetchone()[0]
+            finally:
+                con.close()
+
+    def _conexion(self):
+        con = sqlite3.connect(self.archivo, timeout=10)
+        con.execute("PRAGMA journal_mode=WAL")  # Las consultas no bloquean al escritor
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    def iniciar(self, mazos=None):
+        """Arranca el escritor y abre un zapato nuevo"""
+        if self.archivo:
+            self._hilo = threading.Thread(target=self._escribir, name="historial", daemon=True)
+            self._hilo.start()
+        self.nuevo_zapato(mazos)
+        return self
+
+    def vincular(self, juego):
+        """Registra cada ronda terminada del juego"""
+        juego.agregar_observador(self._al_evento)
+
+    def _al_evento(self, evento, juego):
+        if evento == "finalizado":
+            self.registrar(juego)
+
+    def nuevo_zapato(self, mazos=None):
+        """Empieza un zapato nuevo (caminos vacíos)"""
+        self.zapato += 1
+        self.mano = 0
+        self.caminos.reiniciar()
+        if self._hilo:
+            self._cola.put(("zapato", (self.mesa, self.zapato, time.time(), mazos)))
+
+    def registrar(self, juego):
+        """Agrega la ronda finalizada a los caminos y la encola para guardarla"""
+        par_jugador = es_par(juego.mano_jugador)
+        par_banca = es_par(juego.mano_banca)
+        self.mano += 1
+        self.caminos.agregar(juego.ganador, par_jugador, par_banca)
+        if self._hilo:
+            cartas = json.dumps({"jugador": juego.mano_jugador, "banca": juego.mano_banca},
+                                ensure_ascii=False, separators=(",", ":"))
+            self._cola.put(("mano", (self.mesa, self.zapato, self.mano, registro.contexto["ronda"],
+                                     time.time(), juego.ganador, juego.puntos_jugador,
+                                     juego.puntos_banca, int(par_jugador), int(par_banca), cartas)))
+
+    def _escribir(self):
+        """Hilo escritor: junta hasta `lote` manos (o `intervalo` segundos) por transacción"""
+        con = self._conexion()
+        terminar = False
+        try:
+            while not terminar:
+                lote = [self._cola.get()]
+                limite = time.monotonic() + self.intervalo
+                while len(lote) < self.lote and lote[-1] is not None:
+                    try:
+                        lote.append(self._cola.get(timeout=max(0.0, limite - time.monotonic())))
+                    except queue.Empty:
+                        break
+                if lote[-1] is None:
+                    terminar = True
+                    lote.pop()
+                if lote:
+                    self._guardar(con, lote)
+        finally:
+            con.close()
+
+    def _guardar(self, con, lote):
+        zapatos = [datos for tipo, datos in lote if tipo == "zapato"]
+        manos = [datos for tipo, datos in lote if tipo == "mano"]
+        conteo = Counter(mano[5] for mano in manos)
+        try:
+            with con:
+                con.executemany("INSERT OR REPLACE INTO zapatos VALUES (?, ?, ?, ?)", zapatos)
+                con.executemany(f"INSERT INTO manos ({', '.join(COLUMNAS_MANO)}) "
+                                f"VALUES ({', '.join('?' * len(COLUMNAS_MANO))})", manos)
+                con.executemany("INSERT INTO totales VALUES (?, ?, ?) ON CONFLICT (mesa, ganador) "
+                                "DO UPDATE SET cantidad = cantidad + excluded.cantidad",
+                                [(self.mesa, ganador, n) for ganador, n in conteo.items()])
+            self.escritas += len(manos)
+        except sqlite3.Error as e:
+            log.error("📚 no se pudieron guardar %d manos: %s", len(manos), e)
+
+    def cerrar(self):
+        """Escribe lo pendiente y detiene el escritor"""
+        if self._hilo is None:
+            return
+        self._cola.put(None)
+        self._hilo.join()
+        self._hilo = None
+        log.info("📚 historial: %d manos guardadas en %s", self.escritas, self.archivo,
+                 extra={"escritas": self.escritas})
+
+    # Consultas (conexión propia: no esperan al escritor; lo encolado aún no aparece)
+
+    def totales(self, mesa=None):
+        """
+        Marcador acumulado de la mesa
+
+        Returns:
+            dict: {"jugador": n, "banca": n, "empate": n}
+        """
+        resultado = {"jugador": 0, "banca": 0, "empate": 0}
+        if not self.archivo:
+            return resultado
+        con = self._conexion()
+        try:
+            for ganador, cantidad in con.execute("SELECT ganador, cantidad FROM totales WHERE mesa = ?",
+                                                 (mesa or self.mesa,)):
+                resultado[ganador] = cantidad
+        finally:
+            con.close()
+        return resultado
+
+    def manos(self, zapato=None, desde=None, hasta=None, limite=100, mesa=None):
+        """
+        Manos guardadas de una mesa, por zapato o por rango de horas
+
+        Args:
+            zapato: Número de zapato (ordenadas por mano)
+            desde: time.time() mínimo (opcional)
+            hasta: time.time() máximo (opcional)
+            limite: Máximo de manos; sin zapato se devuelven las más recientes
+            mesa: Otra mesa (default la propia)
+
+        Returns:
+            list: dicts con las columnas de la tabla (cartas ya decodificadas)
+        """
+        if not self.archivo:
+            return []
+        condiciones, valores = ["mesa = ?"], [mesa or self.mesa]
+        if zapato is not None:
+            condiciones.append("zapato = ?")
+            valores.append(zapato)
+        if desde is not None:
+            condiciones.append("t >= ?")
+            valores.append(desde)
+        if hasta is not None:
+            condiciones.append("t < ?")
+            valores.append(hasta)
+        orden = "mano" if zapato is not None else "t DESC"
+        consulta = (f"SELECT {', '.join(COLUMNAS_MANO)} FROM manos WHERE {' AND '.join(condiciones)} "
+                    f"ORDER BY {orden} LIMIT ?")
+        con = self._conexion()
+        try:
+            filas = con.execute(consulta, valores + [limite]).fetchall()
+        finally:
+            con.close()
+        manos = []
+        for fila in filas:
+            mano = dict(zip(COLUMNAS_MANO, fila))
+            mano["cartas"] = json.loads(mano["cartas"])
+            manos.append(mano)
+        return manos
+
+    def caminos_zapato(self, zapato, mesa=None):
+        """Reconstruye los caminos de un zapato guardado"""
+        caminos = CaminosBaccarat()
+        for mano in self.manos(zapato=zapato, limite=-1, mesa=mesa):
+            caminos.agregar(mano["ganador"], mano["par_jugador"], mano["par_banca"])
+        return caminos
+
+
+def _poblar(historial, cantidad, manos_por_zapato=70):
+    """Inserta manos al azar (para medir consultas sobre historiales grandes)"""
+    pesos = {"banca": 0.4586, "jugador": 0.4462, "empate": 0.0952}
+    con = historial._conexion()
+    lote = []
+    t = time.time() - cantidad * 30
+    try:
+        for i in range(cantidad):
+            if i % manos_por_zapato == 0:
+                historial.zapato += 1
+                historial.mano = 0
+                lote.append(("zapato", (historial.mesa, historial.zapato, t, 8)))
+            historial.mano += 1
+            ganador = random.choices(list(pesos), weights=list(pesos.values()))[0]
+            lote.append(("mano", (historial.mesa, historial.zapato, historial.mano, None, t, ganador,
+                                  0, 0, int(random.random() < 0.1), int(random.random() < 0.1), "{}")))
+            t += 30
+            if len(lote) >= 10000:
+                historial._guardar(con, lote)
+                lote = []
+        if lote:
+            historial._guardar(con, lote)
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Historial de manos y caminos de la mesa")
+    parser.add_argument("--db", default=ARCHIVO_HISTORIAL, help="Base SQLite del historial")
+    parser.add_argument("--mesa", default="mesa-1", help="Identificador de la mesa")
+    sub = parser.add_subparsers(dest="accion", required=True)
+
+    sub.add_parser("resumen", help="Marcador acumulado y últimas manos")
+
+    p_zapato = sub.add_parser("zapato", help="Caminos y rachas de un zapato")
+    p_zapato.add_argument("numero", type=int, nargs="?", default=None,
+                          help="Número de zapato (default el último)")
+
+    p_poblar = sub.add_parser("poblar", help="Agrega manos al azar y mide las consultas")
+    p_poblar.add_argument("--manos", type=int, default=1_000_000)
+
+    args = parser.parse_args()
+    historial = HistorialManos(args.db, mesa=args.mesa)
+
+    if args.accion == "poblar":
+        inicio = time.perf_counter()
+        _poblar(historial, args.manos)
+        print(f"📚 {args.manos} manos insertadas en {time.perf_counter() - inicio:.1f} s")
+        for nombre, consulta in [
+            ("totales", lambda: historial.totales()),
+            ("zapato", lambda: historial.manos(zapato=historial.zapato // 2, limite=-1)),
+            ("última hora", lambda: historial.manos(desde=time.time() - 3600)),
+            ("caminos", lambda: historial.caminos_zapato(historial.zapato)),
+        ]:
+            inicio = time.perf_counter()
+            consulta()
+            print(f"   {nombre}: {(time.perf_counter() - inicio) * 1000:.1f} ms")
+
+    elif args.accion == "resumen":
+        totales = historial.totales()
+        print(f"📚 {args.mesa}: jugador {totales['jugador']}, banca {totales['banca']}, "
+              f"empate {totales['empate']} ({historial.zapato} zapatos)")
+        for mano in reversed(historial.manos(limite=10)):
+            hora = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(mano["t"]))
+            print(f"   {hora}  zapato {mano['zapato']} mano {mano['mano']}: {mano['ganador']} "
+                  f"({mano['puntos_jugador']} vs {mano['puntos_banca']})")
+
+    else:
+        numero = args.numero or historial.zapato
+        caminos = historial.caminos_zapato(numero)
+        print(f"📚 zapato {numero}: {caminos.manos} manos {caminos.cuentas}, pares {caminos.pares}")
+        print(f"   racha actual: {caminos.racha[0]} x{caminos.racha[1]}, "
+              f"máximas: {caminos.racha_maxima}")
+        print(caminos.texto_gran_camino())
+        for nombre, camino in caminos.derivados.items():
+            print(f"   {nombre}: " + "".join("R" if c[2] == "rojo" else "A" for c in camino.celdas))
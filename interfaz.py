@@ -1,12 +1,41 @@
+import logging
+import time
 import cv2
 import numpy as np
-from detector_cartas import DetectorCartas
+from detector_cartas import DetectorCartas, dibujar_anotaciones
+from camara import GestorCamara, CONECTANDO
+from calibracion import ARCHIVO_PERFILES, PerfilesCamara, ValidadorPerfil
 from juego_baccarat import Baccarat
+from zapato import ZapatoBaccarat
+from apuestas import LibroApuestas
+from metricas import Metricas
+from trazas import RegistroLatencias
+from historial import HistorialManos, FILAS_CAMINO
+import registro
+
+log = logging.getLogger("pakorat.mesa")
 
 class InterfazBaccarat:
     """Interfaz gráfica para el juego de Baccarat con detección de cartas"""
     
-    def __init__(self, ip_webcam_url=None, ancho_ventana=800, alto_ventana=480):
+    ANCHO_PANEL = 250  # Ancho del panel lateral derecho
+    PAUSA_TRAS_CARTA = 0.5  # Segundos sin detectar tras leer una carta
+    
+    # Teclas de la ventana -> comandos de ejecutar_comando
+    TECLAS = {
+        ord(' '): "iniciar",
+        ord('r'): "reiniciar",
+        ord('d'): "debug",
+        ord('b'): "barajar",
+        ord('q'): "salir",
+    }
+    
+    def __init__(self, ip_webcam_url=None, ancho_ventana=800, alto_ventana=480, mazos=8,
+                 pantalla_separada=False, puerto_transmision=None, puerto_difusion=None,
+                 archivo_metricas=None, archivo_trazas=None, mesa="mesa-1",
+                 archivo_registro=None, detector=None, archivo_perfiles=ARCHIVO_PERFILES,
+                 directorio_auditoria=None, auditoria_anotada=False, archivo_historial=None,
+                 hilos_deteccion=1):
         """
         Inicializa la interfaz
         
@@ -14,9 +43,33 @@ class InterfazBaccarat:
             ip_webcam_url: URL de la cámara IP (opcional)
             ancho_ventana: Ancho deseado de la ventana (default 800)
             alto_ventana: Alto deseado de la ventana (default 480)
+            mazos: Número de mazos UNO en el zapato (default 8)
+            pantalla_separada: Si True, la ventana corre en otro proceso (PantallaRemota)
+            puerto_transmision: Puerto para transmitir la mesa por MJPEG (opcional)
+            puerto_difusion: Puerto TCP para publicar los cambios de estado (opcional)
+            archivo_metricas: Archivo donde exportar las métricas por etapa (opcional,
+                              .json o texto Prometheus). Sin él solo se miden en modo debug
+            archivo_trazas: JSONL con la traza de latencia de cada carta aceptada (opcional)
+            mesa: Identificador de la mesa en los registros
+            archivo_registro: Archivo de registros JSON (opcional)
+            detector: DetectorCartas ya creado, p. ej. con la cámara abierta en segundo plano (opcional)
+            archivo_perfiles: Perfiles de calibración por cámara (ver calibracion.py); el de
+                              esta cámara se aplica con el primer frame y se re-valida
+            directorio_auditoria: Carpeta donde grabar la mesa y sus eventos para
+                                  auditoría (opcional, ver auditoria.py)
+            auditoria_anotada: Si True se graba la mesa dibujada en lugar del frame crudo
+            archivo_historial: Base SQLite del historial de manos (opcional, ver historial.py);
+                               con ella el marcador sobrevive a los reinicios
+            hilos_deteccion: Hilos para buscar cartas por franjas en cámaras de alta
+                             resolución (1 = un hilo, 0 = todos los núcleos)
         """
-        self.detector = DetectorCartas(ip_webcam_url)
+        self.detector = detector or DetectorCartas(ip_webcam_url)
+        if hilos_deteccion != 1:
+            self.detector.usar_franjas(hilos_deteccion)
         self.juego = Baccarat()
+        self.zapato = ZapatoBaccarat(mazos=mazos)
+        self.libro = LibroApuestas()
+        self.libro.vincular(self.juego)  # Liquida las apuestas al finalizar cada ronda
         self.esperando_carta = False
         self.ultima_carta_leida = None
         self.modo_debug = False
@@ -25,33 +78,122 @@ class InterfazBaccarat:
         # Configuración de ventana
         self.ancho_ventana = ancho_ventana
         self.alto_ventana = alto_ventana
+        self.pantalla_separada = pantalla_separada
+        self.puerto_transmision = puerto_transmision
+        
+        # Publicación de deltas de estado para sistemas externos
+        self.difusion = None
+        if puerto_difusion:
+            from difusion import DifusionEstado  # asyncio solo si se usa
+            self.difusion = DifusionEstado(self.juego, self.zapato, puerto=puerto_difusion)
+        
+        # Tiempos por etapa: el detector comparte la misma instancia
+        self.metricas = Metricas(activo=archivo_metricas is not None, archivo=archivo_metricas)
+        self.detector.metricas = self.metricas
+        
+        # Umbrales de detección calibrados para esta cámara (si hay perfil)
+        self.perfil_camara = ValidadorPerfil(self.detector, PerfilesCamara(archivo_perfiles))
+        
+        # Latencia de cada carta desde que aparece hasta que avanza el juego
+        self.trazas = RegistroLatencias(archivo_trazas)
+        
+        # Historial de manos (escrito en segundo plano) y caminos del zapato en memoria
+        self.historial = HistorialManos(archivo_historial, mesa=mesa)
+        self.historial.vincular(self.juego)
+        
+        # Registros estructurados (se configuran al ejecutar)
+        self.mesa = mesa
+        self.archivo_registro = archivo_registro
+        self.ronda = 0
+        
+        # Cámara leída en segundo plano con reconexión automática (se crea al ejecutar)
+        self.camara = None
+        
+        # Grabación de auditoría en segundo plano (se crea al ejecutar)
+        self.directorio_auditoria = directorio_auditoria
+        self.auditoria_anotada = auditoria_anotada
+        self.grabador = None
+        
+        # Tiempos de arranque (perf_counter): quien lanza el juego pone "inicio"
+        # y opcionalmente "fin_preguntas"; el bucle agrega el primer frame y la
+        # primera detección
+        self.arranque = None
 
-        self.victorias_jugador = 0
-        self.victorias_banca = 0
-        self.empates = 0
-        
+        totales = self.historial.totales()
+        self.victorias_jugador = totales["jugador"]
+        self.victorias_banca = totales["banca"]
+        self.empates = totales["empate"]
+        self.juego.agregar_observador(self._al_evento_ronda)
+        
+        # Caché del panel lateral: capa fija por alto de ventana y
+        # panel completo mientras no cambie lo que muestra
+        self._panel_base = None
+        self._panel_cache = None
+        self._clave_cache = None
+        self._necesita_cache = None
+        
+        # Lienzo de salida reservado una vez: la cámara se escribe en la parte
+        # izquierda y el panel en la derecha, sin arreglos nuevos por frame
+        self._lienzo = np.zeros((alto_ventana, ancho_ventana, 3), dtype=np.uint8)
+        self._sin_camara = np.zeros((alto_ventana, ancho_ventana - self.ANCHO_PANEL, 3), dtype=np.uint8)
+        
+    def _resolucion_video(self):
+        """Tamaño (ancho, alto) del área de video a la izquierda del panel"""
+        return (self.ancho_ventana - self.ANCHO_PANEL, self.alto_ventana)
+    
+    def _iniciar_auditoria(self):
+        """Arranca la grabación de auditoría si se pidió un directorio"""
+        if not self.directorio_auditoria:
+            return
+        from auditoria import GrabadorAuditoria
+        self.grabador = GrabadorAuditoria(self.directorio_auditoria)
+        self.grabador.vincular(self.juego)
+        self.grabador.iniciar()
+    
     def conectar(self):
-        """Conecta con la cámara"""
-        return self.detector.conectar_camara()
+        """Conecta con la cámara pidiendo directamente la resolución del área de video"""
+        resolucion = self._resolucion_video()
+        if self.detector.conectada:
+            # Ya abierta en segundo plano: solo falta la resolución
+            self.detector.ajustar_resolucion(resolucion)
+            return True
+        return self.detector.conectar_camara(resolucion=resolucion)
+    
+    def _marcar_arranque(self, evento):
+        """Registra (una sola vez) cuánto tardó en ocurrir un evento desde el arranque"""
+        if self.arranque is None or evento in self.arranque:
+            return
+        ahora = self.arranque[evento] = time.perf_counter()
+        texto = f"🚀 {evento.replace('_', ' ')} a los {ahora - self.arranque['inicio']:.2f} s del arranque"
+        if "fin_preguntas" in self.arranque:
+            texto += f" ({ahora - self.arranque['fin_preguntas']:.2f} s después de la configuración)"
+        log.info(texto, extra={"arranque": {k: round(v - self.arranque["inicio"], 3)
+                                            for k, v in self.arranque.items()}})
     
     def _carta_a_clave(self, carta):
         """
         Convierte una carta a una clave única para comparación
         
         Args:
-            carta: dict {"color": "rojo", "valor": 7}
+            carta: dict {"color": "rojo", "valor": 7, "mazo": "PK-0003"}
             
         Returns:
-            str: Clave única "rojo_7"
+            str: Clave única "rojo_7_PK-0003"; "rojo_7" si la etiqueta no trae
+                 número de serie (generar_qr.py sin --mazos)
         """
-        return f"{carta['color'].lower()}_{carta['valor']}"
+        clave = f"{carta['color'].lower()}_{carta['valor']}"
+        if "mazo" in carta:
+            clave += f"_{carta['mazo']}"
+        return clave
     
     def _carta_ya_usada(self, carta):
         """
-        Verifica si la carta ya fue usada en esta partida
+        Verifica si la carta ya fue usada en esta partida. Con número de
+        serie se compara la copia física (otra copia del mismo color y valor
+        de un zapato de varios mazos se acepta); sin él, el color y el valor
         
         Args:
-            carta: dict {"color": "rojo", "valor": 7}
+            carta: dict {"color": "rojo", "valor": 7, "mazo": "PK-0003"}
             
         Returns:
             bool: True si ya fue usada, False si es nueva
@@ -75,15 +217,16 @@ class InterfazBaccarat:
         """
         self.cartas_usadas_en_partida.clear()
     
-    def dibujar_interfaz(self, frame):
-        """Dibuja la interfaz del juego sobre el frame"""
-        # Redimensionar frame según configuración
-        frame_resizado = cv2.resize(frame, (self.ancho_ventana - 250, self.alto_ventana))
-        h, w = frame_resizado.shape[:2]
-        
-        # Crear panel lateral derecho (más compacto)
-        panel_width = 250
-        panel = np.zeros((h, panel_width, 3), dtype=np.uint8)
+    def _panel_estatico(self, alto):
+        """
+        Genera (una sola vez por alto de ventana) la capa fija del panel:
+        fondo, título, encabezado del marcador y controles
+        """
+        if self._panel_base is not None and self._panel_base.shape[0] == alto:
+            return self._panel_base
+        
+        panel_width = self.ANCHO_PANEL
+        panel = np.zeros((alto, panel_width, 3), dtype=np.uint8)
         panel[:] = (40, 40, 40)  # Fondo gris oscuro
         
         y_offset = 15
@@ -97,13 +240,54 @@ class InterfazBaccarat:
         cv2.line(panel, (5, y_offset), (panel_width-5, y_offset), (100, 100, 100), 1)
         y_offset += 15
         
-        # Estado del juego
-        estado = self.juego.obtener_estado()
-        
         # Marcador
         cv2.putText(panel, "=== MARCADOR ===", (10, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
-        y_offset += 20
+        
+        # Controles en la parte inferior
+        y_offset = alto - 70
+        cv2.line(panel, (5, y_offset), (panel_width-5, y_offset), (100, 100, 100), 1)
+        y_offset += 12
+        
+        cv2.putText(panel, "CONTROLES:", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        y_offset += 14
+        cv2.putText(panel, "SPC - Ronda", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        y_offset += 13
+        cv2.putText(panel, "R - Reset  B - Barajar", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        y_offset += 13
+        cv2.putText(panel, "D - Debug", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        y_offset += 13
+        cv2.putText(panel, "Q - Salir", (10, y_offset),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
+        
+        self._panel_base = panel
+        self._panel_cache = None
+        return panel
+    
+    def _clave_panel(self):
+        """
+        Resume todo lo que se muestra en la parte dinámica del panel.
+        Si no cambia, el panel cacheado sigue siendo válido.
+        """
+        return (
+            self.juego.version,
+            self.victorias_jugador,
+            self.victorias_banca,
+            self.empates,
+            self.zapato.cartas_vistas,
+            self.historial.caminos.version,
+        )
+    
+    def _dibujar_panel_dinamico(self, panel):
+        """Dibuja marcador, manos y mensaje sobre una copia de la capa fija"""
+        panel_width = self.ANCHO_PANEL
+        estado = self.juego.obtener_estado()
+        
+        y_offset = 80
         cv2.putText(panel, f"Jugador: {self.victorias_jugador}", (15, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
         y_offset += 18
@@ -112,6 +296,18 @@ class InterfazBaccarat:
         y_offset += 18
         cv2.putText(panel, f"Empates: {self.empates}", (15, y_offset),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (150, 150, 150), 1)
+        y_offset += 18
+        
+        # Zapato: cartas restantes y ventaja estimada de banca/jugador
+        if self.zapato.corte_alcanzado:
+            cv2.putText(panel, "Zapato: BARAJAR (B)", (15, y_offset),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 255), 1)
+        else:
+            texto = (f"Zapato {self.zapato.restantes} "
+                     f"B{self.zapato.ventaja('banca') * 100:+.1f} "
+                     f"J{self.zapato.ventaja('jugador') * 100:+.1f}")
+            cv2.putText(panel, texto, (15, y_offset),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.42, (180, 180, 180), 1)
         y_offset += 20
         
         # Línea separadora
@@ -189,46 +385,184 @@ class InterfazBaccarat:
         if linea_actual:
             cv2.putText(panel, linea_actual.strip(), (10, y_offset),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.42, (255, 255, 100), 1)
+            y_offset += 14
         
-        # Controles en la parte inferior
-        y_offset = h - 70
-        cv2.line(panel, (5, y_offset), (panel_width-5, y_offset), (100, 100, 100), 1)
-        y_offset += 12
+        self._dibujar_caminos(panel, y_offset)
+    
+    def _dibujar_caminos(self, panel, y_offset):
+        """
+        Dibuja rachas y caminos del zapato entre el estado y los controles.
+        Lo que no entra se omite, en orden: bead plate, caminos derivados,
+        gran camino. Solo se muestran las últimas columnas de cada camino.
+        """
+        caminos = self.historial.caminos
+        limite = panel.shape[0] - 74
+        ancho = self.ANCHO_PANEL - 20
+        colores = {"jugador": (0, 255, 0), "banca": (0, 100, 255), "empate": (150, 150, 150),
+                   "rojo": (0, 0, 255), "azul": (255, 80, 0)}
         
-        cv2.putText(panel, "CONTROLES:", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (200, 200, 200), 1)
+        if y_offset + 14 > limite:
+            return
+        cv2.line(panel, (5, y_offset - 4), (self.ANCHO_PANEL - 5, y_offset - 4), (100, 100, 100), 1)
+        ganador, largo = caminos.racha
+        racha = f"{ganador[0].upper()}x{largo}" if ganador else "-"
+        texto = (f"Racha {racha}  Max J{caminos.racha_maxima['jugador']} "
+                 f"B{caminos.racha_maxima['banca']}  E{caminos.cuentas['empate']}")
+        cv2.putText(panel, texto, (10, y_offset + 8),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.38, (200, 200, 200), 1)
         y_offset += 14
-        cv2.putText(panel, "SPC - Ronda", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-        y_offset += 13
-        cv2.putText(panel, "R - Reset", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-        y_offset += 13
-        cv2.putText(panel, "D - Debug", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
-        y_offset += 13
-        cv2.putText(panel, "Q - Salir", (10, y_offset),
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
         
-        # Combinar frame de cámara con panel
-        frame_combinado = np.hstack([frame_resizado, panel])
+        def grilla(camino, x0, y0, celda, columnas):
+            desde = max(0, camino.columnas - columnas)
+            for x, y, simbolo, empates in camino.celdas:
+                if x < desde:
+                    continue
+                centro = (x0 + (x - desde) * celda + celda // 2, y0 + y * celda + celda // 2)
+                cv2.circle(panel, centro, max(1, celda // 2 - 1), colores[simbolo], 1 if celda > 5 else -1)
+                if empates:
+                    cv2.line(panel, (centro[0] - celda // 2 + 1, centro[1] + celda // 2 - 1),
+                             (centro[0] + celda // 2 - 1, centro[1] - celda // 2 + 1), colores["empate"], 1)
+        
+        # Gran camino (celdas de 8 px)
+        celda = 8
+        if y_offset + FILAS_CAMINO * celda > limite:
+            return
+        grilla(caminos.gran_camino, 10, y_offset, celda, ancho // celda)
+        y_offset += FILAS_CAMINO * celda + 4
+        
+        # Caminos derivados lado a lado (celdas de 4 px)
+        celda = 4
+        if y_offset + FILAS_CAMINO * celda > limite:
+            return
+        ancho_derivado = ancho // len(caminos.derivados)
+        for i, camino in enumerate(caminos.derivados.values()):
+            grilla(camino, 10 + i * ancho_derivado, y_offset, celda, (ancho_derivado - 4) // celda)
+        y_offset += FILAS_CAMINO * celda + 4
+        
+        # Bead plate: una mano por celda, de arriba hacia abajo y de izquierda a derecha
+        celda = 8
+        if y_offset + FILAS_CAMINO * celda > limite:
+            return
+        columnas = ancho // celda
+        desde = max(0, (len(caminos.perlas) + FILAS_CAMINO - 1) // FILAS_CAMINO - columnas)
+        for i in range(desde * FILAS_CAMINO, len(caminos.perlas)):
+            ganador = caminos.perlas[i][0]
+            x, y = divmod(i, FILAS_CAMINO)
+            centro = (10 + (x - desde) * celda + celda // 2, y_offset + y * celda + celda // 2)
+            cv2.circle(panel, centro, celda // 2 - 1, colores[ganador], -1)
+    
+    def _obtener_panel(self, alto):
+        """
+        Retorna el panel lateral listo para componer.
+        Solo se vuelve a rasterizar cuando cambia el estado mostrado.
+        """
+        base = self._panel_estatico(alto)
+        clave = self._clave_panel()
+        
+        if self._panel_cache is None or clave != self._clave_cache:
+            panel = base.copy()
+            self._dibujar_panel_dinamico(panel)
+            self._panel_cache = panel
+            self._clave_cache = clave
+            self._necesita_cache = self.juego.obtener_estado()["necesita_carta"]
+        
+        return self._panel_cache
+    
+    def dibujar_interfaz(self, frame, anotaciones=None):
+        """
+        Compone la interfaz del juego en el lienzo reservado
+        
+        Args:
+            frame: Frame de la cámara (sin modificar)
+            anotaciones: Lista de anotaciones del detector (opcional)
+            
+        Returns:
+            numpy.ndarray: El lienzo compuesto (se reutiliza en cada llamada)
+        """
+        h = self.alto_ventana
+        w = self.ancho_ventana - self.ANCHO_PANEL
+        vista_camara = self._lienzo[:, :w]
+        
+        # Redimensionar el frame directamente dentro del lienzo
+        alto_frame, ancho_frame = frame.shape[:2]
+        if (alto_frame, ancho_frame) == (h, w):
+            np.copyto(vista_camara, frame)
+        else:
+            cv2.resize(frame, (w, h), dst=vista_camara)
+        
+        # Panel lateral derecho (capa fija + parte dinámica cacheadas)
+        self._lienzo[:, w:] = self._obtener_panel(h)
+        
+        # Overlay de tiempos por etapa (solo en modo debug)
+        if self.modo_debug and self.metricas.activo:
+            self._dibujar_metricas(self._lienzo[:, w:])
+        
+        # Anotaciones del detector escaladas al área de video
+        if anotaciones:
+            dibujar_anotaciones(vista_camara, anotaciones,
+                                escala=(w / ancho_frame, h / alto_frame))
         
         # Mensaje principal en el frame de la cámara
         if self.esperando_carta:
-            tipo_carta = estado["necesita_carta"]
+            tipo_carta = self._necesita_cache
             if tipo_carta:
                 msg = f"Muestra carta de: {tipo_carta.upper()}"
-                cv2.putText(frame_combinado, msg, (15, 35),
+                cv2.putText(vista_camara, msg, (15, 35),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
         
-        return frame_combinado
+        return self._lienzo
     
-    def procesar_carta_detectada(self, carta):
-        """Procesa una carta detectada y la agrega al juego"""
+    def _frame_sin_camara(self):
+        """
+        Frame de reemplazo mientras no hay cámara: el bucle sigue dibujando la
+        mesa y atendiendo las teclas en lugar de quedarse esperando
+        """
+        alto = self.alto_ventana
+        frame = self._sin_camara
+        frame[:] = (30, 30, 30)
+        
+        if self.camara.estado == CONECTANDO and not self.camara.intentos:
+            titulo, detalle = "CONECTANDO CAMARA...", ""
+        else:
+            titulo = "CAMARA PERDIDA"
+            detalle = f"reconectando (intento {self.camara.intentos + 1})"
+            if self.camara.proximo_intento:
+                faltan = max(0.0, self.camara.proximo_intento - time.monotonic())
+                detalle += f" en {faltan:.1f} s"
+        cv2.putText(frame, titulo, (20, alto // 2 - 10),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 0, 255), 2)
+        cv2.putText(frame, detalle, (20, alto // 2 + 25),
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1)
+        return frame
+    
+    def _dibujar_metricas(self, panel):
+        """Dibuja FPS y p50/p95/p99 por etapa sobre el panel, encima de los controles"""
+        lineas = self.metricas.lineas_overlay()
+        alto = panel.shape[0]
+        y_offset = alto - 76 - 13 * len(lineas)
+        cv2.rectangle(panel, (5, y_offset - 12), (self.ANCHO_PANEL - 5, alto - 74), (20, 20, 20), -1)
+        for linea in lineas:
+            cv2.putText(panel, linea, (10, y_offset),
+                       cv2.FONT_HERSHEY_SIMPLEX, 0.38, (0, 255, 255), 1)
+            y_offset += 13
+    
+    def procesar_carta_detectada(self, carta, marca=None):
+        """
+        Procesa una carta detectada y la agrega al juego
+        
+        Args:
+            carta: Datos de la carta leída del QR
+            marca: Marca de tiempos del frame (DetectorCartas.marca_frame con
+                   "detectado"); si se pasa, se registra la traza de latencia
+        
+        Returns:
+            bool: True si la carta avanzó el juego
+        """
         
         # 🆕 VERIFICAR SI LA CARTA YA FUE USADA EN ESTA PARTIDA
         if self._carta_ya_usada(carta):
-            print(f"⚠️  Carta {self._carta_a_clave(carta)} ya fue usada. Ignorando...")
+            log.warning("⚠️  Carta %s ya fue usada. Ignorando...", self._carta_a_clave(carta),
+                        extra={"por_frame": True, "carta": carta})
             return False
         
         # Evitar leer la misma carta múltiples veces
@@ -237,31 +571,57 @@ class InterfazBaccarat:
         
         self.ultima_carta_leida = carta
         
+        # Verificar que el zapato todavía contenga una copia de la carta
+        if not self.zapato.es_posible(carta):
+            mensaje = self.zapato.rechazar_carta(carta)
+            log.warning("⚠️  %s. Ignorando...", mensaje, extra={"por_frame": True, "carta": carta})
+            return False
+        
         estado = self.juego.obtener_estado()
         
-        # Agregar carta según el estado
+        # Agregar carta según el estado. Entra al zapato antes que al juego:
+        # los observadores del juego (difusión, historial) ya ven el zapato al día
         if estado["necesita_carta"] == "jugador":
+            self.zapato.registrar_carta(carta)
             exito, mensaje = self.juego.agregar_carta_jugador(carta)
             if exito:
-                print(f"✅ {mensaje}")
+                self._trazar(carta, marca, "jugador")
+                log.info("✅ %s", mensaje, extra={"carta": carta, "mano": "jugador"})
                 self._registrar_carta_usada(carta) 
                 self.esperando_carta = True
                 return True
+            self.zapato.devolver_carta(carta)
         elif estado["necesita_carta"] == "banca":
+            self.zapato.registrar_carta(carta)
             exito, mensaje = self.juego.agregar_carta_banca(carta)
             if exito:
-                print(f"✅ {mensaje}")
+                self._trazar(carta, marca, "banca")
+                log.info("✅ %s", mensaje, extra={"carta": carta, "mano": "banca"})
                 self._registrar_carta_usada(carta) 
                 self.esperando_carta = True
                 return True
+            self.zapato.devolver_carta(carta)
         
         # Verificar si el juego terminó
         if self.juego.estado == "finalizado":
             self.esperando_carta = False
-            self._actualizar_marcador()
         
         return False
     
+    def _trazar(self, carta, marca, mano):
+        """Cierra la traza de latencia justo después de la transición del juego"""
+        if marca is None:
+            return
+        traza = self.trazas.carta_aceptada(carta, marca, mano, time.perf_counter())
+        log.debug("⏱️  %.0f ms (captura %.0f, detección %.0f, reintentos %.0f, pausa %.0f)",
+                  traza["total_ms"], traza["captura_ms"], traza["deteccion_ms"],
+                  traza["reintentos_ms"], traza["espera_pausa_ms"],
+                  extra={"carta": carta, "latencia": traza})
+    
+    def _al_evento_ronda(self, evento, juego):
+        if evento == "finalizado":
+            self._actualizar_marcador()
+    
     def _actualizar_marcador(self):
         """Actualiza el marcador de victorias"""
         if self.juego.ganador == "jugador":
@@ -278,9 +638,11 @@ class InterfazBaccarat:
             if exito:
                 self.esperando_carta = True
                 self.ultima_carta_leida = None
-                print(f"🎰 {mensaje}")
+                self.ronda += 1
+                registro.contexto["ronda"] = self.ronda
+                log.info("🎰 %s", mensaje)
         else:
-            print("ya hay una ronda en curso")
+            log.info("ya hay una ronda en curso")
     
     def nueva_ronda(self):
         """Reinicia el juego para una nueva ronda"""
@@ -288,13 +650,58 @@ class InterfazBaccarat:
         self.esperando_carta = False
         self.ultima_carta_leida = None
         self._limpiar_cartas_usadas()  
-        print("nueva ronda lista")
+        log.info("nueva ronda lista")
+        if self.zapato.corte_alcanzado:
+            log.info("🃏 carta de corte alcanzada: baraja el zapato y presiona B")
+    
+    def barajar_zapato(self):
+        """Reinicia el seguimiento del zapato después de barajar físicamente"""
+        self.zapato.barajar()
+        self.historial.nuevo_zapato(self.zapato.mazos)
+        if self.difusion:
+            self.difusion.publicar("barajado")
+        log.info("🃏 zapato barajado (%d mazos, %d cartas)", self.zapato.mazos, self.zapato.restantes)
+    
+    def ejecutar_comando(self, comando):
+        """
+        Ejecuta un comando de control de la mesa
+        
+        Args:
+            comando: "iniciar", "reiniciar", "debug", "barajar" o "salir"
+            
+        Returns:
+            bool: False si el comando pide salir del juego
+        """
+        if comando == "salir":
+            print("\n👋 Saliendo del juego...")
+            return False
+        elif comando == "iniciar":
+            self.iniciar_ronda()
+        elif comando == "reiniciar":
+            self.nueva_ronda()
+        elif comando == "debug":
+            self.modo_debug = not self.modo_debug
+            # En debug se mide aunque no haya archivo de exportación
+            self.metricas.activo = self.modo_debug or self.metricas.archivo is not None
+            registro.nivel_debug(self.modo_debug)
+            log.info("🔧 Modo DEBUG: %s", "ACTIVADO" if self.modo_debug else "DESACTIVADO")
+        elif comando == "barajar":
+            self.barajar_zapato()
+        else:
+            log.warning("comando desconocido: %s", comando)
+        return True
     
     def ejecutar(self):
         """Bucle principal del juego"""
+        # Los mensajes del juego pasan por la cola de registros: el bucle no escribe en la terminal
+        registro.configurar_registro(mesa=self.mesa, archivo=self.archivo_registro)
+        self.historial.iniciar(mazos=self.zapato.mazos)
+        
         if not self.conectar():
-            print("no se pudo conectar a la cámara")
-            return
+            # Sin salir: la cámara se sigue buscando en segundo plano
+            print("⚠️  no se pudo conectar a la cámara: reintentando en segundo plano")
+        self.camara = GestorCamara(self.detector, resolucion=self._resolucion_video()).iniciar()
+        self._iniciar_auditoria()
         
         print("\n" + "=" * 70)
         print("🎰 PAKKORAT UNO - Juego iniciado")
@@ -303,54 +710,133 @@ class InterfazBaccarat:
         print("   ESPACIO - Iniciar ronda")
         print("   R       - Nueva ronda (después de terminar)")
         print("   D       - Activar/desactivar debug")
+        print("   B       - Zapato barajado (reiniciar conteo)")
         print("   Q       - Salir")
         print("\n" + "=" * 70 + "\n")
         
+        pantalla = None
+        lienzo_propio = self._lienzo
+        if self.pantalla_separada:
+            from pantalla_remota import PantallaRemota
+            # La ventana vive en otro proceso; las ventanas de debug se omiten
+            pantalla = PantallaRemota(self.ancho_ventana, self.alto_ventana)
+            pantalla.iniciar()
+            self.detector.mostrar_ventanas = False
+        
+        if self.difusion:
+            self.difusion.iniciar()
+        
+        transmision = None
+        if self.puerto_transmision:
+            from transmision import ServidorMJPEG
+            transmision = ServidorMJPEG(puerto=self.puerto_transmision)
+            transmision.iniciar()
+        
+        pausa_hasta = 0.0
+        frame_final = None
+        ultimo_frame = None
+        continuar = True
+        
         try:
-            while True:
-                ret, frame = self.detector.obtener_frame()
+            while continuar:
+                # Espera unos ms como mucho: capturar y reconectar ocurre en el hilo de la cámara
+                ret, frame = self.camara.obtener_frame()
                 
-                if not ret or frame is None:
-                    continue
+                if ret:
+                    ultimo_frame = frame
+                    registro.contexto["frame"] = self.camara.marca["id"]
+                    self._marcar_arranque("primer_frame")
+                    self.perfil_camara.preparar(frame)
+                    if self.grabador and not self.auditoria_anotada:
+                        self.grabador.publicar(frame)
+                elif self.camara.saludable and ultimo_frame is not None:
+                    # El siguiente frame todavía no llega: se redibuja el último
+                    # (sin detectar) para que la ventana siga respondiendo
+                    frame = ultimo_frame
+                else:
+                    frame = self._frame_sin_camara()
                 
                 # Detectar cartas si estamos esperando una
-                if self.esperando_carta:
-                    carta, frame_procesado = self.detector.detectar_cartas_completo(
+                anotaciones = None
+                if ret and self.esperando_carta and time.monotonic() >= pausa_hasta:
+                    carta, anotaciones = self.detector.detectar_cartas_anotaciones(
                         frame, debug=self.modo_debug
                     )
+                    marca = self.camara.marca
+                    marca["detectado"] = time.perf_counter()
+                    self._marcar_arranque("primera_deteccion")
+                    self.trazas.frame_evaluado(marca, bool(anotaciones))
                     
+                    aceptada = False
                     if carta:
-                        self.procesar_carta_detectada(carta)
+                        with self.metricas.etapa("juego"):
+                            aceptada = self.procesar_carta_detectada(carta, marca)
+                        if not aceptada:
+                            self.trazas.carta_rechazada()
+                        if self.grabador:
+                            self.grabador.evento("carta", carta=carta, aceptada=aceptada)
                         # Pequeña pausa después de detectar para evitar re-lecturas
-                        cv2.waitKey(500)
-                else:
-                    frame_procesado = frame
-                
-                # Dibujar interfaz
-                frame_final = self.dibujar_interfaz(frame_procesado)
+                        pausa_hasta = time.monotonic() + self.PAUSA_TRAS_CARTA
+                    self.perfil_camara.observar(frame, carta if aceptada else None)
                 
-                # Mostrar
-                cv2.imshow('Baccarat UNO', frame_final)
+                # Dibujar interfaz (en el buffer compartido si la pantalla es remota)
+                with self.metricas.etapa("render"):
+                    if pantalla:
+                        self._lienzo = pantalla.lienzo()
+                    frame_final = self.dibujar_interfaz(frame, anotaciones)
+                    
+                    # Auditoría: solo copia el frame; la codificación va en otro hilo
+                    if self.grabador and self.auditoria_anotada and ret:
+                        self.grabador.publicar(frame_final)
+                    
+                    # Espectadores: el servidor solo copia cuando le toca codificar
+                    if transmision:
+                        transmision.publicar(frame_final)
+                    
+                    # Mostrar y leer controles
+                    if pantalla:
+                        pantalla.publicar()
+                        teclas = pantalla.leer_teclas()
+                        if not pantalla.activa():
+                            teclas.append(ord('q'))
+                    else:
+                        cv2.imshow('Baccarat UNO', frame_final)
+                        teclas = [cv2.waitKey(1) & 0xFF]
                 
-                # Controles
-                key = cv2.waitKey(1) & 0xFF
+                if ret:
+                    self.metricas.contar_frame()  # Solo frames nuevos de la cámara, no repintados
+                self.metricas.exportar_si_toca()
+                self.perfil_camara.revisar_si_toca()
                 
-                if key == ord('q'):
-                    print("\n👋 Saliendo del juego...")
-                    break
-                elif key == ord(' '): 
-                    self.iniciar_ronda()
-                elif key == ord('r'):
-                    self.nueva_ronda()
-                elif key == ord('d'):
-                    self.modo_debug = not self.modo_debug
-                    print(f"🔧 Modo DEBUG: {'ACTIVADO' if self.modo_debug else 'DESACTIVADO'}")
+                for key in teclas:
+                    comando = self.TECLAS.get(key)
+                    if comando and not self.ejecutar_comando(comando):
+                        continuar = False
+                        break
         
         except KeyboardInterrupt:
             print("\ninterrumpido por usuario")
         
         finally:
+            if self.metricas.activo and self.metricas.archivo:
+                self.metricas.exportar()
+            if self.difusion:
+                self.difusion.cerrar()
+            if transmision:
+                transmision.cerrar()
+            if pantalla:
+                # Soltar las vistas sobre la memoria compartida antes de liberarla
+                frame_final = None
+                self._lienzo = lienzo_propio
+                pantalla.cerrar()
+            self.camara.cerrar()
             self.detector.liberar()
+            if self.grabador:
+                self.grabador.cerrar()
+            self.historial.cerrar()
+            if self.trazas.archivo or self.modo_debug:
+                print(self.trazas.reporte())
+            registro.cerrar_registro()
             print("=" * 70)
             print("\n🎰 gracias por jugar pakkorat")
 
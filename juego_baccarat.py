@@ -1,3 +1,8 @@
+import logging
+
+log = logging.getLogger("pakorat.juego")
+
+
 class Baccarat:
     """Implementación del juego de Baccarat con reglas tradicionales"""
     
@@ -9,6 +14,27 @@ class Baccarat:
         self.puntos_jugador = 0
         self.puntos_banca = 0
         self.mensaje = "Bienvenido al Baccarat"
+        self.version = 0  # Aumenta en cada transición (sirve para detectar cambios)
+        self._observadores = []
+    
+    def agregar_observador(self, funcion):
+        """
+        Registra una función que se llama en cada transición del juego
+        
+        Args:
+            funcion: Callable(evento, juego). Eventos: "reiniciado", "reparto",
+                     "carta_jugador", "carta_banca", "finalizado"
+        """
+        self._observadores.append(funcion)
+    
+    def _notificar(self, evento):
+        """Avisa a los observadores registrados; si uno falla, los demás igual se enteran"""
+        self.version += 1
+        for funcion in self._observadores:
+            try:
+                funcion(evento, self)
+            except Exception:
+                log.exception("observador %r falló con el evento %s", funcion, evento)
         
     def reiniciar(self):
         """Reinicia el juego para una nueva ronda"""
@@ -19,6 +45,7 @@ class Baccarat:
         self.puntos_jugador = 0
         self.puntos_banca = 0
         self.mensaje = "Nueva ronda iniciada"
+        self._notificar("reiniciado")
     
     def calcular_puntos(self, mano):
         """
@@ -52,6 +79,9 @@ class Baccarat:
             self.mensaje = f"Jugador pidió tercera: {carta['color']} {carta['valor']}. Total: {self.puntos_jugador}"
             self._evaluar_tercera_banca()
         
+        # Si la carta cerró la ronda, _determinar_ganador ya notificó "finalizado"
+        if self.estado != "finalizado":
+            self._notificar("carta_jugador")
         return True, self.mensaje
     
     def agregar_carta_banca(self, carta):
@@ -73,6 +103,8 @@ class Baccarat:
             self.mensaje = f"Banca pidió tercera: {carta['color']} {carta['valor']}. Total: {self.puntos_banca}"
             self._determinar_ganador()
         
+        if self.estado != "finalizado":
+            self._notificar("carta_banca")
         return True, self.mensaje
     
     def iniciar_reparto(self):
@@ -82,6 +114,7 @@ class Baccarat:
         
         self.estado = "jugador_carta1"
         self.mensaje = "Muestra la primera carta del JUGADOR"
+        self._notificar("reparto")
         return True, self.mensaje
     
     def _evaluar_reparto_inicial(self):
@@ -172,6 +205,8 @@ class Baccarat:
         else:
             self.ganador = "empate"
             self.mensaje = f"🤝 ¡EMPATE! (ambos con {self.puntos_jugador})"
+        
+        self._notificar("finalizado")
     
     def obtener_estado(self):
         """Retorna el estado actual del juego"""
@@ -1,6 +1,18 @@
 #!/usr/bin/env python3
-from interfaz import InterfazBaccarat
+import time
+
+INICIO = time.perf_counter()  # Referencia para medir el arranque
+
+import argparse
+import json
 import sys
+import threading
+
+# cv2, numpy y pyzbar (interfaz/detector_cartas) se importan en segundo plano
+# mientras se muestran las preguntas; requests solo en modo IP Webcam
+
+IP_WEBCAM = 'http://192.168.1.67:8080'
+TAMANOS = {"1": (800, 480), "2": (1024, 600), "3": (1280, 720)}
 
 def mostrar_banner():
     banner = """
@@ -62,7 +74,7 @@ def configurar_camara():
         opcion = input("Selecciona opción (1/2): ").strip()
         
         if opcion == "1":            
-            url = 'http://192.168.1.67:8080'
+            url = IP_WEBCAM
             return url
         
         elif opcion == "2":
@@ -90,6 +102,7 @@ def mostrar_instrucciones():
    ESPACIO  → Iniciar nueva ronda
    R        → Reiniciar después de terminar
    D        → Activar/desactivar modo debug
+   B        → Zapato barajado (reiniciar conteo)
    Q        → Salir del juego
 
 🃏 FLUJO DEL JUEGO:
@@ -103,27 +116,161 @@ def mostrar_instrucciones():
     print("=" * 60)
     input("\npresiona enter para jugar")
 
-def main():
+class PrecalentadorCamara:
+    """
+    Importa el detector, abre la cámara y lee un primer frame en un hilo
+    mientras el usuario responde las preguntas de configuración
+    """
+    
+    def __init__(self, url_camara):
+        """
+        Args:
+            url_camara: URL de IP Webcam o None para la cámara local
+        """
+        self.url_camara = url_camara
+        self.detector = None
+        self.segundos = None
+        self.error = None
+        self._hilo = threading.Thread(target=self._precalentar, name="precalentar-camara", daemon=True)
+    
+    def iniciar(self):
+        self._hilo.start()
+        return self
+    
+    def _precalentar(self):
+        inicio = time.perf_counter()
+        try:
+            from detector_cartas import DetectorCartas
+            detector = DetectorCartas(self.url_camara)
+            if detector.conectar_camara():
+                detector.obtener_frame()  # El primer frame suele ser el más lento
+                self.detector = detector
+            else:
+                self.error = "no se pudo conectar a la cámara"
+        except Exception as e:
+            self.error = str(e)
+        self.segundos = time.perf_counter() - inicio
+    
+    def esperar(self):
+        """
+        Espera a que termine el precalentamiento
+        
+        Returns:
+            DetectorCartas o None: Detector con la cámara ya abierta
+        """
+        self._hilo.join()
+        if self.detector:
+            print(f"📷 cámara lista en {self.segundos:.2f} s (abierta mientras configurabas)")
+        else:
+            print(f"⚠️  precalentamiento fallido ({self.error}); se reintenta al iniciar")
+        return self.detector
+
+def cargar_configuracion(argv=None):
+    """
+    Lee la configuración de la línea de comandos y, opcionalmente, de un
+    archivo JSON (--config). Los argumentos explícitos tienen prioridad.
+    
+    Returns:
+        argparse.Namespace: Opciones (ancho/alto/camara en None = preguntar)
+    """
+    parser = argparse.ArgumentParser(description="Pakkorat UNO: Baccarat con cartas UNO y QR")
+    parser.add_argument("--config", default=None, help="Archivo JSON con cualquiera de estas opciones")
+    parser.add_argument("--tamano", choices=list(TAMANOS), default=None,
+                        help="1 = 800x480, 2 = 1024x600, 3 = 1280x720")
+    parser.add_argument("--ancho", type=int, default=None, help="Ancho de la ventana")
+    parser.add_argument("--alto", type=int, default=None, help="Alto de la ventana")
+    parser.add_argument("--camara", default=None,
+                        help='"local", "ip" (IP Webcam por defecto) o la URL de IP Webcam')
+    parser.add_argument("--mazos", type=int, default=None, help="Mazos en el zapato")
+    parser.add_argument("--pantalla-separada", action="store_true", default=None,
+                        help="Ventana en un proceso aparte")
+    parser.add_argument("--puerto-transmision", type=int, default=None, help="Puerto MJPEG para espectadores")
+    parser.add_argument("--puerto-difusion", type=int, default=None, help="Puerto TCP de cambios de estado")
+    parser.add_argument("--metricas", default=None, help="Archivo de métricas por etapa")
+    parser.add_argument("--trazas", default=None, help="JSONL de latencia por carta")
+    parser.add_argument("--registro", default=None, help="Archivo de registros JSON")
+    parser.add_argument("--mesa", default=None, help="Identificador de la mesa")
+    parser.add_argument("--perfiles", default=None,
+                        help="Perfiles de calibración por cámara (default perfiles_camara.json)")
+    parser.add_argument("--hilos-deteccion", type=int, default=None,
+                        help="Hilos para buscar cartas por franjas en cámaras 4K (0 = todos los núcleos)")
+    parser.add_argument("--historial", default=None,
+                        help="Base SQLite donde guardar el historial de manos (sin ella solo vive en memoria)")
+    parser.add_argument("--auditoria", default=None,
+                        help="Carpeta donde grabar la mesa y sus eventos para auditoría")
+    parser.add_argument("--auditoria-anotada", action="store_true", default=None,
+                        help="Grabar la mesa dibujada en lugar del frame crudo")
+    parser.add_argument("--sin-instrucciones", action="store_true", default=None,
+                        help="No mostrar las instrucciones antes de jugar")
+    args = parser.parse_args(argv)
+    
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            archivo = json.load(f)
+        for clave, valor in archivo.items():
+            clave = clave.replace("-", "_")
+            if not hasattr(args, clave):
+                parser.error(f"opción desconocida en {args.config}: {clave}")
+            if getattr(args, clave) is None:
+                setattr(args, clave, valor)
+    
+    if args.tamano and args.ancho is None and args.alto is None:
+        args.ancho, args.alto = TAMANOS[str(args.tamano)]
+    if args.camara == "ip":
+        args.camara = IP_WEBCAM
+    return args
+
+def main(argv=None):
     """Función principal"""
-    mostrar_banner()
+    args = cargar_configuracion(argv)
+    interactivo = args.camara is None or args.ancho is None or args.alto is None
     
-    # Configurar tamaño de ventana
-    ancho, alto = configurar_tamano_ventana()
+    if interactivo:
+        mostrar_banner()
     
-    # Configurar cámara
-    url_camara = configurar_camara()
+    # La cámara se elige primero para abrirla mientras se responde lo demás
+    if args.camara is None:
+        url_camara = configurar_camara()
+    else:
+        url_camara = None if args.camara == "local" else args.camara
+    precalentador = PrecalentadorCamara(url_camara).iniciar()
+    
+    # Configurar tamaño de ventana
+    if args.ancho is None or args.alto is None:
+        ancho, alto = configurar_tamano_ventana()
+    else:
+        ancho, alto = args.ancho, args.alto
     
     # Mostrar instrucciones
-    mostrar_instrucciones()
+    if interactivo and not args.sin_instrucciones:
+        mostrar_instrucciones()
+    fin_preguntas = time.perf_counter()
     
     # Crear e iniciar el juego
     print("\niniciando PAKKORAT")
     print("conectando con la camara\n")
     
     try:
+        from interfaz import InterfazBaccarat
+        detector = precalentador.esperar()
         interfaz = InterfazBaccarat(ip_webcam_url=url_camara, 
                                    ancho_ventana=ancho, 
-                                   alto_ventana=alto)
+                                   alto_ventana=alto,
+                                   mazos=args.mazos or 8,
+                                   pantalla_separada=bool(args.pantalla_separada),
+                                   puerto_transmision=args.puerto_transmision,
+                                   puerto_difusion=args.puerto_difusion,
+                                   archivo_metricas=args.metricas,
+                                   archivo_trazas=args.trazas,
+                                   mesa=args.mesa or "mesa-1",
+                                   archivo_registro=args.registro,
+                                   detector=detector,
+                                   archivo_perfiles=args.perfiles or "perfiles_camara.json",
+                                   directorio_auditoria=args.auditoria,
+                                   auditoria_anotada=bool(args.auditoria_anotada),
+                                   archivo_historial=args.historial,
+                                   hilos_deteccion=1 if args.hilos_deteccion is None else args.hilos_deteccion)
+        interfaz.arranque = {"inicio": INICIO, "fin_preguntas": fin_preguntas}
         interfaz.ejecutar()
     except Exception as e:
         print(f"\nerror al ejecutar el juego: {e}")
@@ -0,0 +1,223 @@
+import json
+import logging
+import os
+import time
+import numpy as np
+
+ETAPAS = ["captura", "decodificacion_jpeg", "rectangulos", "qr", "juego", "render"]
+CUANTILES = (0.5, 0.95, 0.99)
+
+
+class _Nulo:
+    """Contexto vacío que se devuelve cuando las métricas están apagadas"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        return False
+
+
+_NULO = _Nulo()
+
+
+class _Cronometro:
+    """Contexto reutilizable (uno por etapa) que mide con perf_counter"""
+
+    __slots__ = ("_serie", "_inicio")
+
+    def __init__(self, serie):
+        self._serie = serie
+        self._inicio = 0.0
+
+    def __enter__(self):
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_):
+        self._serie.agregar(time.perf_counter() - self._inicio)
+        return False
+
+
+class SerieTiempos:
+    """Ventana circular de duraciones (segundos) de una etapa"""
+
+    def __init__(self, ventana=512):
+        self._valores = np.zeros(ventana, dtype=np.float64)
+        self._indice = 0
+        self.total = 0      # Mediciones desde el inicio (para _count)
+        self.suma = 0.0     # Segundos acumulados desde el inicio (para _sum)
+
+    def agregar(self, duracion):
+        self._valores[self._indice] = duracion
+        self._indice = (self._indice + 1) % len(self._valores)
+        self.total += 1
+        self.suma += duracion
+
+    def cuantiles(self, cuantiles=CUANTILES):
+        """Cuantiles de la ventana reciente, o None si aún no hay datos"""
+        n = min(self.total, len(self._valores))
+        if n == 0:
+            return None
+        return np.quantile(self._valores[:n], cuantiles)
+
+
+class Metricas:
+    """
+    Tiempos por etapa del bucle (captura, decodificación, búsqueda de
+    rectángulos, QR, juego y render) y FPS
+
+    Apagadas, etapa() devuelve siempre el mismo contexto vacío y
+    contar_frame() retorna enseguida, así que los ganchos pueden quedarse
+    en el camino crítico. Los cuantiles solo se calculan al dibujar el
+    overlay o al exportar, nunca por frame.
+    """
+
+    def __init__(self, activo=False, ventana=512, archivo=None, intervalo=10.0, ventana_fps=128):
+        """
+        Args:
+            activo: Si False los ganchos no miden nada
+            ventana: Mediciones recientes por etapa usadas para los cuantiles
+            ventana_fps: Frames recientes usados para los FPS y tiempos_frame()
+            archivo: Ruta donde exportar periódicamente (.json = JSON, otro = texto Prometheus)
+            intervalo: Segundos entre exportaciones
+        """
+        self.activo = activo
+        self.archivo = archivo
+        self.intervalo = intervalo
+        self._ventana = ventana
+        self._series = {}
+        self._cronometros = {}
+        self._frames = np.zeros(ventana_fps, dtype=np.float64)
+        self._indice_frame = 0
+        self._total_frames = 0
+        self._proxima_exportacion = time.monotonic() + intervalo
+        self._lineas_overlay = []
+        self._proximo_overlay = 0.0
+
+    def etapa(self, nombre):
+        """
+        Contexto que mide una etapa: `with metricas.etapa("qr"): ...`
+
+        Args:
+            nombre: Nombre de la etapa (ver ETAPAS)
+        """
+        if not self.activo:
+            return _NULO
+        cronometro = self._cronometros.get(nombre)
+        if cronometro is None:
+            serie = self._series[nombre] = SerieTiempos(self._ventana)
+            cronometro = self._cronometros[nombre] = _Cronometro(serie)
+        return cronometro
+
+    def contar_frame(self):
+        """Marca el fin de una vuelta del bucle (para los FPS)"""
+        if not self.activo:
+            return
+        self._frames[self._indice_frame] = time.monotonic()
+        self._indice_frame = (self._indice_frame + 1) % len(self._frames)
+        self._total_frames += 1
+
+    @property
+    def frames(self):
+        """Frames contados desde el inicio"""
+        return self._total_frames
+
+    def tiempos_frame(self):
+        """Duraciones (segundos) entre los últimos frames contados, en orden"""
+        n = min(self._total_frames, len(self._frames))
+        if n < 2:
+            return np.empty(0)
+        return np.diff(np.sort(self._frames[:n]))
+
+    def fps(self):
+        """FPS sobre los últimos frames contados"""
+        n = min(self._total_frames, len(self._frames))
+        if n < 2:
+            return 0.0
+        marcas = self._frames[:n]
+        duracion = marcas.max() - marcas.min()
+        return (n - 1) / duracion if duracion > 0 else 0.0
+
+    def resumen(self):
+        """
+        Returns:
+            dict: {"fps": ..., "etapas": {nombre: {"p50_ms", "p95_ms", "p99_ms", "total"}}}
+        """
+        etapas = {}
+        for nombre, serie in self._series.items():
+            cuantiles = serie.cuantiles()
+            if cuantiles is None:
+                continue
+            p50, p95, p99 = cuantiles * 1000
+            etapas[nombre] = {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3),
+                              "p99_ms": round(float(p99), 3), "total": serie.total}
+        return {"fps": round(float(self.fps()), 2), "frames": self._total_frames, "etapas": etapas}
+
+    def texto_prometheus(self):
+        """Resumen en formato de exposición de texto de Prometheus"""
+        lineas = [
+            "# HELP pakorat_etapa_segundos Duración de cada etapa del bucle de detección",
+            "# TYPE pakorat_etapa_segundos summary",
+        ]
+        for nombre, serie in self._series.items():
+            cuantiles = serie.cuantiles()
+            if cuantiles is None:
+                continue
+            for q, valor in zip(CUANTILES, cuantiles):
+                lineas.append(f'pakorat_etapa_segundos{{etapa="{nombre}",quantile="{q}"}} {valor:.6f}')
+            lineas.append(f'pakorat_etapa_segundos_sum{{etapa="{nombre}"}} {serie.suma:.6f}')
+            lineas.append(f'pakorat_etapa_segundos_count{{etapa="{nombre}"}} {serie.total}')
+        lineas += [
+            "# HELP pakorat_fps Frames por segundo del bucle principal",
+            "# TYPE pakorat_fps gauge",
+            f"pakorat_fps {self.fps():.2f}",
+            "# HELP pakorat_frames_total Frames procesados",
+            "# TYPE pakorat_frames_total counter",
+            f"pakorat_frames_total {self._total_frames}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self):
+        """Escribe el archivo de métricas de forma atómica (temporal + reemplazo)"""
+        if not self.archivo:
+            return
+        if self.archivo.endswith(".json"):
+            contenido = json.dumps(self.resumen(), indent=2)
+        else:
+            contenido = self.texto_prometheus()
+        temporal = self.archivo + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(contenido)
+        os.replace(temporal, self.archivo)
+
+    def exportar_si_toca(self):
+        """Exporta si ya pasó el intervalo (llamar una vez por frame)"""
+        if not self.activo or not self.archivo:
+            return
+        ahora = time.monotonic()
+        if ahora >= self._proxima_exportacion:
+            self._proxima_exportacion = ahora + self.intervalo
+            try:
+                self.exportar()
+            except OSError as e:
+                logging.getLogger("pakorat.metricas").warning(
+                    "⚠️  no se pudieron exportar las métricas: %s", e)
+
+    def lineas_overlay(self, cada=0.5):
+        """
+        Líneas de texto para el overlay de debug, recalculadas como mucho
+        cada `cada` segundos
+        """
+        ahora = time.monotonic()
+        if ahora >= self._proximo_overlay:
+            self._proximo_overlay = ahora + cada
+            resumen = self.resumen()
+            lineas = [f"FPS {resumen['fps']:.1f}   p50/p95/p99 ms"]
+            for nombre in ETAPAS:
+                datos = resumen["etapas"].get(nombre)
+                if datos:
+                    lineas.append(f"{nombre[:11]:<11} {datos['p50_ms']:.1f}/"
+                                  f"{datos['p95_ms']:.1f}/{datos['p99_ms']:.1f}")
+            self._lineas_overlay = lineas
+        return self._lineas_overlay
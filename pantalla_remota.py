@@ -0,0 +1,156 @@
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+import numpy as np
+
+# Cabecera compartida (int64): contador de secuencia, buffer publicado,
+# buffer que está leyendo la pantalla y bandera de cierre
+_SEQ = 0
+_PUBLICADO = 1
+_LEYENDO = 2
+_CERRADO = 3
+_TAMANO_CABECERA = 64  # bytes (8 enteros de 64 bits)
+
+
+def _vistas(buffer, ancho, alto, buffers):
+    """Crea las vistas NumPy (cabecera y buffers de imagen) sobre la memoria compartida"""
+    cabecera = np.ndarray((8,), dtype=np.int64, buffer=buffer)
+    imagenes = np.ndarray((buffers, alto, ancho, 3), dtype=np.uint8,
+                          buffer=buffer, offset=_TAMANO_CABECERA)
+    return cabecera, imagenes
+
+
+def _proceso_pantalla(nombre, ancho, alto, buffers, titulo, teclas):
+    """
+    Bucle del proceso de pantalla: muestra el último frame publicado y
+    devuelve las teclas presionadas por la cola de control
+    """
+    import cv2
+
+    memoria = shared_memory.SharedMemory(name=nombre)
+    cabecera, imagenes = _vistas(memoria.buf, ancho, alto, buffers)
+    ultimo_seq = 0
+    mostrado = False
+
+    try:
+        while not cabecera[_CERRADO]:
+            seq = int(cabecera[_SEQ])
+            if seq != ultimo_seq:
+                slot = int(cabecera[_PUBLICADO])
+                cabecera[_LEYENDO] = slot
+                # Si se publicó otro buffer mientras marcábamos, reintentar
+                if int(cabecera[_PUBLICADO]) == slot:
+                    cv2.imshow(titulo, imagenes[slot])
+                    ultimo_seq = seq
+                    mostrado = True
+
+            key = cv2.waitKey(5) & 0xFF
+            if key != 255:
+                teclas.put(key)
+
+            # Cerrar la ventana equivale a presionar Q
+            if mostrado and cv2.getWindowProperty(titulo, cv2.WND_PROP_VISIBLE) < 1:
+                teclas.put(ord('q'))
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cv2.destroyAllWindows()
+        del cabecera, imagenes
+        memoria.close()
+
+
+class PantallaRemota:
+    """
+    Muestra los frames en un proceso separado
+
+    Los frames se componen directamente en uno de tres buffers de memoria
+    compartida (triple buffer) y se publican con un contador de secuencia,
+    sin serializar ni copiar entre procesos. Las teclas vuelven por una cola,
+    así que los bloqueos de la ventana no frenan la detección.
+    """
+
+    BUFFERS = 3
+
+    def __init__(self, ancho, alto, titulo='Baccarat UNO'):
+        """
+        Args:
+            ancho: Ancho de la ventana en píxeles
+            alto: Alto de la ventana en píxeles
+            titulo: Título de la ventana
+        """
+        self.ancho = ancho
+        self.alto = alto
+        self.titulo = titulo
+        self.memoria = None
+        self.proceso = None
+        self._teclas = None
+        self._slot = None
+
+    def iniciar(self):
+        """Reserva la memoria compartida y lanza el proceso de pantalla"""
+        tamano = _TAMANO_CABECERA + self.BUFFERS * self.alto * self.ancho * 3
+        self.memoria = shared_memory.SharedMemory(create=True, size=tamano)
+        self._cabecera, self._imagenes = _vistas(self.memoria.buf, self.ancho, self.alto, self.BUFFERS)
+        self._cabecera[:] = 0
+        self._cabecera[_PUBLICADO] = -1
+        self._cabecera[_LEYENDO] = -1
+
+        # spawn: el proceso padre ya tiene hilos (cámara, registro, OpenCV) y
+        # un fork con cv2 cargado puede quedar bloqueado en un lock heredado
+        contexto = mp.get_context("spawn")
+        self._teclas = contexto.Queue()
+        self.proceso = contexto.Process(
+            target=_proceso_pantalla,
+            args=(self.memoria.name, self.ancho, self.alto, self.BUFFERS, self.titulo, self._teclas),
+            name="pantalla-baccarat",
+            daemon=True,
+        )
+        self.proceso.start()
+
+    def lienzo(self):
+        """
+        Retorna el buffer libre donde componer el próximo frame
+
+        Returns:
+            numpy.ndarray: Vista (alto, ancho, 3) sobre la memoria compartida
+        """
+        if self._slot is None:
+            ocupados = {int(self._cabecera[_PUBLICADO]), int(self._cabecera[_LEYENDO])}
+            self._slot = next(i for i in range(self.BUFFERS) if i not in ocupados)
+        return self._imagenes[self._slot]
+
+    def publicar(self):
+        """Publica el buffer devuelto por lienzo() como el frame más reciente"""
+        if self._slot is None:
+            return
+        self._cabecera[_PUBLICADO] = self._slot
+        self._cabecera[_SEQ] += 1
+        self._slot = None
+
+    def leer_teclas(self):
+        """Retorna las teclas recibidas desde la pantalla (sin bloquear)"""
+        teclas = []
+        while True:
+            try:
+                teclas.append(self._teclas.get_nowait())
+            except queue.Empty:
+                return teclas
+
+    def activa(self):
+        """True mientras el proceso de pantalla siga vivo"""
+        return self.proceso is not None and self.proceso.is_alive()
+
+    def cerrar(self):
+        """Detiene el proceso de pantalla y libera la memoria compartida"""
+        if self.memoria is None:
+            return
+        self._cabecera[_CERRADO] = 1
+        if self.proceso is not None:
+            self.proceso.join(timeout=2)
+            if self.proceso.is_alive():
+                self.proceso.terminate()
+        del self._cabecera, self._imagenes
+        self.memoria.close()
+        self.memoria.unlink()
+        self.memoria = None
@@ -0,0 +1,149 @@
+import logging
+import queue
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pythonjsonlogger import jsonlogger
+
+# Campos que se agregan a todos los registros (la interfaz los actualiza)
+contexto = {"mesa": None, "ronda": 0, "frame": None, "carta": None}
+
+_listener = None
+_manejador = None
+
+
+class _FiltroContexto(logging.Filter):
+    """Copia el contexto actual de la mesa en cada registro (en el hilo que registra)"""
+
+    def filter(self, registro):
+        for clave, valor in contexto.items():
+            if not hasattr(registro, clave):
+                setattr(registro, clave, valor)
+        return True
+
+
+class FiltroFrecuencia(logging.Filter):
+    """
+    Limita los registros por frame (extra={"por_frame": True})
+
+    Primero se toma 1 de cada `muestreo` registros de cada mensaje y luego se
+    aplica un balde de fichas de `por_segundo` por mensaje. Lo descartado se
+    cuenta y se informa en el campo "suprimidos" del siguiente que pasa.
+    """
+
+    def __init__(self, por_segundo=20, muestreo=1):
+        super().__init__()
+        self.por_segundo = por_segundo
+        self.muestreo = max(1, muestreo)
+        self._estado = {}  # mensaje -> [vistos, fichas, ultimo, suprimidos]
+
+    def filter(self, registro):
+        if not getattr(registro, "por_frame", False):
+            return True
+
+        estado = self._estado.get(registro.msg)
+        ahora = time.monotonic()
+        if estado is None:
+            estado = self._estado[registro.msg] = [0, float(self.por_segundo), ahora, 0]
+
+        estado[0] += 1
+        if estado[0] % self.muestreo:
+            estado[3] += 1
+            return False
+
+        estado[1] = min(self.por_segundo, estado[1] + (ahora - estado[2]) * self.por_segundo)
+        estado[2] = ahora
+        if estado[1] < 1:
+            estado[3] += 1
+            return False
+
+        estado[1] -= 1
+        if estado[3]:
+            registro.suprimidos = estado[3]
+            estado[3] = 0
+        return True
+
+
+class _ManejadorCola(QueueHandler):
+    """QueueHandler que nunca bloquea: con la cola llena descarta y cuenta"""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def enqueue(self, registro):
+        try:
+            self.queue.put_nowait(registro)
+        except queue.Full:
+            self.descartados += 1
+
+
+def configurar_registro(mesa="mesa-1", archivo=None, json_consola=False, salida=None,
+                        por_segundo=20, muestreo=1, capacidad=10000):
+    """
+    Configura el logger "pakorat": los registros pasan por una cola y un hilo
+    escribe en consola y/o archivo, así el bucle de frames no hace E/S
+
+    Args:
+        mesa: Identificador de la mesa (campo "mesa" de cada registro)
+        archivo: Archivo JSON (una línea por registro) opcional
+        json_consola: Si True la consola también recibe JSON; si no, solo el mensaje
+        salida: Stream de consola (default stderr)
+        por_segundo: Máximo de registros por frame por segundo y mensaje
+        muestreo: Conservar 1 de cada N registros por frame
+        capacidad: Registros pendientes antes de empezar a descartar
+
+    Returns:
+        logging.Logger: El logger "pakorat"
+    """
+    global _listener, _manejador
+    logger = logging.getLogger("pakorat")
+    contexto["mesa"] = mesa
+    if _listener is not None:
+        return logger
+
+    formato_json = jsonlogger.JsonFormatter(
+        "%(asctime)s %(levelname)s %(name)s %(message)s", json_ensure_ascii=False)
+
+    consola = logging.StreamHandler(salida or sys.stderr)
+    consola.setFormatter(formato_json if json_consola else logging.Formatter("%(message)s"))
+    destinos = [consola]
+    if archivo:
+        en_archivo = logging.FileHandler(archivo, encoding="utf-8")
+        en_archivo.setFormatter(formato_json)
+        destinos.append(en_archivo)
+
+    cola = queue.Queue(maxsize=capacidad)
+    _manejador = _ManejadorCola(cola)
+    # Primero el límite: lo descartado no paga la copia del contexto
+    _manejador.addFilter(FiltroFrecuencia(por_segundo, muestreo))
+    _manejador.addFilter(_FiltroContexto())
+
+    logger.addHandler(_manejador)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+    _listener = QueueListener(cola, *destinos, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def nivel_debug(activo):
+    """Activa o desactiva los registros de depuración (tecla D)"""
+    logging.getLogger("pakorat").setLevel(logging.DEBUG if activo else logging.INFO)
+
+
+def cerrar_registro():
+    """Vacía la cola y detiene el hilo escritor"""
+    global _listener, _manejador
+    if _listener is None:
+        return
+    _listener.stop()
+    logger = logging.getLogger("pakorat")
+    logger.removeHandler(_manejador)
+    if _manejador.descartados:
+        print(f"⚠️  {_manejador.descartados} registros descartados por cola llena", file=sys.stderr)
+    for destino in _listener.handlers:
+        destino.close()
+    _listener = None
+    _manejador = None
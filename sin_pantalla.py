@@ -0,0 +1,282 @@
+import time
+
+INICIO = time.perf_counter()  # Antes de los imports pesados: mide el arranque completo
+
+import argparse
+import contextlib
+import json
+import queue
+import sys
+import threading
+from interfaz import InterfazBaccarat
+from camara import GestorCamara
+from calibracion import ARCHIVO_PERFILES
+import registro
+
+
+class MotorSinPantalla(InterfazBaccarat):
+    """
+    Ejecuta captura, detección y la máquina de estados del Baccarat sin ventana
+
+    No dibuja ni llama a cv2.imshow/cv2.waitKey: las rondas se controlan con
+    comandos (enviar_comando o una línea por comando en stdin) y los eventos
+    de cartas, estado y resultado se emiten como JSON, uno por línea.
+    """
+
+    def __init__(self, ip_webcam_url=None, mazos=8, salida=None, puerto_difusion=None,
+                 archivo_metricas=None, archivo_trazas=None, mesa="mesa-1",
+                 archivo_registro=None, archivo_perfiles=ARCHIVO_PERFILES, detector=None,
+                 dibujar=False, directorio_auditoria=None, archivo_historial=None,
+                 hilos_deteccion=1):
+        """
+        Inicializa el motor
+
+        Args:
+            ip_webcam_url: URL de la cámara IP (opcional)
+            mazos: Número de mazos UNO en el zapato
+            salida: Stream donde se escriben los eventos (default stdout)
+            puerto_difusion: Puerto TCP para publicar los cambios de estado (opcional)
+            archivo_metricas: Archivo donde exportar las métricas por etapa (opcional)
+            archivo_trazas: JSONL con la traza de latencia de cada carta aceptada (opcional)
+            mesa: Identificador de la mesa en los eventos y registros
+            archivo_registro: Archivo de registros JSON (opcional)
+            archivo_perfiles: Perfiles de calibración por cámara (ver calibracion.py)
+            detector: DetectorCartas ya creado (opcional, p. ej. con otra fuente de video)
+            dibujar: Si True compone la mesa en memoria en cada frame, sin mostrarla
+                     (para que las pruebas largas midan también el render)
+            directorio_auditoria: Carpeta donde grabar los frames crudos y los eventos
+                                  para auditoría (opcional, ver auditoria.py)
+            archivo_historial: Base SQLite del historial de manos (opcional, ver historial.py)
+            hilos_deteccion: Hilos para buscar cartas por franjas (1 = un hilo, 0 = todos)
+        """
+        super().__init__(ip_webcam_url=ip_webcam_url, mazos=mazos, puerto_difusion=puerto_difusion,
+                         archivo_metricas=archivo_metricas, archivo_trazas=archivo_trazas,
+                         mesa=mesa, archivo_registro=archivo_registro,
+                         archivo_perfiles=archivo_perfiles, detector=detector,
+                         directorio_auditoria=directorio_auditoria,
+                         archivo_historial=archivo_historial,
+                         hilos_deteccion=hilos_deteccion)
+        self.detector.mostrar_ventanas = False
+        self.dibujar = dibujar
+        self.salida = salida or sys.stdout
+        self._comandos = queue.Queue()
+        self._lock_salida = threading.Lock()
+        self._ultimo_estado = None
+        self.juego.agregar_observador(self._al_evento_juego)
+
+    def emitir(self, tipo, **datos):
+        """Escribe un evento como una línea JSON"""
+        evento = {"tipo": tipo, "t": time.time()}
+        evento.update(datos)
+        linea = json.dumps(evento, ensure_ascii=False, default=str)
+        with self._lock_salida:
+            self.salida.write(linea + "\n")
+            self.salida.flush()
+
+    def enviar_comando(self, comando):
+        """
+        Encola un comando para el bucle principal (seguro desde otros hilos)
+
+        Args:
+            comando: Texto, p. ej. "iniciar", "reiniciar", "apostar 0 banca 25"
+        """
+        self._comandos.put(comando.strip())
+
+    def leer_comandos(self, entrada):
+        """Lee comandos (uno por línea) de un stream en un hilo en segundo plano"""
+        def leer():
+            for linea in entrada:
+                if linea.strip():
+                    self.enviar_comando(linea)
+            self.enviar_comando("salir")
+
+        hilo = threading.Thread(target=leer, name="comandos-stdin", daemon=True)
+        hilo.start()
+        return hilo
+
+    def ejecutar_comando(self, comando):
+        """Ejecuta un comando de texto (con argumentos) y emite su resultado"""
+        partes = comando.split()
+        if not partes:
+            return True
+        nombre, args = partes[0].lower(), partes[1:]
+
+        try:
+            if nombre == "apostar":
+                exito, mensaje = self.libro.apostar(int(args[0]), args[1], args[2])
+            elif nombre == "depositar":
+                exito, mensaje = self.libro.depositar(int(args[0]), args[1])
+            elif nombre == "estado":
+                self._emitir_estado(forzar=True)
+                return True
+            elif nombre == "metricas":
+                self.emitir("metricas", **self.metricas.resumen())
+                return True
+            else:
+                continua = super().ejecutar_comando(nombre)
+                self.emitir("comando", comando=nombre)
+                self._emitir_estado()
+                return continua
+        except (IndexError, ValueError) as e:
+            exito, mensaje = False, f"argumentos inválidos para {nombre}: {e}"
+
+        self.emitir("comando", comando=nombre, exito=exito, mensaje=mensaje)
+        return True
+
+    def _emitir_estado(self, forzar=False):
+        """Emite el estado del juego si cambió desde el último evento"""
+        clave = self._clave_panel()
+        if not forzar and clave == self._ultimo_estado:
+            return
+        self._ultimo_estado = clave
+        estado = self.juego.obtener_estado()
+        estado["zapato"] = self.zapato.obtener_estado()
+        self.emitir("estado", **estado)
+
+    def _al_evento_juego(self, evento, juego):
+        if evento == "finalizado":
+            self.emitir("resultado",
+                        ganador=juego.ganador,
+                        puntos_jugador=juego.puntos_jugador,
+                        puntos_banca=juego.puntos_banca,
+                        liquidacion=self.libro.ultima_liquidacion,
+                        zapato=self.historial.zapato, mano=self.historial.mano)
+
+    def _procesar_comandos(self):
+        """Ejecuta los comandos pendientes. Retorna False si hay que salir"""
+        while True:
+            try:
+                comando = self._comandos.get_nowait()
+            except queue.Empty:
+                return True
+            if not self.ejecutar_comando(comando):
+                return False
+
+    def _dibujar_en_memoria(self, frame, anotaciones=None):
+        """Compone la mesa en el lienzo sin mostrarla (solo con dibujar=True)"""
+        if self.dibujar:
+            with self.metricas.etapa("render"):
+                self.dibujar_interfaz(frame, anotaciones)
+
+    def ejecutar(self):
+        """Bucle principal sin pantalla"""
+        # Los mensajes informativos van a stderr para no mezclarse con los eventos
+        with contextlib.redirect_stdout(sys.stderr):
+            self._ejecutar()
+
+    def _ejecutar(self):
+        # Registros en JSON por stderr (stdout queda para los eventos)
+        registro.configurar_registro(mesa=self.mesa, archivo=self.archivo_registro, json_consola=True)
+        self.historial.iniciar(mazos=self.zapato.mazos)
+
+        # Sin ventana no hace falta pedir una resolución reducida a la cámara;
+        # si no conecta se sigue intentando en segundo plano
+        if not self.detector.conectar_camara():
+            self.emitir("error", mensaje="no se pudo conectar a la cámara: reintentando")
+        self.camara = GestorCamara(self.detector).iniciar()
+        self._iniciar_auditoria()
+        estado_camara = None
+
+        if self.difusion:
+            self.difusion.iniciar()
+
+        self.emitir("inicio", mesa=self.mesa, mazos=self.zapato.mazos)
+        self._emitir_estado(forzar=True)
+        pausa_hasta = 0.0
+
+        try:
+            while self._procesar_comandos():
+                # Espera como mucho unos ms, así los comandos se atienden aunque no haya cámara
+                ret, frame = self.camara.obtener_frame()
+                if self.camara.estado != estado_camara:
+                    estado_camara = self.camara.estado
+                    self.emitir("camara", estado=estado_camara, intentos=self.camara.intentos)
+                if not ret:
+                    continue
+                registro.contexto["frame"] = self.camara.marca["id"]
+                self._marcar_arranque("primer_frame")
+                self.perfil_camara.preparar(frame)
+                if self.grabador:
+                    self.grabador.publicar(frame)
+                self.metricas.contar_frame()
+                self.metricas.exportar_si_toca()
+                self.perfil_camara.revisar_si_toca()
+
+                if not self.esperando_carta or time.monotonic() < pausa_hasta:
+                    self._dibujar_en_memoria(frame)
+                    continue
+
+                carta, anotaciones = self.detector.detectar_cartas_anotaciones(frame, debug=self.modo_debug)
+                marca = self.camara.marca
+                marca["detectado"] = time.perf_counter()
+                self._marcar_arranque("primera_deteccion")
+                self.trazas.frame_evaluado(marca, bool(anotaciones))
+                aceptada = False
+                if carta:
+                    with self.metricas.etapa("juego"):
+                        aceptada = self.procesar_carta_detectada(carta, marca)
+                    if aceptada:
+                        self.emitir("carta", carta=carta, aceptada=True, latencia=self.trazas.ultima)
+                    else:
+                        self.trazas.carta_rechazada()
+                        self.emitir("carta", carta=carta, aceptada=False)
+                    if self.grabador:
+                        self.grabador.evento("carta", carta=carta, aceptada=aceptada)
+                    if aceptada:
+                        pausa_hasta = time.monotonic() + self.PAUSA_TRAS_CARTA
+                    self._emitir_estado()
+                self.perfil_camara.observar(frame, carta if aceptada else None)
+                self._dibujar_en_memoria(frame, anotaciones)
+
+        except KeyboardInterrupt:
+            pass
+
+        finally:
+            if self.metricas.activo and self.metricas.archivo:
+                self.metricas.exportar()
+            if self.difusion:
+                self.difusion.cerrar()
+            self.camara.cerrar()
+            self.detector.liberar()
+            if self.grabador:
+                self.grabador.cerrar()
+            self.historial.cerrar()
+            registro.cerrar_registro()
+            self.emitir("fin", latencias=self.trazas.resumen())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pakkorat UNO sin pantalla (eventos JSON por stdout)")
+    parser.add_argument("--camara", default=None,
+                        help="URL de IP Webcam (por defecto cámara local)")
+    parser.add_argument("--mazos", type=int, default=8, help="Mazos en el zapato")
+    parser.add_argument("--puerto-difusion", type=int, default=None,
+                        help="Puerto TCP para publicar los cambios de estado")
+    parser.add_argument("--metricas", default=None,
+                        help="Archivo de métricas por etapa (.json o texto Prometheus)")
+    parser.add_argument("--trazas", default=None,
+                        help="JSONL con la latencia de cada carta (vidrio -> decisión)")
+    parser.add_argument("--mesa", default="mesa-1", help="Identificador de la mesa")
+    parser.add_argument("--registro", default=None, help="Archivo de registros JSON")
+    parser.add_argument("--perfiles", default=ARCHIVO_PERFILES,
+                        help="Perfiles de calibración por cámara (calibracion.py)")
+    parser.add_argument("--auditoria", default=None,
+                        help="Carpeta donde grabar la mesa y sus eventos (auditoria.py)")
+    parser.add_argument("--historial", default=None,
+                        help="Base SQLite donde guardar el historial de manos (sin ella solo vive en memoria)")
+    parser.add_argument("--hilos-deteccion", type=int, default=1,
+                        help="Hilos para buscar cartas por franjas en cámaras 4K (0 = todos los núcleos)")
+    args = parser.parse_args()
+
+    motor = MotorSinPantalla(ip_webcam_url=args.camara, mazos=args.mazos,
+                             puerto_difusion=args.puerto_difusion,
+                             archivo_metricas=args.metricas,
+                             archivo_trazas=args.trazas,
+                             mesa=args.mesa, archivo_registro=args.registro,
+                             archivo_perfiles=args.perfiles,
+                             directorio_auditoria=args.auditoria,
+                             archivo_historial=args.historial,
+                             hilos_deteccion=args.hilos_deteccion)
+    motor.arranque = {"inicio": INICIO}
+    motor.leer_comandos(sys.stdin)
+    motor.ejecutar()
@@ -0,0 +1,393 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from detector_cartas import DetectorCartas
+from generar_dataset import GeneradorDataset, cargar_etiquetas
+from metricas import Metricas
+from sin_pantalla import MotorSinPantalla
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+PROFUNDIDAD_PILA = 8     # Marcos que guarda tracemalloc para ubicar al llamador
+FPS_CAMARA = 30          # Para traducir frames a horas de mesa
+
+# Ronda fija de 6 cartas distintas (jugador 1+2, banca 3+2, terceras 4 y 5 ->
+# jugador 7, banca 0): cada ronda saca una copia de cada una, así que un zapato
+# de N mazos alcanza para N rondas
+RONDA = [
+    {"color": "rojo", "valor": 1}, {"color": "azul", "valor": 2},
+    {"color": "verde", "valor": 3}, {"color": "amarillo", "valor": 2},
+    {"color": "rojo", "valor": 4}, {"color": "azul", "valor": 5},
+]
+
+
+class _Fuente:
+    """Base de las fuentes de video: imita lo que usa DetectorCartas de cv2.VideoCapture"""
+
+    def __init__(self, fps):
+        self.fps = fps
+        self.leidos = 0
+        self._siguiente = time.perf_counter()
+
+    def _esperar_turno(self):
+        if not self.fps:
+            return
+        ahora = time.perf_counter()
+        if ahora < self._siguiente:
+            time.sleep(self._siguiente - ahora)
+        self._siguiente = max(ahora, self._siguiente) + 1 / self.fps
+
+    def get(self, propiedad):
+        return 0  # Sin marca de tiempo del driver
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+    def carta_aceptada(self):
+        pass
+
+
+class FuenteSintetica(_Fuente):
+    """
+    Cartas sintéticas (generar_dataset.py) que siguen una ronda fija
+
+    Muestra la carta actual hasta que el juego la acepta, luego unos frames
+    de mesa vacía y la siguiente carta, así las rondas avanzan solas. Los
+    frames se generan una vez; cada carta tiene varias variantes que el
+    detector sí lee.
+    """
+
+    def __init__(self, ancho=1280, alto=720, ronda=RONDA, variantes=3, vacios=4, fps=200, semilla=0):
+        super().__init__(fps)
+        generador = GeneradorDataset(semilla=semilla, ancho=ancho, alto=alto, nivel="facil",
+                                     proporcion_vacios=1.0)
+        detector = DetectorCartas()
+        self._mesa = [generador.frame(i)[0] for i in range(variantes)]
+        self._cartas = []
+        try:
+            for j, carta in enumerate(ronda):
+                legibles = []
+                for i in range(20):
+                    imagen, _ = generador.frame(1000 * (j + 1) + i, carta=carta)
+                    leida, _ = detector.detectar_cartas_anotaciones(imagen)
+                    if leida == carta:
+                        legibles.append(imagen)
+                        if len(legibles) == variantes:
+                            break
+                if not legibles:
+                    raise ValueError(f"el detector no lee ninguna variante de {carta}")
+                self._cartas.append(legibles)
+        finally:
+            detector.liberar()  # Solo sirvió para elegir las variantes legibles
+        self.vacios = vacios
+        self._actual = 0
+        self._pendientes = vacios
+
+    def read(self):
+        self._esperar_turno()
+        self.leidos += 1
+        if self._pendientes > 0:
+            self._pendientes -= 1
+            return True, self._mesa[self.leidos % len(self._mesa)]
+        variantes = self._cartas[self._actual]
+        return True, variantes[self.leidos % len(variantes)]
+
+    def carta_aceptada(self):
+        self._actual = (self._actual + 1) % len(self._cartas)
+        self._pendientes = self.vacios
+
+
+class FuenteArchivo(_Fuente):
+    """Repite en bucle un video o un corpus de generar_dataset.py (p. ej. una sesión grabada)"""
+
+    def __init__(self, ruta, fps=200):
+        super().__init__(fps)
+        self._archivos = None
+        self._cap = None
+        if os.path.isdir(ruta):
+            self._archivos = [os.path.join(ruta, e["archivo"]) for e in cargar_etiquetas(ruta)]
+        else:
+            self._cap = cv2.VideoCapture(ruta)
+            if not self._cap.isOpened():
+                raise ValueError(f"no se pudo abrir {ruta}")
+
+    def read(self):
+        self._esperar_turno()
+        self.leidos += 1
+        if self._archivos:
+            return True, cv2.imread(self._archivos[self.leidos % len(self._archivos)])
+        ret, frame = self._cap.read()
+        if not ret:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read()
+        return ret, frame
+
+    def release(self):
+        pass  # La fuente sobrevive a las reconexiones del GestorCamara
+
+
+class DetectorReproduccion(DetectorCartas):
+    """DetectorCartas que "conecta" con una fuente en memoria en lugar de la cámara"""
+
+    def __init__(self, fuente):
+        super().__init__()
+        self.fuente = fuente
+
+    def conectar_camara(self, resolucion=None, indice=0):
+        self.cap = self.fuente
+        self.indice = indice
+        self.conectada = True
+        return True
+
+
+def _rss_mb():
+    """RSS actual (Linux) o, si no se puede leer, el pico que da getrusage"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+
+def _percentiles(valores_ms):
+    if len(valores_ms) == 0:
+        return None
+    p50, p95, p99 = np.percentile(valores_ms, [50, 95, 99])
+    return {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2)}
+
+
+def _linea_propia(traceback):
+    """Línea más reciente de la pila que pertenece al proyecto (o la más reciente si no hay)"""
+    for marco in reversed(traceback):
+        if os.path.dirname(os.path.abspath(marco.filename)) == DIRECTORIO:
+            return f"{os.path.basename(marco.filename)}:{marco.lineno}"
+    marco = traceback[-1]
+    return f"{marco.filename}:{marco.lineno}"
+
+
+def _top_asignaciones(instantanea, base, cantidad=10):
+    """Líneas del proyecto cuya memoria más creció desde la instantánea base"""
+    filtros = [tracemalloc.Filter(False, tracemalloc.__file__),
+               tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+    diferencias = instantanea.filter_traces(filtros).compare_to(base.filter_traces(filtros), "traceback")
+    por_linea = {}
+    for d in diferencias:
+        linea = por_linea.setdefault(_linea_propia(d.traceback), {"kb": 0.0, "bloques": 0})
+        linea["kb"] += d.size_diff / 1024
+        linea["bloques"] += d.count_diff
+    top = sorted(por_linea.items(), key=lambda item: -item[1]["kb"])[:cantidad]
+    return [{"linea": linea, "kb": round(datos["kb"], 1), "bloques": datos["bloques"]}
+            for linea, datos in top if datos["kb"] > 0]
+
+
+class MotorSoak(MotorSinPantalla):
+    """
+    MotorSinPantalla conducido por una fuente reproducida: inicia, reinicia
+    y baraja solo, y cada `cada` frames toma una muestra de memoria, tiempos
+    por frame y latencia de las cartas
+    """
+
+    def __init__(self, fuente, frames, cada=3000, usar_tracemalloc=True, dibujar=True):
+        super().__init__(salida=open(os.devnull, "w"), archivo_perfiles=None,
+                         detector=DetectorReproduccion(fuente), dibujar=dibujar)
+        self.fuente = fuente
+        self.total_frames = frames
+        self.cada = cada
+        self.usar_tracemalloc = usar_tracemalloc
+        # Métricas siempre activas, con ventanas del tamaño de una muestra
+        self.metricas = Metricas(activo=True, ventana=cada, ventana_fps=cada)
+        self.detector.metricas = self.metricas
+        self.muestras = []
+        self.base_memoria = None
+        self.ultima_memoria = None
+        self.rondas = 0
+        self._rondas_zapato = 0
+        self.cartas = 0
+        self._latencias = []
+        self._proxima_muestra = cada
+        self._inicio = None
+
+    def ejecutar(self):
+        try:
+            return super().ejecutar()
+        finally:
+            self.salida.close()  # El os.devnull abierto en __init__
+
+    def emitir(self, tipo, **datos):
+        """Los eventos no se escriben: conducen la fuente y las rondas"""
+        if tipo == "carta" and datos.get("aceptada"):
+            self.cartas += 1
+            self.fuente.carta_aceptada()
+            if datos.get("latencia"):
+                self._latencias.append(datos["latencia"]["total_ms"])
+        elif tipo == "resultado":
+            self.rondas += 1
+            self._rondas_zapato += 1
+            # Barajar antes de que falten copias: con una carta imposible la
+            # fuente se queda mostrándola y la prueba deja de jugar rondas
+            if self.zapato.corte_alcanzado or self._rondas_zapato >= self.zapato.mazos:
+                self._rondas_zapato = 0
+                self.enviar_comando("barajar")
+            self.enviar_comando("reiniciar")
+            self.enviar_comando("iniciar")
+
+    def _procesar_comandos(self):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+            if self.usar_tracemalloc:
+                tracemalloc.start(PROFUNDIDAD_PILA)
+            if not self.modo_debug:
+                # Los avisos siguen saliendo; cada carta aceptada no
+                logging.getLogger("pakorat").setLevel(logging.WARNING)
+            self.enviar_comando("iniciar")
+        if self.metricas.frames >= self._proxima_muestra:
+            self._proxima_muestra += self.cada
+            self._muestrear()
+            if self.metricas.frames >= self.total_frames:
+                return False
+        return super()._procesar_comandos()
+
+    def _muestrear(self):
+        muestra = {
+            "frames": self.metricas.frames,
+            "segundos": round(time.perf_counter() - self._inicio, 1),
+            "rondas": self.rondas,
+            "cartas": self.cartas,
+            "rss_mb": round(_rss_mb(), 2),
+            "hilos": threading.active_count(),
+            "objetos": len(gc.get_objects()),
+            "frame_ms": _percentiles(self.metricas.tiempos_frame() * 1000),
+            "etapas_p95_ms": {nombre: datos["p95_ms"]
+                              for nombre, datos in self.metricas.resumen()["etapas"].items()},
+            "latencia_ms": _percentiles(self._latencias),
+        }
+        self._latencias = []
+        if self.usar_tracemalloc:
+            actual, pico = tracemalloc.get_traced_memory()
+            muestra["tracemalloc_mb"] = round(actual / 2**20, 2)
+            muestra["tracemalloc_pico_mb"] = round(pico / 2**20, 2)
+            instantanea = tracemalloc.take_snapshot()
+            if self.base_memoria is None:
+                self.base_memoria = instantanea  # Tras la primera muestra: ya calentado
+            else:
+                muestra["top"] = _top_asignaciones(instantanea, self.base_memoria, 5)
+                self.ultima_memoria = instantanea
+        self.muestras.append(muestra)
+        print(f"🧪 {muestra['frames']} frames ({muestra['frames'] / FPS_CAMARA / 3600:.2f} h de mesa), "
+              f"{self.rondas} rondas, RSS {muestra['rss_mb']:.1f} MB, "
+              f"frame p95 {(muestra['frame_ms'] or {}).get('p95', 0):.1f} ms")
+
+
+def analizar(muestras, calentamiento=0.2, umbral=0.2, minimo_ms=1.0, crecimiento_mb=16.0):
+    """
+    Busca fugas y regresiones en las muestras de una prueba larga
+
+    Descarta el primer `calentamiento` de las muestras. Una serie de memoria
+    (RSS, tracemalloc, objetos) se marca si creció más que su límite y subió
+    en la mayoría de los tramos; los hilos, si crecieron. Los tiempos (p95 y
+    p99 por frame, p95 de latencia y de cada etapa) se comparan entre el
+    primer y el último tercio: se marca si la mediana subió más que `umbral`
+    y que `minimo_ms`.
+
+    Returns:
+        list: Alertas (dict con "tipo", "serie" y "detalle")
+    """
+    usadas = muestras[int(len(muestras) * calentamiento):]
+    if len(usadas) < 3:
+        return [{"tipo": "aviso", "serie": "muestras",
+                 "detalle": "muy pocas muestras para analizar (sube --horas o baja --cada)"}]
+
+    alertas = []
+    frames = np.array([m["frames"] for m in usadas], dtype=float)
+    limites = {"rss_mb": crecimiento_mb, "tracemalloc_mb": crecimiento_mb / 2, "objetos": 5000}
+    for serie, limite in limites.items():
+        if serie not in usadas[0]:
+            continue
+        valores = np.array([m[serie] for m in usadas], dtype=float)
+        crecimiento = valores[-1] - valores[0]
+        subidas = np.mean(np.diff(valores) > 0)
+        if crecimiento > limite and subidas >= 0.6:
+            pendiente = np.polyfit(frames, valores, 1)[0] * FPS_CAMARA * 3600
+            alertas.append({"tipo": "fuga", "serie": serie,
+                            "detalle": f"+{crecimiento:.1f} en la prueba (~{pendiente:+.1f} por hora de mesa)"})
+
+    hilos = [m["hilos"] for m in usadas]
+    if hilos[-1] > hilos[0]:
+        alertas.append({"tipo": "fuga", "serie": "hilos", "detalle": f"{hilos[0]} -> {hilos[-1]}"})
+
+    # Con la fuente a ritmo fijo el frame puede quedar acotado por ella: las
+    # etapas miden solo el trabajo del bucle
+    tercio = max(1, len(usadas) // 3)
+    series = [("frame_ms", "p95"), ("frame_ms", "p99"), ("latencia_ms", "p95")]
+    series += [("etapas_p95_ms", nombre) for nombre in usadas[-1]["etapas_p95_ms"]]
+    for serie, clave in series:
+        valores = [m[serie].get(clave) if m[serie] else None for m in usadas]
+        antes = [v for v in valores[:tercio] if v is not None]
+        despues = [v for v in valores[-tercio:] if v is not None]
+        if not antes or not despues:
+            continue
+        antes, despues = float(np.median(antes)), float(np.median(despues))
+        if despues > antes * (1 + umbral) and despues - antes > minimo_ms:
+            alertas.append({"tipo": "regresion", "serie": f"{serie}.{clave}",
+                            "detalle": f"{antes:.1f} -> {despues:.1f} ms"})
+    return alertas
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba larga del bucle completo con memoria y tiempos por frame")
+    parser.add_argument("--horas", type=float, default=1.0,
+                        help=f"Horas de mesa a simular (a {FPS_CAMARA} FPS de cámara)")
+    parser.add_argument("--cada", type=int, default=3000, help="Frames entre muestras")
+    parser.add_argument("--fuente", default=None,
+                        help="Video o corpus de generar_dataset.py a repetir (por defecto cartas sintéticas)")
+    parser.add_argument("--ancho", type=int, default=1280, help="Ancho de los frames sintéticos")
+    parser.add_argument("--alto", type=int, default=720, help="Alto de los frames sintéticos")
+    parser.add_argument("--fps", type=float, default=200, help="Ritmo de la fuente (0 = sin límite)")
+    parser.add_argument("--debug", action="store_true", help="Con modo debug (registros por frame)")
+    parser.add_argument("--sin-dibujar", action="store_true", help="No componer la mesa en cada frame")
+    parser.add_argument("--sin-tracemalloc", action="store_true",
+                        help="Sin tracemalloc (más rápido, sin top de asignaciones)")
+    parser.add_argument("--umbral", type=float, default=0.2, help="Subida relativa de tiempos que es regresión")
+    parser.add_argument("--reporte", default="soak.json", help="Archivo JSON con muestras y alertas")
+    args = parser.parse_args()
+
+    if args.fuente:
+        fuente = FuenteArchivo(args.fuente, fps=args.fps)
+    else:
+        fuente = FuenteSintetica(args.ancho, args.alto, fps=args.fps)
+
+    frames = int(args.horas * 3600 * FPS_CAMARA)
+    motor = MotorSoak(fuente, frames, cada=args.cada, usar_tracemalloc=not args.sin_tracemalloc,
+                      dibujar=not args.sin_dibujar)
+    if args.debug:
+        motor.enviar_comando("debug")
+    motor.ejecutar()
+
+    alertas = analizar(motor.muestras, umbral=args.umbral)
+    reporte = {"frames": frames, "rondas": motor.rondas, "cartas": motor.cartas,
+               "muestras": motor.muestras, "alertas": alertas}
+    if motor.ultima_memoria is not None:
+        reporte["top_asignaciones"] = _top_asignaciones(motor.ultima_memoria, motor.base_memoria)
+    with open(args.reporte, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{motor.rondas} rondas, {motor.cartas} cartas en {len(motor.muestras)} muestras")
+    for linea in reporte.get("top_asignaciones", [])[:5]:
+        print(f"   +{linea['kb']:.0f} KB  {linea['linea']}")
+    if alertas:
+        for alerta in alertas:
+            print(f"❌ {alerta['tipo']} en {alerta['serie']}: {alerta['detalle']}")
+        sys.exit(1)
+    print(f"✅ sin fugas ni regresiones (reporte en {args.reporte})")
@@ -0,0 +1,165 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import cv2
+import numpy as np
+
+_PAGINA = b"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Pakkorat UNO</title></head>
+<body style="margin:0;background:#282828">
+<img src="/stream" style="width:100%;height:auto">
+</body></html>"""
+
+
+class ServidorMJPEG:
+    """
+    Servidor HTTP local que transmite la mesa como MJPEG
+
+    Cada frame se codifica a JPEG una sola vez en un hilo propio y los mismos
+    bytes se envían a todos los espectadores. Cada cliente recibe siempre el
+    JPEG más reciente, así que un cliente lento pierde frames en lugar de
+    frenar a los demás, y el bucle de detección solo paga una copia del frame
+    cuando toca codificar.
+    """
+
+    def __init__(self, puerto=8090, host="127.0.0.1", fps=10, calidad=70):
+        """
+        Args:
+            puerto: Puerto HTTP
+            host: Interfaz donde escuchar ("0.0.0.0" para toda la red local)
+            fps: Frames por segundo codificados como máximo
+            calidad: Calidad JPEG (0-100)
+        """
+        self.puerto = puerto
+        self.host = host
+        self.intervalo = 1.0 / fps
+        self.calidad = calidad
+
+        self._buffer = None
+        self._proximo = 0.0
+        self._hay_frame = threading.Event()
+        self._libre = threading.Event()
+        self._libre.set()
+
+        self._condicion = threading.Condition()
+        self._jpeg = None
+        self._seq = 0
+        self._cerrado = False
+
+        self._servidor = None
+        self._hilos = []
+
+    def iniciar(self):
+        """Arranca el servidor HTTP y el hilo codificador"""
+        servidor_mjpeg = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path in ("/", "/index.html"):
+                    self._responder(_PAGINA, "text/html; charset=utf-8")
+                elif self.path == "/frame.jpg":
+                    seq, jpeg = servidor_mjpeg.esperar_jpeg(0, timeout=5)
+                    if jpeg is None:
+                        self.send_error(503, "Sin frames todavía")
+                    else:
+                        self._responder(jpeg, "image/jpeg")
+                elif self.path == "/stream":
+                    self._transmitir()
+                else:
+                    self.send_error(404)
+
+            def _responder(self, cuerpo, tipo):
+                self.send_response(200)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def _transmitir(self):
+                self.send_response(200)
+                self.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                ultimo = 0  # La secuencia 0 significa "todavía no hay JPEG"
+                try:
+                    while True:
+                        seq, jpeg = servidor_mjpeg.esperar_jpeg(ultimo)
+                        if servidor_mjpeg._cerrado:
+                            return
+                        if seq == ultimo:
+                            continue
+                        ultimo = seq
+                        self.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                        self.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+
+            def log_message(self, formato, *args):
+                pass  # Sin una línea por petición en la terminal
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self._hilos = [
+            threading.Thread(target=self._servidor.serve_forever, name="mjpeg-http", daemon=True),
+            threading.Thread(target=self._codificar, name="mjpeg-codificador", daemon=True),
+        ]
+        for hilo in self._hilos:
+            hilo.start()
+        print(f"📡 transmisión MJPEG en http://{self.host}:{self.puerto}/")
+
+    def publicar(self, frame):
+        """
+        Ofrece un frame al codificador (no bloquea)
+
+        Solo se copia si toca codificar según fps y el codificador está libre;
+        en cualquier otro caso el frame se descarta sin costo.
+        """
+        ahora = time.monotonic()
+        if ahora < self._proximo or not self._libre.is_set():
+            return
+        if self._buffer is None or self._buffer.shape != frame.shape:
+            self._buffer = np.empty_like(frame)
+        np.copyto(self._buffer, frame)
+        self._proximo = ahora + self.intervalo
+        self._libre.clear()
+        self._hay_frame.set()
+
+    def _codificar(self):
+        """Hilo codificador: un JPEG por frame publicado, compartido por todos los clientes"""
+        parametros = [cv2.IMWRITE_JPEG_QUALITY, self.calidad]
+        while not self._cerrado:
+            if not self._hay_frame.wait(timeout=0.5):
+                continue
+            self._hay_frame.clear()
+            ok, codificado = cv2.imencode(".jpg", self._buffer, parametros)
+            self._libre.set()
+            if not ok:
+                continue
+            with self._condicion:
+                self._jpeg = codificado.tobytes()
+                self._seq += 1
+                self._condicion.notify_all()
+
+    def esperar_jpeg(self, ultimo_seq, timeout=1.0):
+        """
+        Espera un JPEG más nuevo que ultimo_seq
+
+        Returns:
+            tuple: (seq, bytes) del JPEG más reciente (bytes None si aún no hay)
+        """
+        with self._condicion:
+            self._condicion.wait_for(lambda: self._seq != ultimo_seq or self._cerrado,
+                                     timeout=timeout)
+            return self._seq, self._jpeg
+
+    def cerrar(self):
+        """Detiene el servidor y el codificador"""
+        self._cerrado = True
+        with self._condicion:
+            self._condicion.notify_all()
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+            self._servidor = None
@@ -0,0 +1,151 @@
+import json
+import time
+from collections import deque
+import numpy as np
+
+# Componentes de la latencia de cada carta, en el orden en que ocurren
+COMPONENTES = [
+    "espera_pausa_ms",      # Cota: la carta pudo aparecer durante la pausa tras la carta anterior
+    "reintentos_ms",        # Carta visible en frames donde el QR todavía no se leyó
+    "buffer_camara_ms",     # Antigüedad del frame según la marca del driver (si la hay)
+    "captura_ms",           # cap.read() o ida y vuelta de /shot.jpg
+    "decodificacion_ms",    # JPEG -> imagen (solo IP Webcam)
+    "deteccion_ms",         # Rectángulos + QR
+    "juego_ms",             # procesar_carta_detectada hasta la transición del Baccarat
+]
+
+
+class RegistroLatencias:
+    """
+    Trazas "del vidrio a la decisión" de cada carta aceptada
+
+    Cada frame llega con una marca del detector (perf_counter antes y después
+    de capturar y de decodificar). La interfaz agrega el fin de la detección
+    y, si la carta se acepta, el instante en que el Baccarat cambió de estado.
+    Con eso cada carta queda desglosada en componentes (ver COMPONENTES).
+
+    La aparición de la carta se toma como el primer frame de la racha actual
+    de frames con un rectángulo candidato, así que los frames donde se veía
+    la carta pero el QR no se leía cuentan como reintentos.
+    """
+
+    def __init__(self, archivo=None, maximo=1000):
+        """
+        Args:
+            archivo: JSONL donde se agrega una traza por carta (opcional)
+            maximo: Trazas guardadas en memoria para el resumen
+        """
+        self.archivo = archivo
+        self.trazas = deque(maxlen=maximo)
+        self.ultima = None
+        self._primera_vista = None
+        self._ultima_aceptacion = None
+        self._espera_pausa = 0.0
+        self._evaluado_tras_aceptacion = True
+
+    def frame_evaluado(self, marca, hay_candidatos):
+        """
+        Registra un frame que pasó por la detección
+
+        Args:
+            marca: Marca del detector (DetectorCartas.marca_frame) con "detectado"
+            hay_candidatos: Si se encontró algún rectángulo de carta
+        """
+        if not self._evaluado_tras_aceptacion:
+            # Primer frame evaluado tras la pausa: si ya hay una carta, pudo
+            # haber estado esperando desde la aceptación anterior
+            self._evaluado_tras_aceptacion = True
+            if hay_candidatos and self._ultima_aceptacion is not None:
+                self._espera_pausa = max(0.0, marca["pedido"] - self._ultima_aceptacion)
+
+        if not hay_candidatos:
+            self._primera_vista = None
+            self._espera_pausa = 0.0
+        elif self._primera_vista is None:
+            self._primera_vista = marca
+
+    def carta_rechazada(self):
+        """La lectura no avanzó el juego (repetida, ya usada o imposible): empieza otra racha"""
+        self._primera_vista = None
+        self._espera_pausa = 0.0
+
+    def carta_aceptada(self, carta, marca, mano, transicion):
+        """
+        Cierra la traza de una carta aceptada
+
+        Args:
+            carta: Datos de la carta
+            marca: Marca del frame donde se leyó
+            mano: "jugador" o "banca"
+            transicion: perf_counter justo después del cambio de estado del Baccarat
+
+        Returns:
+            dict: La traza de la carta
+        """
+        primera = self._primera_vista or marca
+        ms = lambda segundos: round(segundos * 1000, 2)
+
+        traza = {
+            "t": time.time(),
+            "carta": carta,
+            "mano": mano,
+            "frame": marca["id"],
+            "frames_hasta_lectura": marca["id"] - primera["id"],
+            "espera_pausa_ms": ms(self._espera_pausa),
+            "reintentos_ms": ms(marca["pedido"] - primera["pedido"]),
+            "buffer_camara_ms": marca.get("buffer_ms"),
+            "captura_ms": ms(marca["recibido"] - marca["pedido"]),
+            "decodificacion_ms": ms(marca["decodificado"] - marca["recibido"]),
+            "deteccion_ms": ms(marca["detectado"] - marca["decodificado"]),
+            "juego_ms": ms(transicion - marca["detectado"]),
+        }
+        traza["total_ms"] = ms(transicion - primera["pedido"] + self._espera_pausa
+                               + (traza["buffer_camara_ms"] or 0) / 1000)
+
+        self.trazas.append(traza)
+        self.ultima = traza
+        self._primera_vista = None
+        self._espera_pausa = 0.0
+        self._ultima_aceptacion = transicion
+        self._evaluado_tras_aceptacion = False
+
+        if self.archivo:
+            with open(self.archivo, "a", encoding="utf-8") as f:
+                f.write(json.dumps(traza, ensure_ascii=False) + "\n")
+        return traza
+
+    def resumen(self):
+        """
+        Returns:
+            dict: p50/p95/máximo por componente y del total, y la fracción media del total
+        """
+        if not self.trazas:
+            return {"cartas": 0}
+        resumen = {"cartas": len(self.trazas), "componentes": {}}
+        totales = np.array([t["total_ms"] for t in self.trazas])
+        for nombre in COMPONENTES + ["total_ms"]:
+            valores = np.array([t[nombre] for t in self.trazas if t[nombre] is not None], dtype=float)
+            if not len(valores):
+                continue
+            datos = {
+                "p50": round(float(np.percentile(valores, 50)), 2),
+                "p95": round(float(np.percentile(valores, 95)), 2),
+                "max": round(float(valores.max()), 2),
+            }
+            if nombre != "total_ms" and totales.sum() > 0:
+                datos["fraccion"] = round(float(valores.sum() / totales.sum()), 3)
+            resumen["componentes"][nombre] = datos
+        return resumen
+
+    def reporte(self):
+        """Resumen legible para imprimir al salir"""
+        resumen = self.resumen()
+        if not resumen["cartas"]:
+            return "sin cartas aceptadas: no hay trazas de latencia"
+        lineas = [f"⏱️  latencia vidrio -> decisión ({resumen['cartas']} cartas)",
+                  f"   {'componente':<20}{'p50':>9}{'p95':>9}{'max':>9}{'% total':>9}"]
+        for nombre, datos in resumen["componentes"].items():
+            fraccion = f"{datos['fraccion'] * 100:.0f}%" if "fraccion" in datos else ""
+            lineas.append(f"   {nombre[:-3]:<20}{datos['p50']:>9.1f}{datos['p95']:>9.1f}"
+                          f"{datos['max']:>9.1f}{fraccion:>9}")
+        return "\n".join(lineas)
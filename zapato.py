@@ -0,0 +1,261 @@
+class ZapatoBaccarat:
+    """
+    Seguimiento incremental de la composición de un zapato de varios mazos UNO
+
+    Cada mazo tiene una etiqueta QR por color y valor (ver generar_qr.py), así
+    que un zapato de N mazos contiene exactamente N copias de cada carta.
+    Todas las actualizaciones por carta son O(1): contadores por carta y por
+    valor, más una suma acumulada de efectos de eliminación (EOR) que permite
+    estimar la ventaja de cada apuesta sin recalcular la composición.
+    """
+
+    COLORES = ["amarillo", "rojo", "verde", "azul"]
+    VALORES = list(range(10))
+
+    def __init__(self, mazos=8, cartas_tras_corte=14):
+        """
+        Inicializa el zapato
+
+        Args:
+            mazos: Número de mazos UNO barajados juntos
+            cartas_tras_corte: Cartas que quedan detrás de la carta de corte
+        """
+        self.mazos = mazos
+        self.total_cartas = mazos * len(self.COLORES) * len(self.VALORES)
+        self.cartas_tras_corte = min(cartas_tras_corte, self.total_cartas)
+
+        # Índice fijo (color, valor) -> posición en los contadores
+        self._indice = {}
+        for color in self.COLORES:
+            for valor in self.VALORES:
+                self._indice[(color, valor)] = len(self._indice)
+
+        # Efectos de eliminación por valor, calculados una sola vez
+        conteo_completo = [mazos * len(self.COLORES)] * len(self.VALORES)
+        self.ventaja_base, self._eor = _calcular_eor(conteo_completo)
+
+        self.barajar()
+
+    def barajar(self):
+        """Reinicia el zapato completo (nuevo barajado)"""
+        self._vistas = [0] * len(self._indice)
+        self._restantes_valor = [self.mazos * len(self.COLORES)] * len(self.VALORES)
+        self.cartas_vistas = 0
+        self.imposibles = 0
+        self._suma_eor = {"banca": 0.0, "jugador": 0.0}
+
+    def _posicion(self, carta):
+        """Retorna la posición de la carta en los contadores o None si no existe"""
+        try:
+            return self._indice.get((str(carta["color"]).lower(), int(carta["valor"])))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def es_posible(self, carta):
+        """
+        Verifica si la carta todavía puede salir del zapato
+
+        Args:
+            carta: dict {"color": "rojo", "valor": 7}
+
+        Returns:
+            bool: False si la carta no existe o ya salieron todas sus copias
+        """
+        pos = self._posicion(carta)
+        return pos is not None and self._vistas[pos] < self.mazos
+
+    def registrar_carta(self, carta):
+        """
+        Registra una carta que salió del zapato
+
+        Args:
+            carta: dict {"color": "rojo", "valor": 7}
+
+        Returns:
+            tuple: (bool, mensaje). False si la carta es imposible
+        """
+        if not self.es_posible(carta):
+            return False, self.rechazar_carta(carta)
+
+        pos = self._posicion(carta)
+        valor = int(carta["valor"])
+        self._vistas[pos] += 1
+        self._restantes_valor[valor] -= 1
+        self.cartas_vistas += 1
+        for apuesta, eor in self._eor.items():
+            self._suma_eor[apuesta] += eor[valor]
+
+        return True, f"Zapato: quedan {self.restantes} cartas"
+
+    def rechazar_carta(self, carta):
+        """
+        Cuenta una lectura imposible sin tocar la composición del zapato
+
+        Args:
+            carta: dict {"color": "rojo", "valor": 7} que no pasó es_posible
+
+        Returns:
+            str: Motivo del rechazo
+        """
+        self.imposibles += 1
+        pos = self._posicion(carta)
+        if pos is None:
+            return f"Carta desconocida para el zapato: {carta}"
+        return (f"Carta imposible: {carta['color']} {carta['valor']} "
+                f"ya salió {self._vistas[pos]} veces ({self.mazos} mazos)")
+
+    def devolver_carta(self, carta):
+        """
+        Deshace registrar_carta (la carta no llegó a entrar al juego)
+
+        Args:
+            carta: dict {"color": "rojo", "valor": 7}
+        """
+        pos = self._posicion(carta)
+        if pos is None or self._vistas[pos] == 0:
+            return
+        valor = int(carta["valor"])
+        self._vistas[pos] -= 1
+        self._restantes_valor[valor] += 1
+        self.cartas_vistas -= 1
+        for apuesta, eor in self._eor.items():
+            self._suma_eor[apuesta] -= eor[valor]
+
+    @property
+    def restantes(self):
+        """Cartas que quedan en el zapato"""
+        return self.total_cartas - self.cartas_vistas
+
+    @property
+    def corte_alcanzado(self):
+        """True cuando se llegó a la carta de corte y hay que barajar"""
+        return self.restantes <= self.cartas_tras_corte
+
+    def ventaja(self, apuesta):
+        """
+        Estima la ventaja del jugador para una apuesta con la composición actual
+
+        Usa la aproximación lineal por efectos de eliminación, normalizada por
+        las cartas restantes (equivalente al "conteo verdadero").
+
+        Args:
+            apuesta: "banca" o "jugador"
+
+        Returns:
+            float: Ventaja esperada por unidad apostada (negativa = a favor de la casa)
+        """
+        if self.restantes <= 0:
+            return self.ventaja_base[apuesta]
+        escala = self.total_cartas / self.restantes
+        return self.ventaja_base[apuesta] + self._suma_eor[apuesta] * escala
+
+    def obtener_estado(self):
+        """Retorna un resumen del zapato"""
+        return {
+            "mazos": self.mazos,
+            "restantes": self.restantes,
+            "cartas_vistas": self.cartas_vistas,
+            "imposibles": self.imposibles,
+            "corte_alcanzado": self.corte_alcanzado,
+            "ventaja_banca": self.ventaja("banca"),
+            "ventaja_jugador": self.ventaja("jugador"),
+        }
+
+
+def _banca_pide_tercera(puntos_banca, tercera_jugador):
+    """Regla de tercera carta de la banca (misma tabla que Baccarat._evaluar_tercera_banca)"""
+    if puntos_banca <= 2:
+        return True
+    if puntos_banca == 3:
+        return tercera_jugador != 8
+    if puntos_banca == 4:
+        return tercera_jugador in (2, 3, 4, 5, 6, 7)
+    if puntos_banca == 5:
+        return tercera_jugador in (4, 5, 6, 7)
+    if puntos_banca == 6:
+        return tercera_jugador in (6, 7)
+    return False
+
+
+def _probabilidades_resultado(conteo):
+    """
+    Calcula P(jugador), P(banca), P(empate) para una composición
+
+    Se toma cada carta con reemplazo según las proporciones del zapato; es la
+    aproximación habitual para zapatos grandes y solo requiere ~10^4 pasos.
+
+    Args:
+        conteo: Lista con el número de cartas de cada valor (0-9)
+
+    Returns:
+        tuple: (p_jugador, p_banca, p_empate)
+    """
+    total = float(sum(conteo))
+    p = [c / total for c in conteo]
+
+    # Distribución del total con dos cartas
+    dos = [0.0] * 10
+    for a in range(10):
+        for b in range(10):
+            dos[(a + b) % 10] += p[a] * p[b]
+
+    resultado = [0.0, 0.0, 0.0]  # jugador, banca, empate
+
+    def sumar(peso, pj, pb):
+        if pj > pb:
+            resultado[0] += peso
+        elif pb > pj:
+            resultado[1] += peso
+        else:
+            resultado[2] += peso
+
+    for pj in range(10):
+        for pb in range(10):
+            peso = dos[pj] * dos[pb]
+            if pj >= 8 or pb >= 8:
+                sumar(peso, pj, pb)
+            elif pj <= 5:
+                for c in range(10):
+                    pj3 = (pj + c) % 10
+                    peso_c = peso * p[c]
+                    if _banca_pide_tercera(pb, c):
+                        for d in range(10):
+                            sumar(peso_c * p[d], pj3, (pb + d) % 10)
+                    else:
+                        sumar(peso_c, pj3, pb)
+            elif pb <= 5:
+                for d in range(10):
+                    sumar(peso * p[d], pj, (pb + d) % 10)
+            else:
+                sumar(peso, pj, pb)
+
+    return tuple(resultado)
+
+
+def _ventajas(conteo):
+    """Ventaja por unidad de las apuestas banca (5% de comisión) y jugador"""
+    p_jugador, p_banca, _ = _probabilidades_resultado(conteo)
+    return {
+        "banca": 0.95 * p_banca - p_jugador,
+        "jugador": p_jugador - p_banca,
+    }
+
+
+def _calcular_eor(conteo):
+    """
+    Calcula la ventaja base y el efecto de eliminar una carta de cada valor
+
+    Returns:
+        tuple: (ventaja_base, eor) con eor[apuesta][valor]
+    """
+    base = _ventajas(conteo)
+    eor = {apuesta: [0.0] * len(conteo) for apuesta in base}
+    for valor in range(len(conteo)):
+        if conteo[valor] == 0:
+            continue
+        reducido = list(conteo)
+        reducido[valor] -= 1
+        ventajas = _ventajas(reducido)
+        for apuesta in base:
+            eor[apuesta][valor] = ventajas[apuesta] - base[apuesta]
+    return base, eor